@@ -1,109 +1,171 @@
 import numpy as np
-from Household import Household  # adjust path if needed
+from demand import run_scenario
+from grouping import population_grouping, grouped_stats
+from sketches import ColumnSummary
+from profiling import traced
+from population import (
+    Population,
+    DEFAULT_SIGMA,
+    DEFAULT_TARGET_MEAN_INCOME,
+    DEFAULT_DTYPE,
+    DEFAULT_INCOME_ELASTICITY_FOOD,
+    DEFAULT_PRICE_ELASTICITY_FOOD,
+)
+from inequality import weighted_quantile
+from welfare import WELFARE_MEASURES, welfare_shares
 
 
 class Economy:
     def __init__(self, household_number):
         self.household_number = household_number
-        self.households = []
+        self.population = None
         self.aggregate_food_baseline = 0.0
         self.aggregate_food_demand_income_change = 0.0
         self.aggregate_food_demand_price_change = 0.0
+        self.aggregate_food_demand_combined_change = 0.0
         self.income = None 
         self.current_income = self.income
 
-    def create_economy(self):
+    @property
+    def households(self):
         """
-        Create 'household_number' Household objects.
+        Household-compatible view of the population.
+
+        Returns a lazy sequence of HouseholdView objects backed by the
+        columnar Population, or an empty list before create_economy().
+        """
+        if self.population is None:
+            return []
+        return self.population.households
+
+    @traced("create_economy", rows=lambda self, *args, **kwargs: self.household_number)
+    def create_economy(
+        self,
+        rng=None,
+        cache=None,
+        seed=None,
+        sigma=DEFAULT_SIGMA,
+        target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+        dtype=DEFAULT_DTYPE,
+        income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+        price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+    ):
+        """
+        Create the 'household_number' households as a columnar Population.
 
         Incomes are drawn from a lognormal distribution calibrated
         to roughly match Gini ≈ 1/3 and P90/P10 ≈ 4 via sigma ≈ 0.55.
         Quartiles of the income distribution are then used to assign
         different food budget shares following Engel's law
         (poorer households -> higher food share).
-        """
 
-        # Generate all incomes first
-        sigma = 0.55
-        # Choose mu so that mean income is about 30,000
-        target_mean_income = 30000
-        mu = np.log(target_mean_income) - 0.5 * sigma**2
-
-        incomes = np.random.lognormal(mean=mu, sigma=sigma, size=self.household_number)
-
-        # Compute quartile cutoffs (Q1, median, Q3)
-        q25, q50, q75 = np.percentile(incomes, [25, 50, 75])
-
-        households = []
-
-        # Create households with income-dependent food budget shares
-        for i in range(self.household_number):
-            income = incomes[i]
-
-            # Assign food_budget_share based on income quartile (Engel's law)
-            if income <= q25:
-                # Lowest income group: highest food share
-                food_budget_share = np.random.uniform(0.25, 0.35)
-                income_group = "Q1"
-            elif income <= q50:
-                food_budget_share = np.random.uniform(0.20, 0.30)
-                income_group = "Q2"
-            elif income <= q75:
-                food_budget_share = np.random.uniform(0.15, 0.25)
-                income_group = "Q3"
-            else:
-                # Highest income group: lowest food share
-                food_budget_share = np.random.uniform(0.10, 0.20)
-                income_group = "Q4"
-
-            h = Household(
-                income=income,
-                food_budget_share=food_budget_share,
-                income_elasticity_food=0.8,
-                price_elasticity_food=-0.6,
-                food_price=1.0,
-            )
+        Generation is fully vectorized (see Population.generate); by
+        default every household has income_elasticity_food=0.8,
+        price_elasticity_food=-0.6 and food_price=1.0.
 
-            # Store the income group label for plotting/aggregation later
-            h.income_group = income_group
+        rng: optional np.random.Generator. None draws from the global
+        np.random state; a seeded Generator makes the population reproducible.
 
-            households.append(h)
+        seed: alternatively, an integer seed; without a cache the population
+        is drawn from np.random.default_rng(seed). Pass rng or seed, not both.
 
-        self.households = households
+        cache: optional PopulationCache. With a cache, the population for
+        (household_number, seed) is reopened memory-mapped from disk if it was
+        generated before, and generated and stored otherwise.
+
+        sigma, target_mean_income: lognormal income parameters (default 0.55
+        and 30,000). To use a calibration, pass the "sigma" and
+        "target_mean_income" returned by sigma_calibration.fit_lognormal.
+
+        dtype: storage precision of the household columns. COMPACT_DTYPE
+        (float32) halves memory and bandwidth for very large populations;
+        aggregates still accumulate in float64 (see precision.py to measure
+        the error against a float64 run).
+
+        income_elasticity_food, price_elasticity_food: a number, one value
+        per quartile (e.g. [0.9, 0.8, 0.7, 0.6]) or a per-household
+        distribution such as {"mean": 0.8, "std": 0.1} or
+        {"low": -0.8, "high": -0.4} (see population.draw_elasticities).
+        """
+        sigma = float(sigma)
+        target_mean_income = float(target_mean_income)
+
+        if rng is not None and seed is not None:
+            raise ValueError("Pass either rng or seed, not both.")
+
+        if cache is not None:
+            if seed is None:
+                raise ValueError("A seed is required to look up a cached population.")
+            self.population = cache.get_or_create(
+                self.household_number,
+                seed,
+                sigma=sigma,
+                target_mean_income=target_mean_income,
+                dtype=dtype,
+                income_elasticity_food=income_elasticity_food,
+                price_elasticity_food=price_elasticity_food,
+            )
+            return
+
+        if seed is not None:
+            rng = np.random.default_rng(seed)
+        self.population = Population.generate(
+            self.household_number,
+            sigma=sigma,
+            target_mean_income=target_mean_income,
+            rng=rng,
+            dtype=dtype,
+            income_elasticity_food=income_elasticity_food,
+            price_elasticity_food=price_elasticity_food,
+        )
+
+    @traced("load_microdata", rows_after=lambda self, *args, **kwargs: self.household_number)
+    def load_microdata(self, path, **kwargs):
+        """
+        Build the population from household survey microdata instead of
+        synthetic draws (see microdata.load_microdata for the file formats
+        and keyword arguments).
+
+        Each row is one sampled household with income, food spend and a
+        survey weight; household_number is set to the number of rows. All
+        aggregates and grouped statistics are then weighted, so a small
+        weighted sample stands in for the population it represents.
+        """
+        from microdata import load_microdata
+
+        self.population = load_microdata(path, **kwargs)
+        self.household_number = self.population.size
 
            
+def _population_rows(economy, *args, **kwargs):
+    return economy.population.size
+
+
+@traced("economy_calculations", rows=_population_rows)
 def economy_calculations(economy, new_income=None, new_food_price=None):
     """
     Aggregate baseline and new food demand across all households.
-    - economy.households: list of Household objects
+    - economy.population: columnar Population of households
     - new_income: if not None, used for income-change scenario
     - new_food_price: if not None, used for price-change scenario
+
+    All households are evaluated at once by the array kernel in demand.py,
+    so every scenario is O(N). If both new_income and new_food_price are
+    given, current_food_demand holds the COMBINED scenario and its total is
+    stored in economy.aggregate_food_demand_combined_change.
     """
+    aggregates = run_scenario(
+        economy.population,
+        new_income=new_income,
+        new_food_price=new_food_price,
+    )
 
-    # initialise aggregates
-    economy.aggregate_food_baseline = 0.0
-    economy.aggregate_food_demand_income_change = 0.0
-    economy.aggregate_food_demand_price_change = 0.0
-
-    for h in economy.households:
-        # baseline demand
-        h.calculate_food_baseline_buy()
-        economy.aggregate_food_baseline += h.food_baseline_buy
-
-        # if an income scenario is provided
-        if new_income is not None:  # here new_income is the income_factor
-            for h in economy.households:
-                h.current_income = h.income * new_income      
-                q_income = h.calculate_new_food_demand_income_change(new_income)
-                h.current_food_demand = q_income
-
-        # if a price scenario is provided
-        if new_food_price is not None:
-            q_price = h.calculate_new_food_demand_price_change(new_food_price)
-            h.current_food_demand = q_price  # store for later use
-            economy.aggregate_food_demand_price_change += q_price
-
-    # return all three aggregates at the end, AFTER the loop
+    economy.aggregate_food_baseline = aggregates["baseline"]
+    economy.aggregate_food_demand_income_change = aggregates["income_change"]
+    economy.aggregate_food_demand_price_change = aggregates["price_change"]
+    economy.aggregate_food_demand_combined_change = aggregates["combined_change"]
+
+    # return all three aggregates
     return (
         economy.aggregate_food_baseline,
         economy.aggregate_food_demand_income_change,
@@ -112,56 +174,116 @@ def economy_calculations(economy, new_income=None, new_food_price=None):
 
 
 def mean_income(economy):
-    total_income = sum(h.income for h in economy.households)
-    mean_income_value = total_income / len(economy.households)
+    population = economy.population
+    if population.weight is None:
+        mean_income_value = float(np.mean(population.income, dtype=np.float64))
+    else:
+        mean_income_value = float(np.average(
+            np.asarray(population.income, dtype=np.float64), weights=population.weight
+        ))
     return mean_income_value
 
 
 def median_income(economy):
-    incomes = [h.income for h in economy.households]
-    median_income_value = np.median(incomes)
+    population = economy.population
+    if population.weight is None:
+        median_income_value = float(np.median(population.income))
+    else:
+        median_income_value = float(weighted_quantile(population.income, 0.5, population.weight))
     return median_income_value
 
 
-def demand_summary(economy):
+def _column_summary(values, weights=None):
+    """
+    (mean, median, std, total) of a household column, accumulated in
+    float64; weighted by survey weights when given (weighted median).
+    """
+    if weights is None:
+        return (
+            float(np.mean(values, dtype=np.float64)),
+            float(np.median(values)),
+            float(np.std(values, dtype=np.float64)),
+            float(np.sum(values, dtype=np.float64)),
+        )
+
+    values = np.asarray(values, dtype=np.float64)
+    weights = np.asarray(weights, dtype=np.float64)
+    total_weight = np.sum(weights)
+    total = float(np.dot(values, weights))
+    mean = total / total_weight
+    std = float(np.sqrt(np.dot((values - mean) ** 2, weights) / total_weight))
+    median = float(weighted_quantile(values, 0.5, weights))
+    return mean, median, std, total
+
+
+def demand_summary(economy, relative_accuracy=None, chunk_size=1_000_000):
     """
     Build summary statistics (mean, median, std, total) of NEW food demand
-    using h.current_food_demand for each household.
+    using the current_food_demand column of the population.
+
+    relative_accuracy: None computes exact statistics on the full column.
+    A value such as 0.01 instead streams the column through mergeable
+    sketches (see sketches.py) in chunks of chunk_size, so no full-size
+    copy or sort is needed; the median is then within that relative error.
+
+    For a weighted population (survey microdata) all four statistics are
+    weighted by the survey weights.
     """
-    q_new = [h.current_food_demand for h in economy.households]
+    q_new = economy.population.current_food_demand
+    weight = economy.population.weight
 
-    mean_q = np.mean(q_new)
-    median_q = np.median(q_new)
-    std_q = np.std(q_new)
-    total_q = np.sum(q_new)
+    if relative_accuracy is not None:
+        summary = ColumnSummary(relative_accuracy)
+        for start in range(0, q_new.shape[0], chunk_size):
+            stop = start + chunk_size
+            summary.update(q_new[start:stop], None if weight is None else weight[start:stop])
+        result = summary.summary()
+        return result["mean"], result["median"], result["std"], result["total"]
+
+    mean_q, median_q, std_q, total_q = _column_summary(q_new, weight)
 
     return mean_q, median_q, std_q, total_q
 
 
-def build_summary_and_plot_data(economy, new_food_price):
+@traced("build_summary_and_plot_data", rows=_population_rows)
+def build_summary_and_plot_data(economy, new_food_price, grouping=None, welfare=False):
     """
     Build:
       1) Summary stats for NEW demand (for the table)
-      2) Data by income group (Q1–Q4) for the two plots:
+      2) Data by income group (Q1–Q4 by default) for the two plots:
          - baseline vs new demand
          - baseline vs new budget share
 
     Assumes:
       - economy_calculations(economy, ..., new_food_price=...) has already been called
-      - each household h has:
-          h.food_baseline_buy
-          h.current_food_demand
-          h.food_budget_share
-          h.income_group
+      - economy.population holds, per household:
+          food_baseline_buy
+          current_food_demand
+          current_income
+          food_budget_share
+          group_code
+
+    grouping: None/"quartiles" (default), "quintiles", "deciles",
+    "percentiles", an int number of equal-count income groups, or a list of
+    income band edges (see grouping.population_grouping). All groups are
+    reduced in one pass with np.bincount, so finer tables cost the same.
+
+    welfare=True also reports the group means of the per-household change
+    in consumer surplus, compensating and equivalent variation of the
+    price change, as shares of income ("dcs_share", "cv_share",
+    "ev_share"; negative = loss, see welfare.py). They are derived from
+    the budget shares computed here and reduced in the same pass.
+
+    For a weighted population (survey microdata) the table, the income
+    groups and the group means are all weighted, and plot_data also holds
+    "weight", the number of households each group represents.
     """
+    population = economy.population
 
     # ---------- 1. Table summary for NEW demand ----------
-    q_new = [h.current_food_demand for h in economy.households]
+    q_new = population.current_food_demand
 
-    mean_q = np.mean(q_new)
-    median_q = np.median(q_new)
-    std_q = np.std(q_new)
-    total_q = np.sum(q_new)
+    mean_q, median_q, std_q, total_q = _column_summary(q_new, population.weight)
 
     table_summary = {
         "mean_demand": float(mean_q),
@@ -171,46 +293,55 @@ def build_summary_and_plot_data(economy, new_food_price):
     }
 
     # ---------- 2. Data by income group for plots ----------
-    groups = ["Q1", "Q2", "Q3", "Q4"]
-
-    # Prepare containers
-    plot_data = {
-        "groups": groups,
-        "baseline_demand": [],
-        "new_demand": [],
-        "baseline_budget_share": [],
-        "new_budget_share": [],
-    }
-
-    for g in groups:
-        # select households in this income group
-        group_hh = [h for h in economy.households if h.income_group == g]
+    codes, groups = population_grouping(population, grouping)
 
-        if not group_hh:
-            # in case a group is empty (shouldn't happen often)
-            plot_data["baseline_demand"].append(0.0)
-            plot_data["new_demand"].append(0.0)
-            plot_data["baseline_budget_share"].append(0.0)
-            plot_data["new_budget_share"].append(0.0)
-            continue
-
-        # baseline and new demand
-        q_baseline = [h.food_baseline_buy for h in group_hh]
-        q_new_g = [h.current_food_demand for h in group_hh]
+    # new budget share: (new price * new quantity) / income
+    w_new = new_food_price * q_new / population.current_income
 
+    columns = {
+        "baseline_demand": population.food_baseline_buy,
+        "new_demand": q_new,
         # baseline budget share is just the original food_budget_share
-        w_baseline = [h.food_budget_share for h in group_hh]
-
-        # new budget share: (new price * new quantity) / income
-        w_new = [
-             (new_food_price * h.current_food_demand) / h.current_income
-             for h in group_hh
-        ]
+        "baseline_budget_share": population.food_budget_share,
+        "new_budget_share": w_new,
+    }
+    if welfare:
+        columns.update(_welfare_columns(population, new_food_price, w_new))
 
+    stats = grouped_stats(codes, len(groups), columns, weights=population.weight)
 
-        plot_data["baseline_demand"].append(float(np.mean(q_baseline)))
-        plot_data["new_demand"].append(float(np.mean(q_new_g)))
-        plot_data["baseline_budget_share"].append(float(np.mean(w_baseline)))
-        plot_data["new_budget_share"].append(float(np.mean(w_new)))
+    # empty groups (shouldn't happen often) report 0.0
+    plot_data = {
+        "groups": groups,
+        "count": stats["count"].astype(int).tolist(),
+        "baseline_demand": stats["baseline_demand"]["mean"].tolist(),
+        "new_demand": stats["new_demand"]["mean"].tolist(),
+        "baseline_budget_share": stats["baseline_budget_share"]["mean"].tolist(),
+        "new_budget_share": stats["new_budget_share"]["mean"].tolist(),
+    }
+    if population.weight is not None:
+        plot_data["weight"] = stats["weight"].tolist()
+    if welfare:
+        for measure in WELFARE_MEASURES:
+            plot_data[f"{measure}_share"] = stats[f"{measure}_share"]["mean"].tolist()
 
     return table_summary, plot_data
+
+
+def _welfare_columns(population, new_food_price, w_new):
+    """Per-household welfare shares of the price change, from the new budget shares."""
+    log_price_change = np.log(new_food_price) - np.log(population.food_price)
+    base_share = population.food_budget_share
+    if population.current_income is not population.income:
+        # share at the old price after the income change: s0 * f^(d - 1)
+        log_income_factor = np.log(population.current_income / population.income)
+        base_share = base_share * np.exp((population.income_elasticity_food - 1.0) * log_income_factor)
+
+    shares = welfare_shares(
+        base_share,
+        w_new,
+        log_price_change,
+        population.income_elasticity_food,
+        population.price_elasticity_food,
+    )
+    return {f"{measure}_share": shares[measure] for measure in WELFARE_MEASURES}
@@ -0,0 +1,582 @@
+"""
+analytic.py
+
+Closed-form expectations of the demand model, without simulating households.
+
+Incomes are lognormal, Y = exp(mu + sigma Z), budget shares are uniform on
+the Engel band of the income quartile and demand is isoelastic, so every
+expectation the simulation reports reduces to truncated-lognormal moments.
+For an income interval (a, b], in z units z = (ln y - mu) / sigma,
+
+    E[Y^k; a < Y <= b] = exp(k mu + k^2 sigma^2 / 2) [Phi(z_b - k sigma) - Phi(z_a - k sigma)]
+
+and with a share band (l, h), E[s] = (l + h) / 2, E[s^2] = (l^2 + lh + h^2) / 3.
+A scenario (price p, income factor f) scales demand by f^e_y (p / p0)^e_p
+and the budget share by (p / p0) f^(e_y - 1) (p / p0)^e_p, so group means,
+totals and the standard deviation of demand are sums over "cells" (an
+income group intersected with an income quartile) of these moments.
+Heterogeneous elasticities (see population.draw_elasticities) enter through
+E[exp(e x)], taken by Gauss-Hermite / Gauss-Legendre quadrature; the
+median of demand is the root of a one-dimensional integral over the share
+band. Groups are theoretical quantiles of the lognormal (or fixed income
+bands), the limit of the empirical groups of a large population.
+
+`LognormalModel.scenario` returns (aggregates, table_summary, plot_data)
+in the format of run_scenarios.evaluate_scenario in microseconds, and
+`LognormalModel.sweep` the demand cube of sweep.sweep_scenarios, so large
+sweeps that only need expectations can skip simulation. `validate`
+compares both against the Monte Carlo output of economy_calculations /
+build_summary_and_plot_data and reports the relative errors, which should
+shrink like 1 / sqrt(household_number). Welfare measures are not covered.
+
+Usage:
+    python analytic.py --price 1.10 --income 1.05 --grouping deciles
+    python analytic.py --price 1.10 --validate --households 1000000 --seed 1
+"""
+
+import argparse
+import math
+import sys
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from grouping import NAMED_GROUPINGS, band_labels
+from population import (
+    analytic_quartile_cutoffs,
+    lognormal_mu,
+    QUARTILE_LABELS,
+    ENGEL_SHARE_BANDS,
+    DEFAULT_SIGMA,
+    DEFAULT_TARGET_MEAN_INCOME,
+    DEFAULT_INCOME_ELASTICITY_FOOD,
+    DEFAULT_PRICE_ELASTICITY_FOOD,
+    DEFAULT_FOOD_PRICE,
+)
+from sigma_calibration import norm_ppf
+
+
+# Quadrature nodes per elasticity distribution and per share band (median)
+ELASTICITY_NODES = 16
+SHARE_NODES = 64
+
+# Regula falsi (Illinois) steps for the median of demand
+MEDIAN_ITERATIONS = 10
+
+# Scenarios checked by validate() by default
+DEFAULT_VALIDATION_SCENARIOS = (
+    {"new_food_price": 1.10},
+    {"new_income": 1.05},
+    {"new_food_price": 1.10, "new_income": 1.05, "grouping": "deciles"},
+)
+
+# Exact normal CDF for the cell moments (computed once per grouping)
+_normal_cdf = np.vectorize(NormalDist().cdf, otypes=[np.float64])
+
+
+def _fast_normal_cdf(z):
+    """
+    Normal CDF vectorized in NumPy, from the Chebyshev fit of erfc in
+    Numerical Recipes (relative error < 1.2e-7); used inside the median
+    bisection, where the exact CDF would dominate the cost.
+    """
+    x = np.abs(z) / math.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * x)
+    poly = np.polyval([
+        0.17087277, -0.82215223, 1.48851587, -1.13520398, 0.27886807,
+        -0.18628806, 0.09678418, 0.37409196, 1.00002368, -1.26551223,
+    ], t)
+    with np.errstate(invalid="ignore", over="ignore"):
+        tail = 0.5 * t * np.exp(-x * x + poly)
+    tail = np.where(np.isinf(x), 0.0, tail)
+    return np.where(z >= 0, 1.0 - tail, tail)
+
+
+def _elasticity_nodes(spec, n_quartiles):
+    """
+    Quadrature of an elasticity spec per income quartile: (values, weights)
+    with values of shape (n_quartiles, K) and weights of shape (K,), so
+    E[g(e) | quartile q] = sum_k weights[k] g(values[q, k]). Constant
+    elasticities have K = 1.
+    """
+    def per_quartile(value):
+        return np.broadcast_to(np.asarray(value, dtype=np.float64), (n_quartiles,))
+
+    if not isinstance(spec, dict):
+        return per_quartile(spec)[:, None], np.ones(1)
+    if set(spec) == {"mean", "std"}:
+        x, w = np.polynomial.hermite_e.hermegauss(ELASTICITY_NODES)
+        mean, std = per_quartile(spec["mean"]), per_quartile(spec["std"])
+        return mean[:, None] + std[:, None] * x, w / w.sum()
+    if set(spec) == {"low", "high"}:
+        x, w = np.polynomial.legendre.leggauss(ELASTICITY_NODES)
+        low, high = per_quartile(spec["low"]), per_quartile(spec["high"])
+        return (0.5 * (low + high))[:, None] + (0.5 * (high - low))[:, None] * x, w / 2.0
+    raise ValueError(
+        f"Elasticity distribution needs 'mean' and 'std' or 'low' and 'high', got {sorted(spec)}."
+    )
+
+
+def _factor_moments(values, weights, log_change, power=1):
+    """E[exp(power * e * log_change)] per (scenario, quartile), shape (S, Q)."""
+    return np.exp(power * log_change[:, None, None] * values[None]) @ weights
+
+
+# ---------- Model ----------
+
+class LognormalModel:
+    """
+    Expected demand of a synthetic population (see Population.generate)
+    with the same parameters, in closed form.
+
+    Parameters
+    ----------
+    household_number : float
+        Households represented; scales totals and group counts.
+    sigma, target_mean_income : float
+        Lognormal income parameters.
+    bands : sequence of (low, high)
+        Uniform food budget share band per income quartile.
+    income_elasticity_food, price_elasticity_food :
+        Elasticity specs as accepted by Economy.create_economy: a number,
+        one value per quartile or a normal / uniform distribution.
+    food_price : float
+        Baseline food price p0.
+    """
+
+    def __init__(
+        self,
+        household_number,
+        sigma=DEFAULT_SIGMA,
+        target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+        bands=ENGEL_SHARE_BANDS,
+        income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+        price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+        food_price=DEFAULT_FOOD_PRICE,
+    ):
+        self.household_number = float(household_number)
+        self.sigma = float(sigma)
+        self.target_mean_income = float(target_mean_income)
+        self.mu = float(lognormal_mu(self.target_mean_income, self.sigma))
+        self.food_price = float(food_price)
+
+        self.bands = np.asarray(bands, dtype=np.float64)
+        if len(self.bands) != len(QUARTILE_LABELS):
+            raise ValueError(f"Expected {len(QUARTILE_LABELS)} share bands, got {len(self.bands)}.")
+        low, high = self.bands[:, 0], self.bands[:, 1]
+        self.share_mean = 0.5 * (low + high)
+        self.share_mean_square = (low * low + low * high + high * high) / 3.0
+
+        n_quartiles = len(self.bands)
+        self._income_values, self._income_weights = _elasticity_nodes(
+            income_elasticity_food, n_quartiles
+        )
+        self._price_values, self._price_weights = _elasticity_nodes(
+            price_elasticity_food, n_quartiles
+        )
+
+        # ln(share) quadrature over each band, for the median
+        x, w = np.polynomial.legendre.leggauss(SHARE_NODES)
+        self._log_share_nodes = np.log(self.share_mean[:, None] + 0.5 * (high - low)[:, None] * x)
+        self._share_weights = w / 2.0
+
+        cutoffs = analytic_quartile_cutoffs(self.sigma, self.target_mean_income)
+        self._quartile_z = np.concatenate(([-np.inf], self._z(cutoffs), [np.inf]))
+        self._cells = {}
+
+    def _z(self, income):
+        return (np.log(income) - self.mu) / self.sigma
+
+    # ---------- Groups ----------
+
+    def group_edges(self, grouping=None):
+        """
+        Inner income edges and labels of a grouping spec (as in
+        grouping.population_grouping), with quantile groups at the
+        theoretical lognormal quantiles.
+        """
+        if grouping is None or (isinstance(grouping, str) and grouping == "quartiles"):
+            cutoffs = analytic_quartile_cutoffs(self.sigma, self.target_mean_income)
+            return cutoffs, list(QUARTILE_LABELS)
+
+        if isinstance(grouping, str):
+            if grouping not in NAMED_GROUPINGS:
+                raise ValueError(
+                    f"Unknown grouping {grouping!r}; expected one of {sorted(NAMED_GROUPINGS)}."
+                )
+            n_groups, prefix = NAMED_GROUPINGS[grouping]
+        elif isinstance(grouping, (int, np.integer)):
+            n_groups, prefix = int(grouping), "G"
+        else:
+            edges = np.asarray(grouping, dtype=np.float64)
+            if edges.ndim != 1 or np.any(np.diff(edges) <= 0) or np.any(edges <= 0):
+                raise ValueError("edges must be a 1-D, strictly increasing sequence of incomes > 0.")
+            return edges, band_labels(edges)
+
+        probabilities = np.arange(1, n_groups) / n_groups
+        edges = np.exp(self.mu + self.sigma * norm_ppf(probabilities))
+        return edges, [f"{prefix}{k + 1}" for k in range(n_groups)]
+
+    def _cells_for(self, grouping):
+        """
+        Income cells (group x quartile) of a grouping, with their income
+        moments E[Y^k; cell] for k = 0, 1, 2 (cached per grouping).
+        """
+        key = tuple(float(edge) for edge in grouping) if np.ndim(grouping) else grouping
+        cells = self._cells.get(key)
+        if cells is not None:
+            return cells
+
+        edges, labels = self.group_edges(grouping)
+        group_z = np.concatenate(([-np.inf], self._z(edges), [np.inf]))
+        n_groups, n_quartiles = len(labels), len(self._quartile_z) - 1
+
+        group, quartile = np.meshgrid(np.arange(n_groups), np.arange(n_quartiles), indexing="ij")
+        group, quartile = group.ravel(), quartile.ravel()
+        lo = np.maximum(group_z[group], self._quartile_z[quartile])
+        hi = np.minimum(group_z[group + 1], self._quartile_z[quartile + 1])
+        keep = lo < hi
+        group, quartile, lo, hi = group[keep], quartile[keep], lo[keep], hi[keep]
+
+        def moment(k):
+            scale = math.exp(k * self.mu + 0.5 * (k * self.sigma) ** 2)
+            return scale * (_normal_cdf(hi - k * self.sigma) - _normal_cdf(lo - k * self.sigma))
+
+        onehot = np.zeros((len(group), n_groups))
+        onehot[np.arange(len(group)), group] = 1.0
+        cells = self._cells[key] = {
+            "labels": labels,
+            "quartile": quartile,
+            "lo": lo,
+            "hi": hi,
+            "onehot": onehot,
+            "mass": moment(0),
+            "income": moment(1),
+            "income_square": moment(2),
+            "group_mass": moment(0) @ onehot,
+            # median of Z within each cell
+            "z_median": norm_ppf(0.5 * (_normal_cdf(lo) + _normal_cdf(hi))),
+        }
+        return cells
+
+    # ---------- Expectations ----------
+
+    def _expectations(self, cells, log_income, log_price):
+        """
+        Per-household expectations for S scenarios (log income factors and
+        log price ratios p / p0, shape (S,)):
+
+            "group_demand": (S, G) mean demand per group
+            "group_share": (S, G) mean new budget share per group
+            "mean", "mean_square": (S,) E[q] and E[q^2] over all households
+        """
+        quartile = cells["quartile"]
+        income_1 = _factor_moments(self._income_values, self._income_weights, log_income)
+        price_1 = _factor_moments(self._price_values, self._price_weights, log_price)
+        factor = (income_1 * price_1)[:, quartile]
+
+        demand = factor * (cells["income"] * self.share_mean[quartile] / self.food_price)
+        share = factor * np.exp(log_price - log_income)[:, None] * (
+            cells["mass"] * self.share_mean[quartile]
+        )
+
+        income_2 = _factor_moments(self._income_values, self._income_weights, log_income, 2)
+        price_2 = _factor_moments(self._price_values, self._price_weights, log_price, 2)
+        square = (income_2 * price_2)[:, quartile] * (
+            cells["income_square"] * self.share_mean_square[quartile] / self.food_price**2
+        )
+
+        return {
+            "group_demand": demand @ cells["onehot"] / cells["group_mass"],
+            "group_share": share @ cells["onehot"] / cells["group_mass"],
+            "mean": demand.sum(axis=1),
+            "mean_square": square.sum(axis=1),
+        }
+
+    def _median(self, cells, log_income, log_price):
+        """
+        Median demand for S scenarios: the root of
+
+            P(q <= t) = sum over cells, share and elasticity nodes of
+                        P(z_lo < Z <= min(z_hi, z(t, s, e)))
+
+        with z(t, s, e) = (ln t + ln p0 - ln s - e_y ln f - e_p ln r - mu) / sigma,
+        found by regula falsi on ln t. The root is bracketed by the smallest
+        and largest median of the mixture components (one per cell, share
+        node and elasticity node), whose CDFs are all below / above 1/2 there.
+        """
+        quartile = cells["quartile"]
+        # (S, C, 1, Ky, Kp): log demand shift of every elasticity node pair
+        shift = (
+            self._income_values[quartile][None, :, :, None] * log_income[:, None, None, None]
+            + self._price_values[quartile][None, :, None, :] * log_price[:, None, None, None]
+        )[:, :, None]
+        offset = (math.log(self.food_price) - self.mu
+                  - self._log_share_nodes[quartile][None, :, :, None, None] - shift) / self.sigma
+        lo = cells["lo"][None, :, None, None, None]
+        hi = cells["hi"][None, :, None, None, None]
+        cdf_lo = _fast_normal_cdf(lo)
+
+        def cdf(log_t):
+            z = np.minimum(hi, log_t[:, None, None, None, None] / self.sigma + offset)
+            p = np.maximum(_fast_normal_cdf(z) - cdf_lo, 0.0)
+            return np.einsum("scnij,n,i,j->s", p, self._share_weights,
+                             self._income_weights, self._price_weights)
+
+        component_medians = self.sigma * (cells["z_median"][None, :, None, None, None] - offset)
+        a = component_medians.min(axis=(1, 2, 3, 4)) - 1e-9
+        b = component_medians.max(axis=(1, 2, 3, 4)) + 1e-9
+        fa, fb = cdf(a) - 0.5, cdf(b) - 0.5
+        for _ in range(MEDIAN_ITERATIONS):
+            c = b - fb * (b - a) / np.where(fb != fa, fb - fa, 1.0)
+            fc = cdf(c) - 0.5
+            # keep the bracket; halve the stale end (Illinois) when it is not replaced
+            same_side = fc * fb > 0
+            a, fa = np.where(same_side, a, b), np.where(same_side, 0.5 * fa, fb)
+            b, fb = c, fc
+        return np.exp(b)
+
+    def _log_changes(self, new_food_price, new_income):
+        log_price = (
+            0.0 if new_food_price is None
+            else np.log(new_food_price) - math.log(self.food_price)
+        )
+        log_income = 0.0 if new_income is None else np.log(new_income)
+        return np.broadcast_arrays(np.asarray(log_income, dtype=np.float64),
+                                   np.asarray(log_price, dtype=np.float64))
+
+    def scenario(self, new_food_price=None, new_income=None, grouping=None, median=True):
+        """
+        Expected (aggregates, table_summary, plot_data) of one scenario, in
+        the format of run_scenarios.evaluate_scenario.
+
+        Totals and "count" are expectations for household_number households,
+        so counts are not rounded. median=False skips the median bisection
+        (the only part that is not a handful of array operations) and
+        reports NaN for "median_demand".
+        """
+        if new_food_price is None and new_income is None:
+            raise ValueError("A scenario needs new_food_price and/or new_income.")
+        cells = self._cells_for(grouping)
+        log_income, log_price = self._log_changes(new_food_price, new_income)
+
+        # baseline, income change, price change, combined
+        expected = self._expectations(
+            cells,
+            np.array([0.0, log_income, 0.0, log_income]),
+            np.array([0.0, 0.0, log_price, log_price]),
+        )
+        totals = self.household_number * expected["mean"]
+        both = new_income is not None and new_food_price is not None
+        aggregates = {
+            "baseline": float(totals[0]),
+            "income_change": float(totals[1]) if new_income is not None else 0.0,
+            "price_change": float(totals[2]) if new_food_price is not None else 0.0,
+            "combined_change": float(totals[3]) if both else 0.0,
+        }
+
+        mean = expected["mean"][3]
+        std = math.sqrt(max(expected["mean_square"][3] - mean * mean, 0.0))
+        median_q = (
+            float(self._median(cells, np.array([log_income]), np.array([log_price]))[0])
+            if median else float("nan")
+        )
+        table_summary = {
+            "mean_demand": float(mean),
+            "median_demand": median_q,
+            "std_demand": float(std),
+            "total_demand": float(totals[3]),
+        }
+
+        plot_data = {
+            "groups": list(cells["labels"]),
+            "count": (self.household_number * cells["group_mass"]).tolist(),
+            "baseline_demand": expected["group_demand"][0].tolist(),
+            "new_demand": expected["group_demand"][3].tolist(),
+            "baseline_budget_share": expected["group_share"][0].tolist(),
+            "new_budget_share": expected["group_share"][3].tolist(),
+        }
+        return aggregates, table_summary, plot_data
+
+    def evaluate(self, scenario):
+        """Analytic counterpart of run_scenarios.evaluate_scenario for a scenario dict."""
+        if scenario.get("welfare", False):
+            raise ValueError("Welfare measures have no analytic evaluation; simulate the scenario.")
+        new_food_price = scenario.get("new_food_price")
+        new_income = scenario.get("new_income")
+        return self.scenario(
+            new_food_price=None if new_food_price is None else float(new_food_price),
+            new_income=None if new_income is None else float(new_income),
+            grouping=scenario.get("grouping"),
+        )
+
+    def sweep(self, price_levels, income_factors, grouping=None):
+        """
+        Expected demand cube over price levels × income factors, with the
+        keys of sweep.sweep_scenarios (welfare excluded): "price_levels",
+        "income_factors", "groups", "count", "baseline_demand",
+        "baseline_budget_share", "total_demand", "mean_demand",
+        "mean_budget_share" (P, I, G) and "market_total_demand" (P, I).
+        """
+        price_levels = np.atleast_1d(np.asarray(price_levels, dtype=np.float64))
+        income_factors = np.atleast_1d(np.asarray(income_factors, dtype=np.float64))
+        cells = self._cells_for(grouping)
+
+        log_income, log_price = self._log_changes(price_levels[:, None], income_factors[None, :])
+        expected = self._expectations(cells, log_income.ravel(), log_price.ravel())
+        baseline = self._expectations(cells, np.zeros(1), np.zeros(1))
+
+        shape = (len(price_levels), len(income_factors), len(cells["labels"]))
+        count = self.household_number * cells["group_mass"]
+        mean_demand = expected["group_demand"].reshape(shape)
+        return {
+            "price_levels": price_levels,
+            "income_factors": income_factors,
+            "groups": list(cells["labels"]),
+            "count": count,
+            "baseline_demand": baseline["group_demand"][0],
+            "baseline_budget_share": baseline["group_share"][0],
+            "total_demand": mean_demand * count,
+            "mean_demand": mean_demand,
+            "mean_budget_share": expected["group_share"].reshape(shape),
+            "market_total_demand": self.household_number * expected["mean"].reshape(shape[:2]),
+        }
+
+
+# ---------- Validation ----------
+
+def _relative_error(expected, simulated):
+    expected = np.asarray(expected, dtype=np.float64)
+    simulated = np.asarray(simulated, dtype=np.float64)
+    scale = np.where(simulated == 0.0, 1.0, np.abs(simulated))
+    return float(np.max(np.abs(expected - simulated) / scale))
+
+
+def compare(expected, simulated):
+    """
+    Relative errors of analytic (aggregates, table_summary, plot_data)
+    against simulated ones: one value per aggregate and table entry and,
+    per plot_data column, the largest error over the groups.
+    """
+    errors = {}
+    for part_expected, part_simulated in zip(expected, simulated):
+        for name, value in part_expected.items():
+            if name != "groups" and name in part_simulated:
+                errors[name] = _relative_error(value, part_simulated[name])
+    return errors
+
+
+def validate(
+    household_number,
+    seed=0,
+    scenarios=DEFAULT_VALIDATION_SCENARIOS,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+    income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+    price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+):
+    """
+    Compare the analytic expectations with a Monte Carlo run.
+
+    Generates one population of `household_number` households from
+    `seed`, evaluates every scenario with economy_calculations and
+    build_summary_and_plot_data (through run_scenarios.evaluate_scenario)
+    and analytically, and returns one report per scenario: the scenario,
+    the relative errors (see compare), the largest of them and the time
+    taken by each method. Errors are sampling noise of the simulation and
+    should fall like 1 / sqrt(household_number).
+    """
+    from Economy import Economy
+    from run_scenarios import evaluate_scenario
+
+    parameters = dict(
+        sigma=sigma,
+        target_mean_income=target_mean_income,
+        income_elasticity_food=income_elasticity_food,
+        price_elasticity_food=price_elasticity_food,
+    )
+    econ = Economy(household_number)
+    econ.create_economy(rng=np.random.default_rng(seed), **parameters)
+    model = LognormalModel(household_number, **parameters)
+
+    reports = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        simulated = evaluate_scenario(econ, scenario)
+        simulation_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = model.evaluate(scenario)
+        analytic_seconds = time.perf_counter() - start
+
+        errors = compare(expected, simulated)
+        reports.append({
+            "scenario": dict(scenario),
+            "errors": errors,
+            "max_error": max(errors.values()),
+            "simulation_seconds": simulation_seconds,
+            "analytic_seconds": analytic_seconds,
+        })
+    return reports
+
+
+# ---------- Command line ----------
+
+def _parse_grouping(value):
+    if value is None or not value.replace(",", "").replace(".", "").isdigit():
+        return value
+    if "," in value:
+        return [float(edge) for edge in value.split(",")]
+    return int(value)
+
+
+def _print_scenario(aggregates, table_summary, plot_data):
+    print(f"{'group':>10} {'households':>12} {'q0':>10} {'q_new':>10} {'w0':>8} {'w_new':>8}")
+    for k, label in enumerate(plot_data["groups"]):
+        print(f"{label:>10} {plot_data['count'][k]:>12.0f} {plot_data['baseline_demand'][k]:>10.1f} "
+              f"{plot_data['new_demand'][k]:>10.1f} {plot_data['baseline_budget_share'][k]:>8.4f} "
+              f"{plot_data['new_budget_share'][k]:>8.4f}")
+    print()
+    for name, value in {**aggregates, **table_summary}.items():
+        print(f"{name:>16}: {value:,.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Analytic expected demand under the lognormal model."
+    )
+    parser.add_argument("--price", type=float, default=None, help="new food price level")
+    parser.add_argument("--income", type=float, default=None, help="multiplicative income factor")
+    parser.add_argument("--grouping", default=None,
+                        help="quartiles, deciles, ..., a number of groups or comma-separated edges")
+    parser.add_argument("--households", type=float, default=1_000_000)
+    parser.add_argument("--sigma", type=float, default=DEFAULT_SIGMA)
+    parser.add_argument("--mean-income", type=float, default=DEFAULT_TARGET_MEAN_INCOME)
+    parser.add_argument("--validate", action="store_true",
+                        help="compare against a Monte Carlo population of --households")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    scenario = {"new_food_price": args.price, "new_income": args.income,
+                "grouping": _parse_grouping(args.grouping)}
+    if args.price is None and args.income is None:
+        scenario["new_food_price"] = 1.10
+
+    if args.validate:
+        for report in validate(int(args.households), seed=args.seed, scenarios=[scenario],
+                               sigma=args.sigma, target_mean_income=args.mean_income):
+            for name, error in report["errors"].items():
+                print(f"{name:>24}: {error:.2e}")
+            print(f"\nmax relative error {report['max_error']:.2e}; simulation "
+                  f"{report['simulation_seconds']:.3f} s, analytic "
+                  f"{report['analytic_seconds'] * 1e6:.0f} µs")
+        return 0
+
+    model = LognormalModel(args.households, sigma=args.sigma, target_mean_income=args.mean_income)
+    _print_scenario(*model.evaluate(scenario))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
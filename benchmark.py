@@ -0,0 +1,320 @@
+"""
+Benchmark script.
+
+Times and memory-profiles every stage of the simulation for a range of
+population sizes:
+
+    - generation        Economy.create_economy
+    - price_scenario    economy_calculations(new_food_price=...)
+    - income_scenario   economy_calculations(new_income=...)
+    - summary           build_summary_and_plot_data
+    - price_pipeline    main-delta-price.py end to end (headless plots)
+    - income_pipeline   main-delta-income.py end to end (headless plots)
+
+It also measures the import time of the entry modules (`python -X
+importtime` in a fresh interpreter, best of `repeats`) and records whether
+each one pulls in matplotlib, which none of them may do.
+
+Results are written as JSON and compared with a stored baseline; any
+stage or import slower than `threshold` × baseline, or a measured module
+that imports matplotlib, is reported as a regression and the script exits
+with status 1. No baseline is checked in: create one on the machine that
+runs the comparison with --update-baseline first; without it the script
+stops with status 2 before measuring anything.
+
+Usage:
+    python benchmark.py --update-baseline              # store a new baseline
+    python benchmark.py --sizes 1e3 1e4 1e5 1e6 1e7 --output bench.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 1.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Economy import Economy, economy_calculations, build_summary_and_plot_data
+
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+DEFAULT_BASELINE = "benchmark_baseline.json"
+DEFAULT_THRESHOLD = 1.25
+
+# none of these may import matplotlib at import time (plotting imports it lazily)
+DEFAULT_IMPORT_MODULES = ("Economy", "compute", "run_scenarios", "plots", "rendering")
+
+NEW_PRICE = 1.10
+INCOME_FACTOR = 1.5
+SEED = 12345
+
+
+# ---------- Stages ----------
+
+def _economy(n):
+    econ = Economy(household_number=n)
+    econ.create_economy(rng=np.random.default_rng(SEED))
+    return econ
+
+
+def _price_ready(n):
+    econ = _economy(n)
+    economy_calculations(econ, new_food_price=NEW_PRICE)
+    return econ
+
+
+def _plot(plot_data, demand_plot, share_plot, value):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    demand_plot(plot_data, value)
+    share_plot(plot_data, value)
+    plt.close("all")
+
+
+def _price_pipeline(n):
+    from plots import plot_demand_by_income_group, plot_budget_share_by_income_group
+
+    econ = _economy(n)
+    economy_calculations(econ, new_food_price=NEW_PRICE)
+    _, plot_data = build_summary_and_plot_data(econ, new_food_price=NEW_PRICE)
+    _plot(plot_data, plot_demand_by_income_group, plot_budget_share_by_income_group, NEW_PRICE)
+
+
+def _income_pipeline(n):
+    from plots import (
+        plot_demand_by_income_group_income_change,
+        plot_budget_share_by_income_group_income_change,
+    )
+
+    econ = _economy(n)
+    economy_calculations(econ, new_income=INCOME_FACTOR)
+    baseline_price = econ.households[0].food_price
+    _, plot_data = build_summary_and_plot_data(econ, new_food_price=baseline_price)
+    _plot(
+        plot_data,
+        plot_demand_by_income_group_income_change,
+        plot_budget_share_by_income_group_income_change,
+        INCOME_FACTOR,
+    )
+
+
+# name -> (setup(n) returning the stage argument, stage(arg, n))
+STAGES = {
+    "generation": (lambda n: None, lambda _, n: _economy(n)),
+    "price_scenario": (_economy, lambda econ, n: economy_calculations(econ, new_food_price=NEW_PRICE)),
+    "income_scenario": (_economy, lambda econ, n: economy_calculations(econ, new_income=INCOME_FACTOR)),
+    "summary": (_price_ready, lambda econ, n: build_summary_and_plot_data(econ, new_food_price=NEW_PRICE)),
+    "price_pipeline": (lambda n: None, lambda _, n: _price_pipeline(n)),
+    "income_pipeline": (lambda n: None, lambda _, n: _income_pipeline(n)),
+}
+
+
+# ---------- Measurement ----------
+
+def _check_repeats(repeats):
+    if repeats < 1:
+        raise ValueError(f"repeats must be at least 1, got {repeats}.")
+
+
+def measure_import(module, repeats):
+    """Best-of-`repeats` cumulative import time of `module` in a fresh interpreter."""
+    _check_repeats(repeats)
+    code = f"import sys, {module}; print('matplotlib' in sys.modules)"
+    times = []
+    for _ in range(repeats):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        # "import time: self [us] | cumulative | imported package"
+        for line in proc.stderr.splitlines():
+            fields = line.split("|")
+            if len(fields) == 3 and fields[2].strip() == module:
+                times.append(int(fields[1]) / 1e6)
+    if not times:
+        raise RuntimeError(f"python -X importtime reported no import of {module!r}.")
+    return {
+        "module": module,
+        "seconds": min(times),
+        "matplotlib_loaded": proc.stdout.strip() == "True",
+    }
+
+
+def run_import_benchmarks(modules, repeats):
+    results = []
+    for module in modules:
+        result = measure_import(module, repeats)
+        results.append(result)
+        flag = "  (imports matplotlib)" if result["matplotlib_loaded"] else ""
+        print(f"  import {module:<20} {result['seconds'] * 1e3:10.2f} ms{flag}")
+    return results
+
+
+def measure(stage, n, repeats):
+    """Best-of-`repeats` wall time and tracemalloc peak of one stage."""
+    _check_repeats(repeats)
+    setup, run = STAGES[stage]
+
+    times = []
+    for _ in range(repeats):
+        arg = setup(n)
+        start = time.perf_counter()
+        run(arg, n)
+        times.append(time.perf_counter() - start)
+        del arg
+
+    # separate pass for memory, so tracing does not distort the timings
+    arg = setup(n)
+    tracemalloc.start()
+    run(arg, n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del arg
+
+    seconds = min(times)
+    return {
+        "stage": stage,
+        "n": n,
+        "seconds": seconds,
+        "peak_bytes": peak,
+        "rows_per_second": n / seconds if seconds > 0 else None,
+    }
+
+
+def run_benchmarks(sizes, stages, repeats, import_modules=DEFAULT_IMPORT_MODULES):
+    _check_repeats(repeats)
+    imports = run_import_benchmarks(import_modules, repeats)
+
+    # warm up imports and caches so the first timed size is not penalised
+    for stage in stages:
+        setup, run = STAGES[stage]
+        run(setup(1_000), 1_000)
+
+    results = []
+    for n in sizes:
+        for stage in stages:
+            result = measure(stage, n, repeats)
+            results.append(result)
+            print(
+                f"  {stage:<16} N={n:>10,}  {result['seconds'] * 1e3:10.2f} ms  "
+                f"peak {result['peak_bytes'] / 1e6:9.1f} MB"
+            )
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeats": repeats,
+        },
+        "imports": imports,
+        "results": results,
+    }
+
+
+def load_baseline(path):
+    """Baseline report stored with --update-baseline; FileNotFoundError if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"No benchmark baseline at {path}; run with --update-baseline to create one."
+        ) from None
+
+
+def compare(report, baseline, threshold):
+    """
+    List of (name, n, seconds, baseline_seconds) slower than threshold ×
+    baseline; imports are listed as ("import <module>", None, ...).
+    """
+    reference = {(r["stage"], r["n"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        base = reference.get((r["stage"], r["n"]))
+        if base is not None and r["seconds"] > threshold * base:
+            regressions.append((r["stage"], r["n"], r["seconds"], base))
+
+    import_reference = {r["module"]: r["seconds"] for r in baseline.get("imports", [])}
+    for r in report.get("imports", []):
+        base = import_reference.get(r["module"])
+        if base is not None and r["seconds"] > threshold * base:
+            regressions.append((f"import {r['module']}", None, r["seconds"], base))
+    return regressions
+
+
+def eager_matplotlib(report):
+    """Measured modules whose import pulled in matplotlib."""
+    return [r["module"] for r in report.get("imports", []) if r["matplotlib_loaded"]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the demand simulation stages.")
+    parser.add_argument("--sizes", nargs="+", type=float, default=DEFAULT_SIZES,
+                        help="population sizes (e.g. 1e3 1e6)")
+    parser.add_argument("--stages", nargs="+", choices=sorted(STAGES), default=list(STAGES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="regression if seconds > threshold × baseline seconds")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="store these results as the new baseline")
+    parser.add_argument("--imports", nargs="*", default=list(DEFAULT_IMPORT_MODULES),
+                        help="modules whose import time is measured (none to skip)")
+    args = parser.parse_args(argv)
+    if args.repeats < 1:
+        parser.error("--repeats must be at least 1")
+
+    # fail before measuring anything if there is nothing to compare against
+    baseline = None
+    if not args.update_baseline:
+        try:
+            baseline = load_baseline(args.baseline)
+        except FileNotFoundError as error:
+            print(error, file=sys.stderr)
+            return 2
+
+    sizes = [int(n) for n in args.sizes]
+    print("\n=== BENCHMARK ===")
+    report = run_benchmarks(sizes, args.stages, args.repeats, args.imports)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    eager = eager_matplotlib(report)
+    if eager:
+        print(f"\nModules importing matplotlib: {', '.join(eager)}")
+        return 1
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(report, baseline, args.threshold)
+    if not regressions:
+        print(f"\nNo regressions against {args.baseline} (threshold ×{args.threshold:.2f}).")
+        return 0
+
+    print(f"\nRegressions against {args.baseline} (threshold ×{args.threshold:.2f}):")
+    for stage, n, seconds, base in regressions:
+        size = f"N={n:>10,}" if n is not None else " " * 12
+        print(f"  {stage:<22} {size}  {seconds * 1e3:.2f} ms vs {base * 1e3:.2f} ms "
+              f"(×{seconds / base:.2f})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
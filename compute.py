@@ -0,0 +1,116 @@
+"""
+Compute-only entry point.
+
+Runs one price and/or income scenario and prints the market summary and
+the per-group table, without plotting. Nothing here imports matplotlib,
+so short runs and freshly started worker processes only pay for NumPy
+and the model modules (see the import-time numbers in benchmark.py).
+
+Usage:
+    python compute.py --households 1000000 --price 1.10
+    python compute.py --households 200 --income 1.5 --grouping deciles --json
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from Economy import Economy, economy_calculations, build_summary_and_plot_data
+from population import DEFAULT_SIGMA, DEFAULT_TARGET_MEAN_INCOME
+
+
+def compute(
+    household_number,
+    new_food_price=None,
+    new_income=None,
+    grouping=None,
+    seed=None,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+):
+    """
+    Build an economy, run the scenario and return a plain dict with
+    "aggregates", "table_summary" and "plot_data" (per-group table).
+    """
+    econ = Economy(household_number=household_number)
+    econ.create_economy(
+        rng=np.random.default_rng(seed),
+        sigma=sigma,
+        target_mean_income=target_mean_income,
+    )
+
+    economy_calculations(econ, new_income=new_income, new_food_price=new_food_price)
+    baseline_price = float(econ.population.food_price[0])
+    table_summary, plot_data = build_summary_and_plot_data(
+        econ,
+        new_food_price=baseline_price if new_food_price is None else new_food_price,
+        grouping=grouping,
+    )
+
+    return {
+        "aggregates": {
+            "baseline": econ.aggregate_food_baseline,
+            "income_change": econ.aggregate_food_demand_income_change,
+            "price_change": econ.aggregate_food_demand_price_change,
+            "combined_change": econ.aggregate_food_demand_combined_change,
+        },
+        "table_summary": table_summary,
+        "plot_data": plot_data,
+    }
+
+
+def _print_result(result):
+    print("\nTable summary (NEW demand, market level):")
+    for key, value in result["table_summary"].items():
+        print(f"  {key}: {value:.3f}")
+
+    plot_data = result["plot_data"]
+    print(f"\n  {'group':<6} {'count':>8} {'baseline':>12} {'new':>12} {'share0':>8} {'share1':>8}")
+    for i, group in enumerate(plot_data["groups"]):
+        print(
+            f"  {group:<6} {plot_data['count'][i]:>8} "
+            f"{plot_data['baseline_demand'][i]:>12.2f} {plot_data['new_demand'][i]:>12.2f} "
+            f"{plot_data['baseline_budget_share'][i]:>8.4f} {plot_data['new_budget_share'][i]:>8.4f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run one demand scenario without plotting.")
+    parser.add_argument("--households", type=float, default=200, help="number of households")
+    parser.add_argument("--price", type=float, default=None, help="new food price level")
+    parser.add_argument("--income", type=float, default=None, help="multiplicative income factor")
+    parser.add_argument("--grouping", default=None, help="quartiles, quintiles, deciles, ...")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sigma", type=float, default=DEFAULT_SIGMA)
+    parser.add_argument("--target-mean-income", type=float, default=DEFAULT_TARGET_MEAN_INCOME)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    if args.price is None and args.income is None:
+        parser.error("give --price and/or --income")
+
+    grouping = args.grouping
+    if grouping is not None and grouping.isdigit():
+        grouping = int(grouping)
+
+    result = compute(
+        int(args.households),
+        new_food_price=args.price,
+        new_income=args.income,
+        grouping=grouping,
+        seed=args.seed,
+        sigma=args.sigma,
+        target_mean_income=args.target_mean_income,
+    )
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        _print_result(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+dynamics.py
+
+Multi-period simulation along price and income paths.
+
+The main scripts compare ONE new price (or income) with the baseline.
+`simulate_paths` instead rolls the population forward over T periods:
+
+    price path   p[t]        (T,) common, or (T, N) per household
+    income path  g[t]        per-period growth rates, (T,) or (T, N)
+                             income[t] = income * prod_{s <= t} (1 + g[s])
+
+The long-run (target) demand of every period is the log-linear rule of
+`Household`:
+
+    ln q*[t] = ln q0 + e_y * ln(income[t] / income) + e_p * (ln p[t] - ln p0)
+
+and with partial adjustment (habit persistence) 0 < lambda <= 1 demand only
+closes part of the gap each period:
+
+    ln q[t] = ln q[t-1] + lambda * (ln q*[t] - ln q[t-1]),   q[-1] = q0
+
+This recursion is linear, so all periods are computed at once as a
+lower-triangular (T × T) matrix product over a (T × households) block,
+without Python loops over time or households. For paths common to all
+households the product is applied to the (T,) paths only, once.
+Quartile membership can be recomputed every period from the period's
+incomes. Survey weights of microdata populations weight every group sum.
+"""
+
+import numpy as np
+
+from inequality import weighted_quantile
+from sketches import QuantileSketch
+
+
+DEFAULT_CHUNK_SIZE = 100_000
+
+QUARTILE_PROBABILITIES = (0.25, 0.50, 0.75)
+
+
+def adjustment_matrix(n_periods, adjustment):
+    """
+    (T, T) lower-triangular matrix W with W[t, s] = lambda * (1 - lambda)^(t - s)
+    for s <= t, so that the partial-adjustment path is x = W @ x*.
+    """
+    if not 0.0 < adjustment <= 1.0:
+        raise ValueError("adjustment must be in (0, 1].")
+    lags = np.arange(n_periods)[:, None] - np.arange(n_periods)[None, :]
+    return np.where(lags >= 0, adjustment * (1.0 - adjustment) ** np.maximum(lags, 0), 0.0)
+
+
+def _as_path(path, n_periods, n_households, name):
+    path = np.asarray(path, dtype=np.float64)
+    if path.ndim == 1:
+        path = path[:, None]
+    if path.shape[0] != n_periods or path.shape[1] not in (1, n_households):
+        raise ValueError(f"{name} must have shape (T,) or (T, households).")
+    return path
+
+
+def period_cutoffs(population, log_income_factor, chunk_size=DEFAULT_CHUNK_SIZE,
+                   relative_accuracy=None):
+    """
+    (T, 3) income quartile cutoffs of every period, incomes being
+    income * exp(log_income_factor[t]) for log_income_factor of shape (T, N),
+    without building the (T, N) income matrix.
+
+    relative_accuracy None: exact (weighted) quantiles, one period at a
+    time (O(N) working memory). A value such as 1e-4 instead streams
+    household chunks through one QuantileSketch per period (O(T × chunk)
+    working memory), with every cutoff within that relative error.
+    """
+    n_periods, n_households = log_income_factor.shape
+    weight = population.weight
+
+    if relative_accuracy is None:
+        cutoffs = np.empty((n_periods, len(QUARTILE_PROBABILITIES)))
+        for t in range(n_periods):
+            incomes = population.income * np.exp(log_income_factor[t])
+            if weight is None:
+                cutoffs[t] = np.quantile(incomes, QUARTILE_PROBABILITIES)
+            else:
+                cutoffs[t] = weighted_quantile(incomes, QUARTILE_PROBABILITIES, weight)
+        return cutoffs
+
+    sketches = [QuantileSketch(relative_accuracy) for _ in range(n_periods)]
+    for start in range(0, n_households, chunk_size):
+        stop = min(start + chunk_size, n_households)
+        incomes = population.income[start:stop] * np.exp(log_income_factor[:, start:stop])
+        chunk_weight = None if weight is None else weight[start:stop]
+        for sketch, period_incomes in zip(sketches, incomes):
+            sketch.update(period_incomes, chunk_weight)
+    return np.array([sketch.quantiles(QUARTILE_PROBABILITIES) for sketch in sketches])
+
+
+def simulate_paths(
+    population,
+    price_path,
+    income_growth_path=None,
+    adjustment=1.0,
+    regroup=True,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    cutoff_accuracy=None,
+):
+    """
+    Simulate demand, budget shares and quartile membership over T periods.
+
+    Parameters
+    ----------
+    population : Population
+    price_path : array, shape (T,) or (T, N)
+        Food price level in every period.
+    income_growth_path : array, shape (T,) or (T, N), optional
+        Per-period income growth rates (0.01 = +1%); default no growth.
+    adjustment : float
+        Partial-adjustment speed lambda in (0, 1]; 1 = immediate adjustment.
+    regroup : bool
+        With per-household income paths, reassign income quartiles every
+        period from that period's incomes. Otherwise (and always for common
+        income paths, which preserve the ranking) baseline quartiles are kept.
+    chunk_size : int
+        Households per (T × chunk) working block.
+    cutoff_accuracy : float, optional
+        With regroup, take the per-period cutoffs from quantile sketches of
+        this relative accuracy instead of exact quantiles (see
+        period_cutoffs).
+
+    Returns
+    -------
+    dict with per-period arrays:
+        - "total_demand" (T,), "mean_budget_share" (T,)
+        - "groups": group labels
+        - "group_count" (T, G), "group_total_demand" (T, G),
+          "group_mean_demand" (T, G), "group_mean_budget_share" (T, G)
+    For a weighted population totals, means and group counts are weighted
+    by the survey weights.
+    """
+    n_households = population.size
+    price_path = np.asarray(price_path, dtype=np.float64)
+    n_periods = price_path.shape[0]
+
+    prices = _as_path(price_path, n_periods, n_households, "price_path")
+    if income_growth_path is None:
+        income_growth_path = np.zeros(n_periods)
+    # cumulative log income factor ln(income[t] / income)
+    log_income_factor = np.cumsum(
+        np.log1p(_as_path(income_growth_path, n_periods, n_households, "income_growth_path")),
+        axis=0,
+    )
+    log_prices = np.log(prices)
+
+    weights = adjustment_matrix(n_periods, adjustment)
+
+    common_paths = log_income_factor.shape[1] == 1 and prices.shape[1] == 1
+    if common_paths:
+        smoothed_income = weights @ log_income_factor[:, 0]
+        smoothed_price = weights @ log_prices[:, 0]
+        smoothed_one = weights @ np.ones(n_periods)
+
+    groups = list(population.group_labels)
+    n_groups = len(groups)
+
+    # Per-period quartile cutoffs, only needed when rankings can change
+    cutoffs = None
+    if regroup and log_income_factor.shape[1] > 1:
+        cutoffs = period_cutoffs(population, log_income_factor, chunk_size, cutoff_accuracy)
+
+    period_offset = (np.arange(n_periods) * n_groups)[:, None]
+    group_count = np.zeros((n_periods, n_groups))
+    group_total = np.zeros((n_periods, n_groups))
+    group_share = np.zeros((n_periods, n_groups))
+
+    for start in range(0, n_households, chunk_size):
+        stop = min(start + chunk_size, n_households)
+        cols = slice(start, stop) if log_income_factor.shape[1] > 1 else slice(None)
+        price_cols = slice(start, stop) if prices.shape[1] > 1 else slice(None)
+
+        e_income = population.income_elasticity_food[start:stop]
+        e_price = population.price_elasticity_food[start:stop]
+        income = population.income[start:stop]
+        household_weight = 1.0 if population.weight is None else population.weight[start:stop]
+
+        log_base_price = np.log(population.food_price[start:stop])
+        if common_paths:
+            # W is linear, so smooth the (T,) paths once and combine per household
+            gap = (
+                np.multiply.outer(smoothed_income, e_income)
+                + np.multiply.outer(smoothed_price, e_price)
+                - np.multiply.outer(smoothed_one, e_price * log_base_price)
+            )
+        else:
+            # gap between target and baseline ln q, for all periods at once
+            target = (
+                e_income * log_income_factor[:, cols]
+                + e_price * (log_prices[:, price_cols] - log_base_price)
+            )
+            gap = target if adjustment == 1.0 else weights @ target
+        q = population.food_baseline_buy[start:stop] * np.exp(gap)                 # (T, n)
+
+        income_t = income * np.exp(log_income_factor[:, cols])
+        w_new = prices[:, price_cols] * q / income_t
+
+        if cutoffs is None:
+            # fixed membership: reduce all periods with one product per column
+            one_hot = np.zeros((stop - start, n_groups))
+            one_hot[np.arange(stop - start), population.group_code[start:stop]] = household_weight
+            group_count += one_hot.sum(axis=0)
+            group_total += q @ one_hot
+            group_share += w_new @ one_hot
+        else:
+            codes = np.zeros(q.shape, dtype=np.intp)
+            for k in range(cutoffs.shape[1]):
+                codes += income_t > cutoffs[:, k:k + 1]
+
+            flat = (codes + period_offset).ravel()
+            size = n_periods * n_groups
+            for accumulator, values in (
+                (group_count, np.broadcast_to(household_weight, q.shape)),
+                (group_total, q * household_weight),
+                (group_share, w_new * household_weight),
+            ):
+                accumulator += np.bincount(
+                    flat, weights=values.ravel(), minlength=size
+                ).reshape(n_periods, n_groups)
+
+    safe_count = np.where(group_count > 0, group_count, 1.0)
+
+    return {
+        "groups": groups,
+        "total_demand": group_total.sum(axis=1),
+        "mean_budget_share": group_share.sum(axis=1) / population.total_weight,
+        "group_count": group_count,
+        "group_total_demand": group_total,
+        "group_mean_demand": group_total / safe_count,
+        "group_mean_budget_share": group_share / safe_count,
+    }
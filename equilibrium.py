@@ -0,0 +1,319 @@
+"""
+equilibrium.py
+
+Market-clearing food price.
+
+`economy_calculations` takes the food price as given. Here the price is
+solved for: given a supply curve and an optional income shock, find p
+such that aggregate household demand equals supply,
+
+    D(p) = sum_i q0_i * f^e_y,i * (p / p0_i)^e_p,i = S(p)
+
+Households that share (quartile, income elasticity, price elasticity,
+baseline price) respond identically to p and f, so D collapses to a sum
+over those K classes with sufficient statistics
+
+    A_k = sum_{i in k} q0_i * p0_k^(-e_p,k),   D(p) = sum_k A_k f^e_y,k p^e_p,k
+
+computed in one pass over the households (`DemandStatistics`). With the
+default constant elasticities K is the number of income groups, so every
+root-finder iteration costs O(scenarios × groups), not O(households).
+
+With per-household elasticity draws every household would be its own
+class. Above `max_classes` classes the elasticities are therefore binned
+(ELASTICITY_BINS equal-width bins per elasticity, within each group), and
+each bin keeps its A-weighted mean elasticity. Demand is then exact to
+first order in the within-bin spread: the relative error is about
+w^2 / 24 * (ln p)^2 for bin width w, below 1e-6 for typical draws and
+price or income changes of a few tens of percent.
+
+`solve_equilibrium` solves many supply scenarios at once with a vectorized
+Newton iteration on ln p, safeguarded by bisection on a bracket that is
+first widened until excess demand changes sign.
+
+Supply curves:
+    - IsoelasticSupply: S(p) = scale * (p / reference_price)^elasticity
+    - TabulatedSupply:  piecewise log-linear through (price, quantity) points
+"""
+
+import numpy as np
+
+from grouping import factorize_rows
+
+
+DEFAULT_BRACKET = (0.5, 2.0)
+MAX_BRACKET_EXPANSIONS = 60
+
+# DemandStatistics: more classes than this are binned by elasticity
+MAX_DEMAND_CLASSES = 4096
+ELASTICITY_BINS = 64
+
+
+# ---------- Demand side ----------
+
+def _bin_codes(values, bins):
+    """Equal-width bin index 0..bins-1 of every value (all 0 for a constant column)."""
+    values = np.asarray(values, dtype=np.float64)
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros(values.shape[0], dtype=np.intp)
+    return np.minimum(((values - low) * (bins / (high - low))).astype(np.intp), bins - 1)
+
+
+class DemandStatistics:
+    """
+    Per-class sufficient statistics of aggregate food demand.
+
+    Attributes (length K):
+        group_code, income_elasticity, price_elasticity, coefficient (A_k)
+    plus `groups` (labels of the G income groups).
+    """
+
+    def __init__(self, group_code, income_elasticity, price_elasticity, coefficient, groups):
+        self.group_code = np.asarray(group_code, dtype=np.intp)
+        self.income_elasticity = np.asarray(income_elasticity, dtype=np.float64)
+        self.price_elasticity = np.asarray(price_elasticity, dtype=np.float64)
+        self.coefficient = np.asarray(coefficient, dtype=np.float64)
+        self.groups = list(groups)
+
+    @classmethod
+    def from_population(cls, population, max_classes=MAX_DEMAND_CLASSES, bins=ELASTICITY_BINS):
+        """
+        Collapse households into classes with identical demand responses.
+
+        If there are more than `max_classes` such classes (heterogeneous
+        elasticities), households are grouped by `bins` elasticity bins
+        instead, each with its A-weighted mean elasticities (see the module
+        docstring); max_classes=None never bins.
+        """
+        # q0 * p0^(-e_p): the price term of each household relative to p = 1,
+        # times its survey weight for microdata populations
+        weights = population.food_baseline_buy * np.exp(
+            -population.price_elasticity_food * np.log(population.food_price)
+        )
+        if population.weight is not None:
+            weights = weights * population.weight
+        weights = np.asarray(weights, dtype=np.float64)
+
+        inverse, (group_code, income_elasticity, price_elasticity, _) = factorize_rows((
+            population.group_code,
+            population.income_elasticity_food,
+            population.price_elasticity_food,
+            population.food_price,
+        ))
+        coefficient = np.bincount(inverse, weights=weights, minlength=len(group_code))
+
+        if max_classes is not None and len(coefficient) > max_classes:
+            inverse, (group_code, _, _, _) = factorize_rows((
+                population.group_code,
+                _bin_codes(population.income_elasticity_food, bins),
+                _bin_codes(population.price_elasticity_food, bins),
+                population.food_price,
+            ))
+            n_classes = len(group_code)
+            coefficient = np.bincount(inverse, weights=weights, minlength=n_classes)
+            safe = np.where(coefficient > 0, coefficient, 1.0)
+
+            def class_mean(column):
+                column = np.asarray(column, dtype=np.float64)
+                return np.bincount(inverse, weights=weights * column, minlength=n_classes) / safe
+
+            income_elasticity = class_mean(population.income_elasticity_food)
+            price_elasticity = class_mean(population.price_elasticity_food)
+
+        return cls(
+            group_code=group_code,
+            income_elasticity=income_elasticity,
+            price_elasticity=price_elasticity,
+            coefficient=coefficient,
+            groups=population.group_labels,
+        )
+
+    @property
+    def n_classes(self):
+        return len(self.coefficient)
+
+    def class_demand(self, log_price, log_income_factor=0.0):
+        """(S, K) demand of every class at prices exp(log_price), shape (S,)."""
+        log_price = np.asarray(log_price, dtype=np.float64)[:, None]
+        log_income_factor = np.asarray(log_income_factor, dtype=np.float64)
+        if log_income_factor.ndim:
+            log_income_factor = log_income_factor[:, None]
+        return self.coefficient * np.exp(
+            self.income_elasticity * log_income_factor + self.price_elasticity * log_price
+        )
+
+    def demand(self, log_price, log_income_factor=0.0):
+        """Aggregate demand D and dD/d ln p, each of shape (S,)."""
+        q = self.class_demand(log_price, log_income_factor)
+        return q.sum(axis=1), q @ self.price_elasticity
+
+    def group_demand(self, log_price, log_income_factor=0.0):
+        """(S, G) aggregate demand per income group."""
+        q = self.class_demand(log_price, log_income_factor)
+        one_hot = np.zeros((self.n_classes, len(self.groups)))
+        one_hot[np.arange(self.n_classes), self.group_code] = 1.0
+        return q @ one_hot
+
+
+# ---------- Supply side ----------
+
+class IsoelasticSupply:
+    """
+    S(p) = scale * (p / reference_price)^elasticity.
+
+    scale and elasticity may be arrays of shape (S,), one per scenario.
+    """
+
+    def __init__(self, scale, elasticity, reference_price=1.0):
+        self.scale = np.atleast_1d(np.asarray(scale, dtype=np.float64))
+        self.elasticity = np.atleast_1d(np.asarray(elasticity, dtype=np.float64))
+        self.reference_price = reference_price
+        self.n_scenarios = np.broadcast(self.scale, self.elasticity).shape[0]
+
+    def supply(self, log_price):
+        """Supply S and dS/d ln p at prices exp(log_price), shape (S,)."""
+        s = self.scale * np.exp(self.elasticity * (log_price - np.log(self.reference_price)))
+        return s, self.elasticity * s
+
+
+class TabulatedSupply:
+    """
+    Supply tabulated at increasing prices, interpolated linearly in
+    (ln p, ln S) and extrapolated with the end segments' elasticities.
+
+    prices: (M,) common price grid; quantities: (M,) or (S, M), one row per
+    scenario, all positive.
+    """
+
+    def __init__(self, prices, quantities):
+        prices = np.asarray(prices, dtype=np.float64)
+        quantities = np.atleast_2d(np.asarray(quantities, dtype=np.float64))
+        if prices.ndim != 1 or len(prices) < 2 or np.any(np.diff(prices) <= 0):
+            raise ValueError("prices must be an increasing 1-D grid with at least two points.")
+        if quantities.shape[1] != len(prices) or np.any(quantities <= 0):
+            raise ValueError("quantities must be positive with one column per price.")
+
+        self.log_prices = np.log(prices)
+        self.log_quantities = np.log(quantities)
+        # (S, M - 1) segment elasticities d ln S / d ln p
+        self.slopes = np.diff(self.log_quantities, axis=1) / np.diff(self.log_prices)
+        self.n_scenarios = quantities.shape[0]
+
+    def supply(self, log_price):
+        """Supply S and dS/d ln p at prices exp(log_price), shape (S,)."""
+        segment = np.clip(
+            np.searchsorted(self.log_prices, log_price) - 1, 0, len(self.log_prices) - 2
+        )
+        rows = np.arange(self.log_quantities.shape[0]) if self.n_scenarios > 1 else 0
+        slope = self.slopes[rows, segment]
+        log_s = self.log_quantities[rows, segment] + slope * (log_price - self.log_prices[segment])
+        s = np.exp(log_s)
+        return s, slope * s
+
+
+# ---------- Solver ----------
+
+def _bracket(excess, lo, hi):
+    """Widen [lo, hi] (in ln p) per scenario until excess(lo) >= 0 >= excess(hi)."""
+    for _ in range(MAX_BRACKET_EXPANSIONS):
+        f_lo, f_hi = excess(lo)[0], excess(hi)[0]
+        low_bad = f_lo < 0
+        high_bad = f_hi > 0
+        if not np.any(low_bad | high_bad):
+            break
+        width = hi - lo
+        lo = np.where(low_bad, lo - width, lo)
+        hi = np.where(high_bad, hi + width, hi)
+    return lo, hi
+
+
+def solve_equilibrium(
+    population=None,
+    supply=None,
+    income_factor=None,
+    statistics=None,
+    bracket=DEFAULT_BRACKET,
+    tol=1e-10,
+    max_iter=100,
+):
+    """
+    Market-clearing food price for every supply scenario.
+
+    Parameters
+    ----------
+    population : Population, optional
+        Used to build DemandStatistics; not needed if `statistics` is given
+        (reuse one DemandStatistics for many calls).
+    supply : IsoelasticSupply or TabulatedSupply
+        S scenarios.
+    income_factor : float or array of shape (S,), optional
+        Multiplicative income shock applied before clearing the market.
+    bracket : (low, high)
+        Initial price bracket; widened automatically per scenario.
+    tol : float
+        Convergence tolerance on |ln D - ln S|.
+
+    Returns
+    -------
+    dict with:
+        - "price" (S,): equilibrium price (nan if no sign change was found)
+        - "quantity" (S,): traded quantity (nan likewise)
+        - "converged" (S,) bool, "iterations"
+        - "groups", "group_demand" (S, G): demand per income group at the
+          equilibrium price (nan rows where no sign change was found)
+    """
+    if statistics is None:
+        statistics = DemandStatistics.from_population(population)
+
+    n_scenarios = supply.n_scenarios
+    if income_factor is None:
+        log_income_factor = np.zeros(n_scenarios)
+    else:
+        log_income_factor = np.broadcast_to(
+            np.log(np.asarray(income_factor, dtype=np.float64)), (n_scenarios,)
+        )
+
+    def excess(log_price):
+        # ln D - ln S is monotone in ln p whenever D falls and S rises
+        d, dd = statistics.demand(log_price, log_income_factor)
+        s, ds = supply.supply(log_price)
+        return np.log(d) - np.log(s), dd / d - ds / s
+
+    lo = np.full(n_scenarios, np.log(bracket[0]))
+    hi = np.full(n_scenarios, np.log(bracket[1]))
+    lo, hi = _bracket(excess, lo, hi)
+    bracketed = (excess(lo)[0] >= 0) & (excess(hi)[0] <= 0)
+
+    x = 0.5 * (lo + hi)
+    converged = ~bracketed
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        f, df = excess(x)
+        lo = np.where(f > 0, x, lo)
+        hi = np.where(f > 0, hi, x)
+
+        done = np.abs(f) < tol
+        converged |= done
+        if np.all(converged):
+            break
+
+        # Newton step on ln p; fall back to bisection outside the bracket
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = x - f / df
+        inside = np.isfinite(step) & (step > lo) & (step < hi)
+        x = np.where(converged, x, np.where(inside, step, 0.5 * (lo + hi)))
+
+    price = np.where(bracketed, np.exp(x), np.nan)
+    quantity, _ = supply.supply(x)
+
+    return {
+        "price": price,
+        "quantity": np.where(bracketed, quantity, np.nan),
+        "converged": converged & bracketed,
+        "iterations": iterations,
+        "groups": statistics.groups,
+        "group_demand": np.where(
+            bracketed[:, None], statistics.group_demand(x, log_income_factor), np.nan
+        ),
+    }
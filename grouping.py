@@ -0,0 +1,239 @@
+"""
+grouping.py
+
+Grouped reductions over an integer group code.
+
+Households are assigned an integer code 0..G-1 (quartiles, deciles,
+percentiles or user-defined income bands) and every statistic is computed
+for all groups at once with np.bincount, instead of rescanning the
+population once per group. The cost of a summary table is therefore
+O(N) whether it has 4 rows or 100.
+"""
+
+import numpy as np
+
+from inequality import weighted_quantile
+
+
+# Named quantile groupings: name -> (number of groups, label prefix)
+NAMED_GROUPINGS = {
+    "quartiles": (4, "Q"),
+    "quintiles": (5, "V"),
+    "deciles": (10, "D"),
+    "percentiles": (100, "P"),
+}
+
+
+# Households per bincount call in grouped_stats (bounds full-length temporaries)
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def _code_dtype(n_groups):
+    return np.uint8 if n_groups <= np.iinfo(np.uint8).max + 1 else np.uint16
+
+
+def quantile_group_codes(values, n_groups, label_prefix="G", weights=None):
+    """
+    Split households into `n_groups` equal-count groups by `values`.
+
+    Uses right-closed bins on the empirical quantiles (the same rule as the
+    quartile assignment in population.py) and returns (codes, labels).
+    With survey `weights` the cutoffs are weighted quantiles, so the groups
+    hold equal shares of the represented households instead of the rows.
+    """
+    values = np.asarray(values)
+    probabilities = np.arange(1, n_groups) / n_groups
+    if weights is None:
+        cutoffs = np.quantile(values, probabilities)
+    else:
+        cutoffs = weighted_quantile(values, probabilities, weights)
+    codes = np.digitize(values, cutoffs, right=True).astype(_code_dtype(n_groups))
+    labels = [f"{label_prefix}{k + 1}" for k in range(n_groups)]
+    return codes, labels
+
+
+def band_labels(edges):
+    """Default labels of the bands between `edges` ("<= a", "a-b", "> b")."""
+    bounds = [None] + [float(edge) for edge in edges] + [None]
+    labels = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        if low is None:
+            labels.append(f"<= {high:g}")
+        elif high is None:
+            labels.append(f"> {low:g}")
+        else:
+            labels.append(f"{low:g}-{high:g}")
+    return labels
+
+
+def band_group_codes(values, edges, labels=None):
+    """
+    Assign households to user-defined bands of `values`.
+
+    `edges` are the inner, increasing band boundaries: with edges [a, b],
+    band 0 is values <= a, band 1 is a < values <= b and band 2 is > b.
+    Returns (codes, labels); default labels describe the bounds.
+    """
+    edges = np.asarray(edges, dtype=np.float64)
+    if edges.ndim != 1 or np.any(np.diff(edges) <= 0):
+        raise ValueError("edges must be a 1-D, strictly increasing sequence.")
+
+    n_groups = edges.shape[0] + 1
+    codes = np.digitize(values, edges, right=True).astype(_code_dtype(n_groups))
+
+    if labels is None:
+        labels = band_labels(edges)
+    elif len(labels) != n_groups:
+        raise ValueError(f"Expected {n_groups} labels for {edges.shape[0]} edges.")
+
+    return codes, list(labels)
+
+
+def population_grouping(population, grouping=None):
+    """
+    Resolve a grouping specification into (codes, labels) for a population.
+
+        - None or "quartiles": the quartile codes stored on the population
+        - "quintiles", "deciles", "percentiles": income quantile groups
+        - an int n: n equal-count income groups
+        - a sequence of numbers: inner edges of user-defined income bands
+
+    Quantile groups of a weighted population use its survey weights.
+    """
+    if grouping is None or (isinstance(grouping, str) and grouping == "quartiles"):
+        return population.group_code, list(population.group_labels)
+
+    if isinstance(grouping, str):
+        if grouping not in NAMED_GROUPINGS:
+            raise ValueError(
+                f"Unknown grouping {grouping!r}; expected one of {sorted(NAMED_GROUPINGS)}."
+            )
+        n_groups, prefix = NAMED_GROUPINGS[grouping]
+        return quantile_group_codes(
+            population.income, n_groups, label_prefix=prefix, weights=population.weight
+        )
+
+    if isinstance(grouping, (int, np.integer)):
+        return quantile_group_codes(population.income, int(grouping), weights=population.weight)
+
+    return band_group_codes(population.income, grouping)
+
+
+def grouped_stats(codes, n_groups, columns, weights=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Count, sum, mean and variance of several columns for all groups at once.
+
+    Parameters
+    ----------
+    codes : array of int, shape (N,)
+        Group code of every household, 0..n_groups-1.
+    n_groups : int
+        Number of groups G (groups may be empty).
+    columns : dict
+        name -> array of shape (N,), any float dtype.
+    weights : array, shape (N,), optional
+        Household weights; means and variances are then weighted.
+    chunk_size : int
+        Households per bincount call. Codes and values are widened to
+        intp / float64 one chunk at a time, so compact (uint8 / float32)
+        columns are never copied at full length; all sums accumulate in
+        float64. Every column is read once, in a single pass over the
+        chunks, which matters for memory-mapped populations.
+
+    Returns
+    -------
+    dict with "count" (households per group), "weight" (sum of weights per
+    group; equals count when unweighted) and, for every column name,
+    {"sum", "mean", "var"} arrays of shape (G,). Empty groups report 0.0.
+    """
+    n = len(codes)
+    count = np.zeros(n_groups)
+    weight = np.zeros(n_groups)
+    sums = {name: np.zeros(n_groups) for name in columns}
+    means = {name: np.zeros(n_groups) for name in columns}
+    deviation_sq_sums = {name: np.zeros(n_groups) for name in columns}
+
+    # One pass over the chunks: per chunk, every column is reduced around its
+    # chunk group means and merged into the running group statistics
+    # with the pairwise update of Chan et al.
+    for start in range(0, n, chunk_size):
+        chunk = slice(start, min(start + chunk_size, n))
+        chunk_code = np.asarray(codes[chunk], dtype=np.intp)
+        chunk_count = np.bincount(chunk_code, minlength=n_groups).astype(np.float64)
+        if weights is None:
+            chunk_weight = None
+            chunk_group_weight = chunk_count
+        else:
+            chunk_weight = np.asarray(weights[chunk], dtype=np.float64)
+            chunk_group_weight = np.bincount(chunk_code, weights=chunk_weight, minlength=n_groups)
+
+        merged_weight = weight + chunk_group_weight
+        safe_chunk_weight = np.where(chunk_group_weight > 0, chunk_group_weight, 1.0)
+        safe_merged_weight = np.where(merged_weight > 0, merged_weight, 1.0)
+
+        for name, values in columns.items():
+            chunk_values = np.asarray(values[chunk], dtype=np.float64)
+            weighted = chunk_values if chunk_weight is None else chunk_values * chunk_weight
+            chunk_sums = np.bincount(chunk_code, weights=weighted, minlength=n_groups)
+            chunk_means = chunk_sums / safe_chunk_weight
+
+            # deviations around the chunk means also correct their rounding,
+            # which the merge below would otherwise amplify
+            deviation = chunk_values - chunk_means[chunk_code]
+            weighted_deviation = deviation if chunk_weight is None else deviation * chunk_weight
+            correction = np.bincount(chunk_code, weights=weighted_deviation, minlength=n_groups)
+            chunk_deviation_sq_sums = np.bincount(
+                chunk_code, weights=weighted_deviation * deviation, minlength=n_groups
+            ) - correction ** 2 / safe_chunk_weight
+            chunk_means += correction / safe_chunk_weight
+
+            delta = chunk_means - means[name]
+            deviation_sq_sums[name] += chunk_deviation_sq_sums + (
+                delta ** 2 * weight * chunk_group_weight / safe_merged_weight
+            )
+            means[name] += delta * chunk_group_weight / safe_merged_weight
+            sums[name] += chunk_sums
+
+        count += chunk_count
+        weight = merged_weight
+
+    if weights is None:
+        weight = count
+
+    nonempty = weight > 0
+    safe_weight = np.where(nonempty, weight, 1.0)
+
+    result = {"count": count, "weight": weight}
+    for name in columns:
+        result[name] = {
+            "sum": sums[name],
+            "mean": np.where(nonempty, sums[name] / safe_weight, 0.0),
+            "var": np.where(nonempty, deviation_sq_sums[name] / safe_weight, 0.0),
+        }
+
+    return result
+
+
+def factorize_rows(columns):
+    """
+    Assign a class code to every distinct combination of column values.
+
+    Each column is factorized separately and the codes are combined into
+    one integer key, which is much faster than np.unique(axis=0) on the
+    stacked rows. Returns (codes, values): codes of shape (N,) in 0..K-1
+    and, per column, the (K,) value of that column in each class.
+    """
+    key = np.zeros(len(columns[0]), dtype=np.int64)
+    uniques = []
+    for column in columns:
+        column_values, column_codes = np.unique(column, return_inverse=True)
+        key = key * len(column_values) + column_codes.reshape(-1)
+        uniques.append(column_values)
+    class_keys, codes = np.unique(key, return_inverse=True)
+
+    # decode the class keys back into column values
+    values = []
+    for column_values in reversed(uniques):
+        values.append(column_values[class_keys % len(column_values)])
+        class_keys = class_keys // len(column_values)
+    return codes.reshape(-1), values[::-1]
@@ -0,0 +1,223 @@
+"""
+inequality.py
+
+Empirical inequality diagnostics for generated populations.
+
+sigma_calibration.py gives the THEORETICAL Gini and P90/P10 of a lognormal;
+these functions measure what a population actually looks like, on its
+baseline `income` or on scenario-adjusted `current_income`:
+
+    - gini: exact, O(n log n) sort-based, optionally weighted
+    - GiniSketch: streaming, mergeable approximation in O(n)
+    - weighted_quantile / percentile_ratio: (weighted) percentiles
+    - lorenz_curve: points of the Lorenz curve
+    - inequality_report: measured vs target Gini and P90/P10 for an economy
+"""
+
+import math
+
+import numpy as np
+
+from sketches import QuantileSketch, bucket_sums
+
+
+# Calibration targets quoted in Economy.create_economy
+DEFAULT_TARGETS = {"gini": 1.0 / 3.0, "p90_p10": 4.0}
+
+
+def _sorted_with_weights(values, weights=None):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    if weights is None:
+        sorted_weights = np.ones_like(sorted_values)
+    else:
+        sorted_weights = np.asarray(weights, dtype=np.float64).ravel()[order]
+    return sorted_values, sorted_weights
+
+
+def _gini_from_sorted(sorted_values, sorted_weights):
+    """
+    Gini from values sorted ascending, as one minus twice the area under the
+    Lorenz curve (trapezoids):
+
+        G = 1 - sum_i w_i * (L_{i-1} + L_i) / W
+    """
+    total_weight = np.sum(sorted_weights)
+    cumulative_income = np.cumsum(sorted_weights * sorted_values)
+    total_income = cumulative_income[-1]
+    if total_weight <= 0 or total_income <= 0:
+        return 0.0
+
+    lorenz = cumulative_income / total_income
+    lorenz_previous = np.concatenate(([0.0], lorenz[:-1]))
+    return float(1.0 - np.sum(sorted_weights * (lorenz_previous + lorenz)) / total_weight)
+
+
+def gini(values, weights=None):
+    """
+    Empirical Gini coefficient of non-negative values (one sort, O(n log n)).
+
+    With weights, each value counts in proportion to its weight (e.g. survey
+    weights). Unweighted, this equals the usual
+        G = 2 * sum_i i * x_(i) / (n * sum x) - (n + 1) / n.
+    """
+    sorted_values, sorted_weights = _sorted_with_weights(values, weights)
+    if sorted_values.size == 0:
+        return 0.0
+    return _gini_from_sorted(sorted_values, sorted_weights)
+
+
+def _quantiles_from_sorted(sorted_values, sorted_weights, probabilities):
+    # inverted CDF: first value whose cumulative weight reaches p * W
+    cumulative = np.cumsum(sorted_weights)
+    ranks = np.asarray(probabilities, dtype=np.float64) * cumulative[-1]
+    index = np.searchsorted(cumulative, ranks, side="left")
+    return sorted_values[np.minimum(index, sorted_values.size - 1)]
+
+
+def weighted_quantile(values, probabilities, weights=None):
+    """
+    Quantiles (probabilities in [0, 1]) of values with optional weights.
+
+    Uses the inverted empirical CDF: the smallest value whose cumulative
+    weight share is at least p.
+    """
+    sorted_values, sorted_weights = _sorted_with_weights(values, weights)
+    return _quantiles_from_sorted(sorted_values, sorted_weights, probabilities)
+
+
+def percentile_ratio(values, upper=90, lower=10, weights=None):
+    """Ratio of the upper to the lower percentile, e.g. P90/P10."""
+    high, low = weighted_quantile(values, [upper / 100.0, lower / 100.0], weights)
+    return float(high / low)
+
+
+def lorenz_curve(values, weights=None, points=None):
+    """
+    Lorenz curve of non-negative values.
+
+    Returns (population_share, income_share), both starting at 0 and ending
+    at 1. With `points`, the curve is interpolated onto that many evenly
+    spaced population shares (useful for plotting huge populations).
+    """
+    sorted_values, sorted_weights = _sorted_with_weights(values, weights)
+    population_share = np.concatenate(([0.0], np.cumsum(sorted_weights)))
+    income_share = np.concatenate(([0.0], np.cumsum(sorted_weights * sorted_values)))
+    population_share /= population_share[-1]
+    income_share /= income_share[-1]
+
+    if points is None:
+        return population_share, income_share
+
+    grid = np.linspace(0.0, 1.0, points)
+    return grid, np.interp(grid, population_share, income_share)
+
+
+class GiniSketch:
+    """
+    Streaming, mergeable approximation of the Gini coefficient.
+
+    Values are binned into log-spaced buckets of relative width
+    `relative_accuracy` (as in sketches.QuantileSketch), keeping the weight
+    and the income total of each bucket. The Gini of the bucketed data
+    ignores only the inequality inside each bucket, so the absolute error is
+    at most about relative_accuracy. Updates are O(chunk) (np.bincount over
+    bucket keys) and need no sort of the full population.
+    """
+
+    def __init__(self, relative_accuracy=0.001):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self.buckets = {}   # bucket index -> [weight, income]
+        self.zero_weight = 0.0
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+        if np.any(values < 0):
+            raise ValueError("GiniSketch only supports non-negative values.")
+        weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64).ravel()
+
+        positive = values > 0
+        self.zero_weight += float(np.sum(weights[~positive]))
+
+        keys = np.ceil(np.log(values[positive]) / self._log_gamma).astype(np.int64)
+        unique_keys, bucket_weight, bucket_income = bucket_sums(
+            keys, weights[positive], weights[positive] * values[positive]
+        )
+        for key, w, y in zip(unique_keys.tolist(), bucket_weight.tolist(), bucket_income.tolist()):
+            entry = self.buckets.setdefault(key, [0.0, 0.0])
+            entry[0] += w
+            entry[1] += y
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative_accuracy.")
+        for key, (w, y) in other.buckets.items():
+            entry = self.buckets.setdefault(key, [0.0, 0.0])
+            entry[0] += w
+            entry[1] += y
+        self.zero_weight += other.zero_weight
+        return self
+
+    @property
+    def gini(self):
+        if not self.buckets:
+            return 0.0
+        keys = sorted(self.buckets)
+        weight = np.array([self.zero_weight] + [self.buckets[k][0] for k in keys])
+        income = np.array([0.0] + [self.buckets[k][1] for k in keys])
+        # each bucket is treated as households with equal (mean) income
+        mean_income = np.divide(income, weight, out=np.zeros_like(income), where=weight > 0)
+        return _gini_from_sorted(mean_income, weight)
+
+
+def inequality_report(economy, use_current_income=False, targets=None, weights=None,
+                      approximate=False, relative_accuracy=0.001):
+    """
+    Measure Gini and P90/P10 of an economy's incomes and compare them with
+    the calibration targets.
+
+    use_current_income: measure the scenario-adjusted current_income column
+    instead of baseline income.
+    targets: dict with "gini" and/or "p90_p10" (default: 1/3 and 4).
+    weights: household weights; defaults to the population's survey
+    weights (None for synthetic populations).
+    approximate: use GiniSketch / QuantileSketch in O(n) instead of one
+    O(n log n) sort, for very large populations.
+
+    Returns {"gini": {...}, "p90_p10": {...}} where each entry holds
+    "measured", "target" and "error" (measured - target).
+    """
+    population = economy.population
+    incomes = population.current_income if use_current_income else population.income
+    targets = DEFAULT_TARGETS if targets is None else targets
+    if weights is None:
+        weights = population.weight
+
+    if approximate:
+        gini_value = GiniSketch(relative_accuracy).update(incomes, weights).gini
+        p90, p10 = QuantileSketch(relative_accuracy).update(incomes, weights).quantiles([0.9, 0.1])
+    else:
+        # one sort shared by the Gini and the percentiles
+        sorted_values, sorted_weights = _sorted_with_weights(incomes, weights)
+        gini_value = _gini_from_sorted(sorted_values, sorted_weights)
+        p90, p10 = _quantiles_from_sorted(sorted_values, sorted_weights, [0.9, 0.1])
+
+    measured = {"gini": gini_value, "p90_p10": float(p90 / p10)}
+
+    report = {}
+    for name, value in measured.items():
+        target = targets.get(name)
+        report[name] = {
+            "measured": value,
+            "target": target,
+            "error": None if target is None else value - target,
+        }
+    return report
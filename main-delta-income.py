@@ -13,7 +13,6 @@ from plots import (
     plot_demand_by_income_group_income_change,
     plot_budget_share_by_income_group_income_change,
 )
-import matplotlib.pyplot as plt
 
 
 def main():
@@ -54,6 +53,7 @@ def main():
         plot_data,
         income_factor=income_factor,
     )
+    import matplotlib.pyplot as plt
     plt.show()
 
 
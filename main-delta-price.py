@@ -13,7 +13,6 @@ from plots import (
     plot_demand_by_income_group,
     plot_budget_share_by_income_group,
 )
-import matplotlib.pyplot as plt
 
 
 def main():
@@ -49,6 +48,7 @@ def main():
     #    b) Budget share by income group
     plot_budget_share_by_income_group(plot_data, new_price=new_price)
 
+    import matplotlib.pyplot as plt
     plt.show()
 
 
@@ -0,0 +1,182 @@
+"""
+microdata.py
+
+Household survey microdata as an alternative to synthetic generation.
+
+Each row of the input is one sampled household with its income, its food
+spending and a survey weight (the number of households it represents).
+`load_microdata` streams the file in chunks of `chunk_size` rows straight
+into preallocated population columns, without building Python objects:
+
+    - CSV: the header names the columns; rows are parsed with np.loadtxt
+      one chunk at a time
+    - NPY: a structured array (field names as column names), opened
+      memory-mapped and copied chunk by chunk
+
+The food budget share is spend / income. Income groups are WEIGHTED
+quartiles, so a 50k-row weighted sample is grouped like the population
+it represents, and every aggregate and grouped statistic downstream
+(demand.run_scenario, Economy.build_summary_and_plot_data, sweeps,
+welfare, equilibrium) is weighted by the `weight` column.
+"""
+
+import itertools
+
+import numpy as np
+
+from inequality import weighted_quantile
+from population import (
+    Population,
+    assign_quartile_codes,
+    DEFAULT_DTYPE,
+    DEFAULT_FOOD_PRICE,
+    DEFAULT_INCOME_ELASTICITY_FOOD,
+    DEFAULT_PRICE_ELASTICITY_FOOD,
+)
+
+
+# Rows parsed / copied per chunk
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Bytes per read when counting CSV rows
+_COUNT_BLOCK = 1 << 24
+
+
+def _count_csv_rows(path):
+    """Upper bound on the data rows: lines after the header (one binary pass)."""
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(_COUNT_BLOCK)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1   # last line without a trailing newline
+    return max(lines - 1, 0)
+
+
+def _column_indices(names, wanted, path):
+    indices = []
+    for name in wanted:
+        if name not in names:
+            raise ValueError(f"Column {name!r} not found in {path}; available: {list(names)}.")
+        indices.append(names.index(name))
+    return indices
+
+
+def _csv_chunks(path, wanted, delimiter, chunk_size):
+    """Yield (rows, len(wanted)) float64 blocks of the requested columns."""
+    with open(path) as f:
+        names = [name.strip() for name in f.readline().rstrip("\r\n").split(delimiter)]
+        usecols = _column_indices(names, wanted, path)
+        while True:
+            lines = list(itertools.islice(f, chunk_size))
+            if not lines:
+                break
+            yield np.loadtxt(lines, delimiter=delimiter, usecols=usecols, ndmin=2, dtype=np.float64)
+
+
+def _npy_chunks(data, wanted, path, chunk_size):
+    names = data.dtype.names
+    if names is None:
+        raise ValueError(f"{path} must hold a structured array with named fields.")
+    _column_indices(names, wanted, path)
+    for start in range(0, data.shape[0], chunk_size):
+        chunk = data[start:start + chunk_size]
+        yield np.column_stack([np.asarray(chunk[name], dtype=np.float64) for name in wanted])
+
+
+def load_microdata(
+    path,
+    income_column="income",
+    food_spend_column="food_spend",
+    weight_column="weight",
+    delimiter=",",
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+    price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+    food_price=DEFAULT_FOOD_PRICE,
+    dtype=DEFAULT_DTYPE,
+):
+    """
+    Read household microdata from a .csv or structured .npy file into a
+    weighted Population.
+
+    Parameters
+    ----------
+    path : str
+        CSV file with a header row, or .npy file with a structured array.
+    income_column, food_spend_column : str
+        Column names of household income and food spending (money).
+    weight_column : str or None
+        Column name of the survey weights; None loads an unweighted sample.
+    delimiter : str
+        CSV field separator.
+    chunk_size : int
+        Rows parsed and converted at a time; only the output columns are
+        held at full length.
+    income_elasticity_food, price_elasticity_food, food_price :
+        Demand parameters, scalars (as in Population) since the survey
+        does not observe them.
+    dtype :
+        Storage precision of the columns (COMPACT_DTYPE for very large files).
+
+    Every income must be positive and finite, food spending and weights
+    non-negative and finite; otherwise a ValueError names the first bad row.
+    """
+    wanted = [income_column, food_spend_column]
+    if weight_column is not None:
+        wanted.append(weight_column)
+
+    if str(path).endswith(".npy"):
+        data = np.load(path, mmap_mode="r")
+        n_rows = data.shape[0]
+        chunks = _npy_chunks(data, wanted, path, chunk_size)
+    else:
+        n_rows = _count_csv_rows(path)
+        chunks = _csv_chunks(path, wanted, delimiter, chunk_size)
+
+    income = np.empty(n_rows, dtype=dtype)
+    share = np.empty(n_rows, dtype=dtype)
+    weight = None if weight_column is None else np.empty(n_rows, dtype=dtype)
+
+    stop = 0
+    for block in chunks:
+        start, stop = stop, stop + block.shape[0]
+
+        block_income, block_spend = block[:, 0], block[:, 1]
+        bad = ~np.isfinite(block).all(axis=1) | (block_income <= 0) | (block_spend < 0)
+        if weight_column is not None:
+            bad |= block[:, 2] < 0
+        if np.any(bad):
+            raise ValueError(
+                f"Invalid household in {path} at data row {start + int(np.argmax(bad))}: "
+                "income must be positive and spending and weight non-negative."
+            )
+
+        income[start:stop] = block_income
+        share[start:stop] = block_spend / block_income
+        if weight is not None:
+            weight[start:stop] = block[:, 2]
+
+    if stop != n_rows:
+        # blank lines are counted but not parsed
+        income, share = income[:stop], share[:stop]
+        weight = None if weight is None else weight[:stop]
+    if stop == 0:
+        raise ValueError(f"No households in {path}.")
+
+    cutoffs = weighted_quantile(income, [0.25, 0.50, 0.75], weight)
+    return Population(
+        income=income,
+        food_budget_share=share,
+        group_code=assign_quartile_codes(income, cutoffs),
+        income_elasticity_food=income_elasticity_food,
+        price_elasticity_food=price_elasticity_food,
+        food_price=food_price,
+        dtype=dtype,
+        weight=weight,
+    )
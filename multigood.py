@@ -0,0 +1,221 @@
+"""
+multigood.py
+
+K-good extension of the log-linear demand model.
+
+`Household` models food only, with scalar income and price elasticities.
+A `MultiGoodSystem` holds, per income group g:
+
+    - income elasticities       eta[g, k]
+    - own/cross price matrices  E[g, k, j]   (demand for good k w.r.t. price j)
+
+and every household has a budget share w[n, k] for each good. Demand is
+
+    ln q[n, k] = ln q0[n, k] + eta[g, k] * ln f + sum_j E[g, k, j] * dln p[j]
+
+with q0[n, k] = income[n] * w[n, k] / p0[k]. The scenario terms are one
+batched matrix product (scenarios × groups × goods), gathered onto the
+households by group code, so food/energy/housing shocks are evaluated
+together for millions of households without per-household Python code.
+"""
+
+import numpy as np
+
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+
+def draw_budget_shares(population, extra_bands, rng=None):
+    """
+    (N, K) budget shares: food from the population, then one column per
+    extra good, drawn uniformly from a per-group band like ENGEL_SHARE_BANDS.
+
+    extra_bands: list with one entry per extra good; each entry is a
+    sequence of (low, high) bands, one per income group.
+    """
+    rng = np.random if rng is None else rng
+    codes = population.group_code
+    shares = [population.food_budget_share]
+    for bands in extra_bands:
+        column = np.empty(population.size, dtype=np.float64)
+        for code, (low, high) in enumerate(bands):
+            mask = codes == code
+            column[mask] = rng.uniform(low, high, size=int(mask.sum()))
+        shares.append(column)
+    return np.column_stack(shares)
+
+
+class MultiGoodSystem:
+    """
+    Per-group income elasticities and price-elasticity matrices for K goods.
+
+    Parameters
+    ----------
+    goods : list of str
+        Good names, length K (e.g. ["food", "energy", "housing"]).
+    income_elasticities : array, shape (K,) or (G, K)
+    price_elasticities : array, shape (K, K) or (G, K, K)
+        Row k holds the elasticities of good k with respect to every price;
+        the diagonal holds own-price elasticities. Inputs without a group
+        axis apply to all groups; otherwise G must match the population's
+        number of income groups (household_demand and evaluate raise
+        ValueError if it does not).
+    baseline_prices : array, shape (K,), optional
+        Baseline price of every good (default 1.0).
+    """
+
+    def __init__(self, goods, income_elasticities, price_elasticities, baseline_prices=None):
+        self.goods = list(goods)
+        k = len(self.goods)
+
+        eta = np.asarray(income_elasticities, dtype=np.float64)
+        elasticity = np.asarray(price_elasticities, dtype=np.float64)
+        if eta.ndim == 1:
+            eta = eta[None, :]
+        if elasticity.ndim == 2:
+            elasticity = elasticity[None, :, :]
+
+        if eta.shape[-1] != k or elasticity.shape[-2:] != (k, k):
+            raise ValueError(f"Elasticities do not match the {k} goods.")
+        n_groups = max(eta.shape[0], elasticity.shape[0])
+        if eta.shape[0] not in (1, n_groups) or elasticity.shape[0] not in (1, n_groups):
+            raise ValueError("Income and price elasticities have different numbers of groups.")
+        eta = np.broadcast_to(eta, (n_groups, k))
+        elasticity = np.broadcast_to(elasticity, (n_groups, k, k))
+
+        self.income_elasticities = eta          # (G, K)
+        self.price_elasticities = elasticity    # (G, K, K)
+        self.baseline_prices = (
+            np.ones(k) if baseline_prices is None else np.asarray(baseline_prices, dtype=np.float64)
+        )
+
+    @property
+    def n_goods(self):
+        return len(self.goods)
+
+    @property
+    def n_groups(self):
+        return self.income_elasticities.shape[0]
+
+    def _check_groups(self, population):
+        """A per-group system must have exactly one entry per income group."""
+        n_groups = len(population.group_labels)
+        if self.n_groups != 1 and self.n_groups != n_groups:
+            raise ValueError(
+                f"The system has elasticities for {self.n_groups} groups, "
+                f"the population has {n_groups} income groups."
+            )
+
+    def log_multipliers(self, price_levels, income_factors):
+        """
+        Scenario term of ln q per (scenario, group, good):
+
+            M[s, g, k] = eta[g, k] * ln f[s] + sum_j E[g, k, j] * dln p[s, j]
+
+        price_levels: (K,) or (S, K); income_factors: scalar or (S,).
+        """
+        price_levels = np.atleast_2d(np.asarray(price_levels, dtype=np.float64))
+        income_factors = np.asarray(income_factors, dtype=np.float64).reshape(-1)
+        n_scenarios = max(price_levels.shape[0], income_factors.shape[0])
+        price_levels = np.broadcast_to(price_levels, (n_scenarios, self.n_goods))
+        income_factors = np.broadcast_to(income_factors, (n_scenarios,))
+
+        d_log_price = np.log(price_levels) - np.log(self.baseline_prices)
+        price_term = np.einsum("gkj,sj->sgk", self.price_elasticities, d_log_price)
+        income_term = np.log(income_factors)[:, None, None] * self.income_elasticities[None, :, :]
+        return price_term + income_term
+
+    def household_demand(self, population, budget_shares, price_levels, income_factor=1.0,
+                         adding_up=False):
+        """
+        (N, K) quantities of every good for one scenario.
+
+        adding_up: treat the K goods as the complete budget (shares must sum
+        to 1) and rescale each household's spending so that it exactly
+        exhausts the new income, which the log-linear form does not
+        guarantee on its own.
+        """
+        self._check_groups(population)
+        multipliers = self.log_multipliers(price_levels, income_factor)[0]      # (G, K)
+        price_levels = np.broadcast_to(np.asarray(price_levels, dtype=np.float64), (self.n_goods,))
+        return self._demand_block(
+            population.income, budget_shares, population.group_code,
+            np.exp(multipliers), price_levels, float(income_factor), adding_up,
+        )
+
+    def _demand_block(self, income, budget_shares, codes, factors, price_levels, income_factor,
+                      adding_up):
+        q0 = income[:, None] * budget_shares / self.baseline_prices
+        # a single-group system applies to every household
+        q = q0 * (factors[codes] if factors.shape[0] > 1 else factors[0])
+        if adding_up:
+            spending = q @ price_levels
+            q *= (income * income_factor / spending)[:, None]
+        return q
+
+    def evaluate(self, population, budget_shares, price_levels, income_factors=1.0,
+                 adding_up=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Aggregate demand for a batch of scenarios.
+
+        price_levels: (K,) or (S, K); income_factors: scalar or (S,).
+
+        Returns dict with
+            - "goods", "groups"
+            - "total_demand": (S, K) total quantity of every good
+            - "group_total_demand": (S, G, K)
+            - "mean_budget_share": (S, G, K) mean new budget share
+              p[k] * q[n, k] / (income[n] * f)
+        Households are processed in chunks of chunk_size; a weighted
+        population's survey weights weight every group sum.
+        """
+        self._check_groups(population)
+        budget_shares = np.asarray(budget_shares, dtype=np.float64)
+        if budget_shares.shape != (population.size, self.n_goods):
+            raise ValueError("budget_shares must have shape (households, goods).")
+        if adding_up and not np.allclose(budget_shares.sum(axis=1), 1.0):
+            raise ValueError("adding_up requires budget shares that sum to 1.")
+
+        multipliers = self.log_multipliers(price_levels, income_factors)
+        n_scenarios = multipliers.shape[0]
+        price_levels = np.broadcast_to(
+            np.atleast_2d(np.asarray(price_levels, dtype=np.float64)), (n_scenarios, self.n_goods)
+        )
+        income_factors = np.broadcast_to(
+            np.asarray(income_factors, dtype=np.float64).reshape(-1), (n_scenarios,)
+        )
+        factors = np.exp(multipliers)
+
+        n_groups = len(population.group_labels)
+        codes = population.group_code.astype(np.intp)
+        weight = population.weight
+        count = np.bincount(codes, weights=weight, minlength=n_groups).astype(np.float64)
+
+        group_total = np.zeros((n_scenarios, n_groups, self.n_goods))
+        group_share = np.zeros((n_scenarios, n_groups, self.n_goods))
+
+        for start in range(0, population.size, chunk_size):
+            stop = min(start + chunk_size, population.size)
+            income = population.income[start:stop]
+            shares = budget_shares[start:stop]
+            chunk_codes = codes[start:stop]
+            one_hot = np.zeros((stop - start, n_groups))
+            one_hot[np.arange(stop - start), chunk_codes] = 1.0 if weight is None else weight[start:stop]
+
+            for s in range(n_scenarios):
+                q = self._demand_block(
+                    income, shares, chunk_codes, factors[s], price_levels[s],
+                    float(income_factors[s]), adding_up,
+                )
+                group_total[s] += one_hot.T @ q
+                w_new = q * price_levels[s] / (income * income_factors[s])[:, None]
+                group_share[s] += one_hot.T @ w_new
+
+        safe_count = np.where(count > 0, count, 1.0)[None, :, None]
+        return {
+            "goods": list(self.goods),
+            "groups": list(population.group_labels),
+            "total_demand": group_total.sum(axis=1),
+            "group_total_demand": group_total,
+            "mean_budget_share": group_share / safe_count,
+        }
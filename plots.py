@@ -12,15 +12,110 @@ Assumes that for BOTH price and income scenarios you pass in a
     - "baseline_budget_share": list of baseline food budget shares per group
     - "new_budget_share": list of new food budget shares per group
 
-Price-change and income-change functions differ only in labels/titles.
+Price-change and income-change charts differ only in labels/titles, so
+all of them are drawn by `draw_grouped_bars` from the CHARTS and
+SCENARIOS label tables. `draw_grouped_bars` draws onto any Axes; the
+plot_* functions below use it on new pyplot figures for interactive use,
+and `rendering.py` uses it for headless batch rendering.
+
+matplotlib is only imported when a chart is actually drawn, so importing
+this module (or anything that imports it) stays cheap for compute-only
+runs.
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
+
+from profiling import traced
+
+
+BAR_WIDTH = 0.35
+
+# chart -> plot_data keys, legend labels, y label and title
+CHARTS = {
+    "demand": {
+        "baseline_key": "baseline_demand",
+        "new_key": "new_demand",
+        "baseline_label": "Baseline demand",
+        "new_label": "New demand",
+        "ylabel": "Average food quantity",
+        "title": "Food demand by income group: baseline vs new",
+    },
+    "budget_share": {
+        "baseline_key": "baseline_budget_share",
+        "new_key": "new_budget_share",
+        "baseline_label": "Baseline budget share",
+        "new_label": "New budget share",
+        "ylabel": "Average food budget share",
+        "title": "Food budget share by income group: baseline vs new",
+    },
+}
+
+# scenario -> how the scenario value is shown in the legend and title
+SCENARIOS = {
+    "price": {"value_label": "price = {:.2f}", "title": "price change"},
+    "income": {"value_label": "income × {:.2f}", "title": "income change"},
+    "combined": {"value_label": "price = {:.2f}, income × {:.2f}", "title": "price and income change"},
+}
+
+
+def format_value(scenario, value):
+    """Scenario value as shown in labels; "combined" takes a (price, income factor) pair."""
+    values = value if scenario == "combined" else (value,)
+    return SCENARIOS[scenario]["value_label"].format(*values)
+
+
+def _group_rows(plot_data, *args, **kwargs):
+    return len(plot_data["groups"])
+
+
+def new_value_label(chart, scenario, value):
+    """Legend label of the scenario bars, e.g. "New demand (price = 1.10)"."""
+    return f"{CHARTS[chart]['new_label']} ({format_value(scenario, value)})"
+
+
+def chart_title(chart, scenario):
+    return f"{CHARTS[chart]['title']} ({SCENARIOS[scenario]['title']})"
+
+
+def draw_grouped_bars(ax, plot_data, chart, scenario, value, title=None):
+    """
+    Draw baseline vs new bars per income group onto `ax`.
+
+    chart: "demand" or "budget_share"; scenario: "price", "income" or
+    "combined"; value: new price level, income factor or, for "combined",
+    a (price, income factor) pair (shown in the legend).
+
+    Returns the (baseline, new) BarContainers so callers can update the
+    bar heights later without redrawing the axes.
+    """
+    spec = CHARTS[chart]
+    groups = plot_data["groups"]
+    x = np.arange(len(groups))
+
+    baseline_bars = ax.bar(x - BAR_WIDTH / 2, plot_data[spec["baseline_key"]], BAR_WIDTH,
+                           label=spec["baseline_label"])
+    new_bars = ax.bar(x + BAR_WIDTH / 2, plot_data[spec["new_key"]], BAR_WIDTH,
+                      label=new_value_label(chart, scenario, value))
+
+    ax.set_xticks(x, groups)
+    ax.set_xlabel("Income group")
+    ax.set_ylabel(spec["ylabel"])
+    ax.set_title(chart_title(chart, scenario) if title is None else title)
+    ax.legend()
+    return baseline_bars, new_bars
+
+
+def _plot(plot_data, chart, scenario, value):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure()
+    draw_grouped_bars(fig.add_subplot(), plot_data, chart, scenario, value)
+    fig.tight_layout()
 
 
 # ===================== PRICE CHANGE PLOTS =====================
 
+@traced("plot_demand_by_income_group", rows=_group_rows)
 def plot_demand_by_income_group(plot_data, new_price):
     """
     Plot baseline vs new food demand by income group (Q1-Q4),
@@ -36,26 +131,10 @@ def plot_demand_by_income_group(plot_data, new_price):
     new_price : float
         New price level (e.g. 1.10 for a 10% increase).
     """
-    groups = plot_data["groups"]
-    baseline = plot_data["baseline_demand"]
-    new = plot_data["new_demand"]
-
-    x = np.arange(len(groups))
-    width = 0.35
-
-    plt.figure()
-    plt.bar(x - width / 2, baseline, width, label="Baseline demand")
-    plt.bar(x + width / 2, new, width,
-            label=f"New demand (price = {new_price:.2f})")
-
-    plt.xticks(x, groups)
-    plt.xlabel("Income group")
-    plt.ylabel("Average food quantity")
-    plt.title("Food demand by income group: baseline vs new (price change)")
-    plt.legend()
-    plt.tight_layout()
+    _plot(plot_data, "demand", "price", new_price)
 
 
+@traced("plot_budget_share_by_income_group", rows=_group_rows)
 def plot_budget_share_by_income_group(plot_data, new_price):
     """
     Plot baseline vs new food budget share by income group (Q1-Q4),
@@ -71,28 +150,12 @@ def plot_budget_share_by_income_group(plot_data, new_price):
     new_price : float
         New price level (e.g. 1.10 for a 10% increase).
     """
-    groups = plot_data["groups"]
-    baseline = plot_data["baseline_budget_share"]
-    new = plot_data["new_budget_share"]
-
-    x = np.arange(len(groups))
-    width = 0.35
-
-    plt.figure()
-    plt.bar(x - width / 2, baseline, width, label="Baseline budget share")
-    plt.bar(x + width / 2, new, width,
-            label=f"New budget share (price = {new_price:.2f})")
-
-    plt.xticks(x, groups)
-    plt.xlabel("Income group")
-    plt.ylabel("Average food budget share")
-    plt.title("Food budget share by income group: baseline vs new (price change)")
-    plt.legend()
-    plt.tight_layout()
+    _plot(plot_data, "budget_share", "price", new_price)
 
 
 # ===================== INCOME CHANGE PLOTS =====================
 
+@traced("plot_demand_by_income_group_income_change", rows=_group_rows)
 def plot_demand_by_income_group_income_change(plot_data, income_factor):
     """
     Plot baseline vs new food demand by income group (Q1-Q4),
@@ -108,26 +171,10 @@ def plot_demand_by_income_group_income_change(plot_data, income_factor):
     income_factor : float
         Multiplicative income factor (e.g. 1.10 for +10% income).
     """
-    groups = plot_data["groups"]
-    baseline = plot_data["baseline_demand"]
-    new = plot_data["new_demand"]
-
-    x = np.arange(len(groups))
-    width = 0.35
-
-    plt.figure()
-    plt.bar(x - width / 2, baseline, width, label="Baseline demand")
-    plt.bar(x + width / 2, new, width,
-            label=f"New demand (income × {income_factor:.2f})")
-
-    plt.xticks(x, groups)
-    plt.xlabel("Income group")
-    plt.ylabel("Average food quantity")
-    plt.title("Food demand by income group: baseline vs new (income change)")
-    plt.legend()
-    plt.tight_layout()
+    _plot(plot_data, "demand", "income", income_factor)
 
 
+@traced("plot_budget_share_by_income_group_income_change", rows=_group_rows)
 def plot_budget_share_by_income_group_income_change(plot_data, income_factor):
     """
     Plot baseline vs new food budget share by income group (Q1-Q4),
@@ -143,21 +190,4 @@ def plot_budget_share_by_income_group_income_change(plot_data, income_factor):
     income_factor : float
         Multiplicative income factor (e.g. 1.10 for +10% income).
     """
-    groups = plot_data["groups"]
-    baseline = plot_data["baseline_budget_share"]
-    new = plot_data["new_budget_share"]
-
-    x = np.arange(len(groups))
-    width = 0.35
-
-    plt.figure()
-    plt.bar(x - width / 2, baseline, width, label="Baseline budget share")
-    plt.bar(x + width / 2, new, width,
-            label=f"New budget share (income × {income_factor:.2f})")
-
-    plt.xticks(x, groups)
-    plt.xlabel("Income group")
-    plt.ylabel("Average food budget share")
-    plt.title("Food budget share by income group: baseline vs new (income change)")
-    plt.legend()
-    plt.tight_layout()
+    _plot(plot_data, "budget_share", "income", income_factor)
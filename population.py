@@ -0,0 +1,484 @@
+"""
+population.py
+
+Columnar (struct-of-arrays) storage for the household population.
+
+Instead of one Python `Household` object per household, a `Population`
+keeps one NumPy array per household attribute:
+
+    - income
+    - food_budget_share
+    - income_elasticity_food
+    - price_elasticity_food
+    - food_price
+    - food_baseline_buy
+    - group_code   (0 = Q1, ..., 3 = Q4)
+
+plus the scenario columns `current_income` and `current_food_demand`,
+which are only allocated once a scenario writes to them.
+
+`Population.households` returns a lazy sequence of `HouseholdView`
+objects, so code written against the old list of `Household` objects
+(plots, main scripts) keeps working unchanged.
+"""
+
+from collections.abc import Sequence
+from statistics import NormalDist
+
+import numpy as np
+
+from Household import Household
+
+
+# ---------- Generation defaults ----------
+
+# log-std of income, calibrated to Gini ≈ 1/3 and P90/P10 ≈ 4
+DEFAULT_SIGMA = 0.55
+DEFAULT_TARGET_MEAN_INCOME = 30000
+
+# Income quartile labels, poorest first
+QUARTILE_LABELS = ("Q1", "Q2", "Q3", "Q4")
+
+# Uniform food budget share band per quartile (Engel's law:
+# poorer households -> higher food share)
+ENGEL_SHARE_BANDS = (
+    (0.25, 0.35),
+    (0.20, 0.30),
+    (0.15, 0.25),
+    (0.10, 0.20),
+)
+
+# Persistent per-household columns (scenario columns are not included)
+COLUMN_NAMES = (
+    "income",
+    "food_budget_share",
+    "group_code",
+    "income_elasticity_food",
+    "price_elasticity_food",
+    "food_price",
+    "food_baseline_buy",
+)
+
+DEFAULT_INCOME_ELASTICITY_FOOD = 0.8
+DEFAULT_PRICE_ELASTICITY_FOOD = -0.6
+DEFAULT_FOOD_PRICE = 1.0
+
+# Storage precision of the continuous columns. COMPACT_DTYPE halves memory
+# and bandwidth; reductions over the columns still accumulate in float64.
+DEFAULT_DTYPE = np.float64
+COMPACT_DTYPE = np.float32
+
+# Households per lognormal draw when generating in a compact dtype, so the
+# float64 draws never need a full-length temporary
+GENERATION_CHUNK = 1_000_000
+
+
+def lognormal_mu(target_mean_income, sigma):
+    """
+    Location parameter mu such that a lognormal with log-std sigma
+    has mean `target_mean_income`:  mean = exp(mu + sigma^2 / 2).
+    """
+    return np.log(target_mean_income) - 0.5 * sigma**2
+
+
+def analytic_quartile_cutoffs(sigma=DEFAULT_SIGMA, target_mean_income=DEFAULT_TARGET_MEAN_INCOME):
+    """
+    Theoretical (Q1, median, Q3) of the lognormal income distribution:
+
+        Pp = exp(mu + sigma * z_p)
+
+    Unlike np.percentile on the drawn incomes, this needs no data, so
+    populations can be generated chunk by chunk with fixed cutoffs.
+    """
+    mu = lognormal_mu(target_mean_income, sigma)
+    z = np.array([NormalDist().inv_cdf(p) for p in (0.25, 0.50, 0.75)])
+    return np.exp(mu + sigma * z)
+
+
+def assign_quartile_codes(incomes, cutoffs):
+    """
+    Map incomes to quartile codes 0..3 given the (Q1, median, Q3) cutoffs.
+
+    Uses right-closed bins, i.e. income <= q25 -> 0, income <= q50 -> 1,
+    income <= q75 -> 2, otherwise 3.
+    """
+    return np.digitize(incomes, cutoffs, right=True).astype(np.uint8)
+
+
+def draw_food_budget_shares(group_code, bands=ENGEL_SHARE_BANDS, rng=None, dtype=DEFAULT_DTYPE):
+    """
+    Draw a food budget share for every household from the uniform band of
+    its income group, with one batched uniform draw per band.
+
+    `rng` is a np.random.Generator; None uses the global np.random state.
+    The draws are float64 and stored in `dtype`, so every precision gets
+    the same households.
+    """
+    rng = np.random if rng is None else rng
+    shares = np.empty(group_code.shape[0], dtype=dtype)
+    for code, (low, high) in enumerate(bands):
+        mask = group_code == code
+        shares[mask] = rng.uniform(low, high, size=int(mask.sum()))
+    return shares
+
+
+def canonical_elasticity(spec):
+    """JSON-serialisable form of an elasticity spec (see draw_elasticities)."""
+    if isinstance(spec, dict):
+        return {name: canonical_elasticity(value) for name, value in sorted(spec.items())}
+    if np.ndim(spec):
+        return [float(value) for value in spec]
+    return float(spec)
+
+
+def draw_elasticities(spec, group_code, rng=None, dtype=DEFAULT_DTYPE):
+    """
+    Resolve an elasticity spec into a scalar or one value per household:
+
+        - a number: the same elasticity for every household (returned as is,
+          without touching the random stream)
+        - a sequence with one value per income group: spec[group_code]
+        - {"mean": m, "std": s}: normal draws
+        - {"low": a, "high": b}: uniform draws
+
+    The distribution parameters may themselves be numbers or per-group
+    sequences, e.g. {"mean": [0.9, 0.8, 0.7, 0.6], "std": 0.1}.
+    """
+    def per_household(value):
+        value = np.asarray(value, dtype=np.float64)
+        return value[group_code] if value.ndim else value
+
+    if not isinstance(spec, dict):
+        return per_household(spec).astype(dtype) if np.ndim(spec) else spec
+
+    rng = np.random if rng is None else rng
+    n = group_code.shape[0]
+    if set(spec) == {"mean", "std"}:
+        draws = rng.normal(per_household(spec["mean"]), per_household(spec["std"]), size=n)
+    elif set(spec) == {"low", "high"}:
+        draws = rng.uniform(per_household(spec["low"]), per_household(spec["high"]), size=n)
+    else:
+        raise ValueError(
+            f"Elasticity distribution needs 'mean' and 'std' or 'low' and 'high', got {sorted(spec)}."
+        )
+    return draws.astype(dtype)
+
+
+def draw_lognormal_incomes(rng, mu, sigma, household_number, dtype=DEFAULT_DTYPE):
+    """
+    Lognormal incomes stored in `dtype`.
+
+    Compact dtypes are filled in chunks of GENERATION_CHUNK float64 draws,
+    which consume the random stream exactly like one full-length draw.
+    """
+    if np.dtype(dtype) == np.float64:
+        return rng.lognormal(mean=mu, sigma=sigma, size=household_number)
+    incomes = np.empty(household_number, dtype=dtype)
+    for start in range(0, household_number, GENERATION_CHUNK):
+        stop = min(start + GENERATION_CHUNK, household_number)
+        incomes[start:stop] = rng.lognormal(mean=mu, sigma=sigma, size=stop - start)
+    return incomes
+
+
+def draw_grouped_incomes(rng, mu, sigma, household_number, cutoffs, dtype=DEFAULT_DTYPE):
+    """
+    Lognormal incomes stored in `dtype` and their quartile codes against
+    fixed `cutoffs`, as (incomes, group_code).
+
+    Codes are assigned from the float64 draws before they are narrowed, so
+    a compact dtype never moves a household across a cutoff. The random
+    stream is consumed exactly as by draw_lognormal_incomes.
+    """
+    if np.dtype(dtype) == np.float64:
+        incomes = rng.lognormal(mean=mu, sigma=sigma, size=household_number)
+        return incomes, assign_quartile_codes(incomes, cutoffs)
+    incomes = np.empty(household_number, dtype=dtype)
+    group_code = np.empty(household_number, dtype=np.uint8)
+    for start in range(0, household_number, GENERATION_CHUNK):
+        stop = min(start + GENERATION_CHUNK, household_number)
+        draws = rng.lognormal(mean=mu, sigma=sigma, size=stop - start)
+        incomes[start:stop] = draws
+        group_code[start:stop] = assign_quartile_codes(draws, cutoffs)
+    return incomes, group_code
+
+
+class Population:
+    """
+    Household population stored as parallel NumPy arrays.
+
+    All arrays have length `size`; element i of every array describes
+    household i. Continuous columns are stored in `dtype` (float64 by
+    default, COMPACT_DTYPE for very large populations); group codes are
+    always uint8.
+
+    `weight` holds optional survey weights (households represented by each
+    row, e.g. from microdata.py); None means every row counts once.
+    Aggregates and grouped statistics use it wherever they reduce over
+    households.
+    """
+
+    def __init__(
+        self,
+        income,
+        food_budget_share,
+        group_code,
+        income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+        price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+        food_price=DEFAULT_FOOD_PRICE,
+        group_labels=QUARTILE_LABELS,
+        dtype=DEFAULT_DTYPE,
+        weight=None,
+    ):
+        self.income = np.asarray(income, dtype=dtype)
+        n = self.income.shape[0]
+
+        self.weight = None
+        if weight is not None:
+            self.weight = np.asarray(weight, dtype=dtype)
+            if self.weight.shape != (n,) or np.any(self.weight < 0):
+                raise ValueError("weight must be a non-negative array with one value per household.")
+
+        self.food_budget_share = np.asarray(food_budget_share, dtype=dtype)
+        self.group_code = np.asarray(group_code, dtype=np.uint8)
+        self.group_labels = tuple(group_labels)
+
+        # Scalars are broadcast to full columns so every field is per-household
+        self.income_elasticity_food = self._column(income_elasticity_food, n, dtype)
+        self.price_elasticity_food = self._column(price_elasticity_food, n, dtype)
+        self.food_price = self._column(food_price, n, dtype)
+
+        # Baseline quantity: spending / price (see Household.calculate_food_baseline_buy)
+        self.food_baseline_buy = self.income * self.food_budget_share / self.food_price
+
+        # Scenario columns, allocated lazily on first write
+        self._current_income = None
+        self._current_food_demand = None
+
+    @staticmethod
+    def _column(value, n, dtype=DEFAULT_DTYPE):
+        value = np.asarray(value, dtype=dtype)
+        if value.ndim == 0:
+            return np.full(n, value, dtype=dtype)
+        return value
+
+    @classmethod
+    def from_columns(cls, columns, group_labels=QUARTILE_LABELS):
+        """
+        Wrap existing arrays (e.g. np.memmap views) without copying them.
+
+        `columns` maps every name in COLUMN_NAMES to an array, plus an
+        optional "weight" array.
+        """
+        population = cls.__new__(cls)
+        for name in COLUMN_NAMES:
+            setattr(population, name, columns[name])
+        population.weight = columns.get("weight")
+        population.group_labels = tuple(group_labels)
+        population._current_income = None
+        population._current_food_demand = None
+        return population
+
+    def columns(self):
+        """Dict of the persistent columns (no copies), with "weight" if weighted."""
+        columns = {name: getattr(self, name) for name in COLUMN_NAMES}
+        if self.weight is not None:
+            columns["weight"] = self.weight
+        return columns
+
+    @classmethod
+    def generate(
+        cls,
+        household_number,
+        sigma=DEFAULT_SIGMA,
+        target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+        bands=ENGEL_SHARE_BANDS,
+        rng=None,
+        cutoffs=None,
+        income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+        price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+        food_price=DEFAULT_FOOD_PRICE,
+        dtype=DEFAULT_DTYPE,
+    ):
+        """
+        Draw a synthetic population fully vectorized:
+
+            1) one lognormal draw for all incomes,
+            2) one np.digitize against the empirical quartile cutoffs,
+            3) one batched uniform draw per Engel band,
+            4) optionally, one draw per heterogeneous elasticity.
+
+        `rng` is a np.random.Generator; None uses the global np.random
+        state. Pass a seeded Generator for reproducible populations.
+
+        `cutoffs` fixes the (Q1, median, Q3) income cutoffs instead of taking
+        them from the drawn incomes (see analytic_quartile_cutoffs).
+
+        `income_elasticity_food` and `price_elasticity_food` are numbers
+        (the same for every household), per-group sequences or per-household
+        distributions (see draw_elasticities); distributions are drawn after
+        the shares, so constant elasticities leave the random stream as is.
+
+        `dtype` is the storage precision of the continuous columns. With
+        `cutoffs`, quartiles are assigned from the float64 draws, so the same
+        seed and cutoffs give the same households in every precision.
+        Without them a compact population takes its cutoffs from the rounded
+        incomes, and a household next to a cutoff can change quartile, which
+        also changes the shares drawn for its band; to compare precisions,
+        pass the cutoffs of the float64 population (see precision.py).
+        """
+        rng = np.random if rng is None else rng
+        mu = lognormal_mu(target_mean_income, sigma)
+        if cutoffs is None:
+            incomes = draw_lognormal_incomes(rng, mu, sigma, household_number, dtype)
+            group_code = assign_quartile_codes(incomes, np.percentile(incomes, [25, 50, 75]))
+        else:
+            incomes, group_code = draw_grouped_incomes(
+                rng, mu, sigma, household_number, cutoffs, dtype
+            )
+        shares = draw_food_budget_shares(group_code, bands, rng=rng, dtype=dtype)
+
+        return cls(
+            income=incomes,
+            food_budget_share=shares,
+            group_code=group_code,
+            income_elasticity_food=draw_elasticities(income_elasticity_food, group_code, rng, dtype),
+            price_elasticity_food=draw_elasticities(price_elasticity_food, group_code, rng, dtype),
+            food_price=food_price,
+            dtype=dtype,
+        )
+
+    # ---------- Scenario columns ----------
+
+    @property
+    def current_income(self):
+        """Scenario income; equals baseline income until a scenario sets it."""
+        if self._current_income is None:
+            return self.income
+        return self._current_income
+
+    @current_income.setter
+    def current_income(self, values):
+        self._current_income = np.asarray(values, dtype=self.dtype)
+
+    @property
+    def current_food_demand(self):
+        """Scenario food demand; equals baseline demand until a scenario sets it."""
+        if self._current_food_demand is None:
+            return self.food_baseline_buy
+        return self._current_food_demand
+
+    @current_food_demand.setter
+    def current_food_demand(self, values):
+        self._current_food_demand = np.asarray(values, dtype=self.dtype)
+
+    def reset_scenario(self):
+        """Drop scenario columns so current values fall back to the baseline."""
+        self._current_income = None
+        self._current_food_demand = None
+
+    def _writable_scenario_columns(self):
+        # Element-wise writes from a HouseholdView need private copies
+        if self._current_income is None:
+            self._current_income = self.income.copy()
+        if self._current_food_demand is None:
+            self._current_food_demand = self.food_baseline_buy.copy()
+
+    # ---------- Household-compatible access ----------
+
+    @property
+    def size(self):
+        return self.income.shape[0]
+
+    @property
+    def total_weight(self):
+        """Number of households represented (sum of weights, or size)."""
+        if self.weight is None:
+            return float(self.size)
+        return float(np.sum(self.weight, dtype=np.float64))
+
+    @property
+    def dtype(self):
+        """Storage dtype of the continuous columns."""
+        return self.income.dtype
+
+    @property
+    def nbytes(self):
+        """Bytes held by the persistent and allocated scenario columns."""
+        total = sum(column.nbytes for column in self.columns().values())
+        for column in (self._current_income, self._current_food_demand):
+            if column is not None:
+                total += column.nbytes
+        return total
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def income_group(self):
+        """Income group label of every household, as an object array."""
+        return np.asarray(self.group_labels, dtype=object)[self.group_code]
+
+    @property
+    def households(self):
+        """Lazy sequence of `HouseholdView` objects over this population."""
+        return HouseholdSequence(self)
+
+
+class HouseholdSequence(Sequence):
+    """Read-only sequence that creates `HouseholdView` objects on access."""
+
+    def __init__(self, population):
+        self._population = population
+
+    def __len__(self):
+        return self._population.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("household index out of range")
+        return HouseholdView(self._population, index)
+
+
+def _column_property(name, scenario=False):
+    def fget(self):
+        return float(getattr(self._population, name)[self._index])
+
+    def fset(self, value):
+        if scenario:
+            self._population._writable_scenario_columns()
+        getattr(self._population, name)[self._index] = value
+
+    return property(fget, fset)
+
+
+class HouseholdView(Household):
+    """
+    A `Household` whose attributes live in a row of a `Population`.
+
+    All `Household` methods work unchanged; reads and writes go straight
+    to the underlying arrays.
+    """
+
+    def __init__(self, population, index):
+        # Deliberately skip Household.__init__: the data already exists
+        self._population = population
+        self._index = index
+
+    income = _column_property("income")
+    food_budget_share = _column_property("food_budget_share")
+    income_elasticity_food = _column_property("income_elasticity_food")
+    price_elasticity_food = _column_property("price_elasticity_food")
+    food_price = _column_property("food_price")
+    food_baseline_buy = _column_property("food_baseline_buy")
+    current_income = _column_property("current_income", scenario=True)
+    current_food_demand = _column_property("current_food_demand", scenario=True)
+
+    @property
+    def income_group(self):
+        population = self._population
+        return population.group_labels[population.group_code[self._index]]
@@ -0,0 +1,250 @@
+"""
+population_cache.py
+
+Persistent on-disk cache of generated populations.
+
+A population is stored as a directory holding one `.npy` file per column
+plus a `manifest.json` describing the generation parameters and columns.
+Loading opens every column with np.load(..., mmap_mode="r"), i.e. as a
+read-only np.memmap, so reopening even a very large population is
+zero-copy and near-instant: pages are read from disk only when touched.
+
+`PopulationCache` keys populations by a hash of their generation
+parameters (N, sigma, target mean income, Engel bands, elasticities,
+price and seed) and evicts least-recently-used entries once the cache
+exceeds its size limit.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from population import (
+    Population,
+    canonical_elasticity,
+    DEFAULT_SIGMA,
+    DEFAULT_TARGET_MEAN_INCOME,
+    DEFAULT_INCOME_ELASTICITY_FOOD,
+    DEFAULT_PRICE_ELASTICITY_FOOD,
+    DEFAULT_FOOD_PRICE,
+    DEFAULT_DTYPE,
+    ENGEL_SHARE_BANDS,
+)
+
+
+MANIFEST_NAME = "manifest.json"
+
+# Bump when the on-disk layout or the generation algorithm changes, so old
+# entries are no longer matched.
+CACHE_FORMAT_VERSION = 1
+
+
+# ---------- Save / load a single population ----------
+
+def save_population(population, directory, params=None):
+    """
+    Write a population to `directory` as one .npy file per column plus a
+    manifest. The directory is created if needed.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    columns = {}
+    nbytes = 0
+    for name, values in population.columns().items():
+        values = np.ascontiguousarray(values)
+        np.save(os.path.join(directory, name + ".npy"), values)
+        columns[name] = {"dtype": values.dtype.str, "shape": list(values.shape)}
+        nbytes += values.nbytes
+
+    manifest = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "size": population.size,
+        "group_labels": list(population.group_labels),
+        "columns": columns,
+        "nbytes": nbytes,
+        "params": params,
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def load_population(directory, mmap_mode="r"):
+    """
+    Reopen a population saved with save_population.
+
+    With the default mmap_mode="r" every column is a read-only np.memmap;
+    use mmap_mode=None to read the columns fully into memory instead.
+    """
+    with open(os.path.join(directory, MANIFEST_NAME)) as f:
+        manifest = json.load(f)
+
+    columns = {
+        name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+        for name in manifest["columns"]
+    }
+    return Population.from_columns(columns, group_labels=manifest["group_labels"])
+
+
+# ---------- Parameter-keyed cache ----------
+
+# Keyword arguments of generation_params that a population spec may set
+# besides household_number and seed (see run_scenarios.py)
+SPEC_KEYWORDS = (
+    "sigma",
+    "target_mean_income",
+    "income_elasticity_food",
+    "price_elasticity_food",
+    "dtype",
+)
+
+def generation_params(
+    household_number,
+    seed,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+    bands=ENGEL_SHARE_BANDS,
+    income_elasticity_food=DEFAULT_INCOME_ELASTICITY_FOOD,
+    price_elasticity_food=DEFAULT_PRICE_ELASTICITY_FOOD,
+    food_price=DEFAULT_FOOD_PRICE,
+    dtype=DEFAULT_DTYPE,
+):
+    """Canonical, JSON-serialisable description of a generated population."""
+    params = {
+        "format_version": CACHE_FORMAT_VERSION,
+        "household_number": int(household_number),
+        "seed": int(seed),
+        "sigma": float(sigma),
+        "target_mean_income": float(target_mean_income),
+        "bands": [[float(low), float(high)] for low, high in bands],
+        "income_elasticity_food": canonical_elasticity(income_elasticity_food),
+        "price_elasticity_food": canonical_elasticity(price_elasticity_food),
+        "food_price": float(food_price),
+    }
+    # only compact populations record their dtype, so float64 keys are unchanged
+    if np.dtype(dtype) != np.dtype(DEFAULT_DTYPE):
+        params["dtype"] = np.dtype(dtype).name
+    return params
+
+
+def params_key(params):
+    """Stable hash of a parameter dict (sha256 of its canonical JSON)."""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class PopulationCache:
+    """
+    Directory of saved populations, keyed by generation parameters.
+
+    Parameters
+    ----------
+    root : str
+        Cache directory; one sub-directory per population.
+    max_bytes : int or None
+        Evict least-recently-used populations once the total size of all
+        entries exceeds this many bytes. None disables eviction.
+    """
+
+    def __init__(self, root, max_bytes=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, params):
+        return os.path.join(self.root, params_key(params))
+
+    def get(self, params):
+        """Memory-mapped Population for `params`, or None on a cache miss."""
+        directory = self.path(params)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return None
+
+        # The manifest's mtime is the entry's last-access time for LRU eviction
+        now = time.time()
+        os.utime(manifest_path, (now, now))
+        return load_population(directory)
+
+    def put(self, params, population):
+        """Save `population` under `params` and return the memory-mapped copy."""
+        directory = self.path(params)
+
+        # Write into a temporary directory, then rename, so readers never see
+        # a half-written entry
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            save_population(population, tmp, params=params)
+            if os.path.exists(directory):
+                shutil.rmtree(tmp)
+            else:
+                os.replace(tmp, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        self.evict(keep=params_key(params))
+        return load_population(directory)
+
+    def get_or_create(self, household_number, seed, **kwargs):
+        """
+        Return the cached population for these parameters, generating and
+        storing it on a miss. Extra keyword arguments are those of
+        generation_params (sigma, target_mean_income, bands, elasticities,
+        food_price, dtype).
+        """
+        params = generation_params(household_number, seed, **kwargs)
+        population = self.get(params)
+        if population is not None:
+            return population
+
+        population = Population.generate(
+            household_number,
+            sigma=params["sigma"],
+            target_mean_income=params["target_mean_income"],
+            bands=params["bands"],
+            rng=np.random.default_rng(seed),
+            income_elasticity_food=params["income_elasticity_food"],
+            price_elasticity_food=params["price_elasticity_food"],
+            food_price=params["food_price"],
+            dtype=params.get("dtype", DEFAULT_DTYPE),
+        )
+        return self.put(params, population)
+
+    def entries(self):
+        """List of (key, nbytes, last_access) for every complete entry."""
+        result = []
+        for key in os.listdir(self.root):
+            manifest_path = os.path.join(self.root, key, MANIFEST_NAME)
+            if key.startswith(".") or not os.path.exists(manifest_path):
+                continue
+            with open(manifest_path) as f:
+                nbytes = json.load(f)["nbytes"]
+            result.append((key, nbytes, os.path.getmtime(manifest_path)))
+        return result
+
+    def evict(self, keep=None):
+        """Remove least-recently-used entries until the cache fits max_bytes."""
+        if self.max_bytes is None:
+            return
+
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(nbytes for _, nbytes, _ in entries)
+        for key, nbytes, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
+            total -= nbytes
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for key, _, _ in self.entries():
+            shutil.rmtree(os.path.join(self.root, key), ignore_errors=True)
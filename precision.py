@@ -0,0 +1,149 @@
+"""
+precision.py
+
+Validation of the compact (float32) storage mode.
+
+`compare_precision` generates the same population (same seed) once in
+float64 and once in a compact dtype, runs the same scenario and summary
+on both and reports the relative error of every aggregate, summary
+statistic and per-group value, the number of households whose income
+group changed, and the memory and time of both runs.
+
+The compact run reuses the float64 quartile cutoffs and assigns quartiles
+before narrowing the incomes (Population.generate(cutoffs=...)), so both
+runs hold the same households and the errors are storage precision only.
+Cutoffs taken from the rounded incomes would move a household next to a
+cutoff into the neighbouring quartile, and with it the budget shares
+drawn for every household of both bands.
+
+Usage:
+    python precision.py                # 1e6 households, +10% price
+"""
+
+import time
+
+import numpy as np
+
+from Economy import Economy, economy_calculations, build_summary_and_plot_data
+from population import (
+    COMPACT_DTYPE,
+    DEFAULT_DTYPE,
+    DEFAULT_SIGMA,
+    DEFAULT_TARGET_MEAN_INCOME,
+    Population,
+)
+
+
+def _relative_error(value, reference):
+    value = np.asarray(value, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    scale = np.where(reference != 0, np.abs(reference), 1.0)
+    return float(np.max(np.abs(value - reference) / scale)) if reference.size else 0.0
+
+
+def _run(household_number, seed, dtype, cutoffs, new_food_price, new_income, grouping, sigma,
+         target_mean_income):
+    econ = Economy(household_number=household_number)
+    start = time.perf_counter()
+    econ.population = Population.generate(
+        household_number,
+        sigma=sigma,
+        target_mean_income=target_mean_income,
+        rng=np.random.default_rng(seed),
+        cutoffs=cutoffs,
+        dtype=dtype,
+    )
+    generated = time.perf_counter()
+
+    economy_calculations(econ, new_income=new_income, new_food_price=new_food_price)
+    baseline_price = float(econ.population.food_price[0])
+    table_summary, plot_data = build_summary_and_plot_data(
+        econ,
+        new_food_price=baseline_price if new_food_price is None else new_food_price,
+        grouping=grouping,
+    )
+    finished = time.perf_counter()
+
+    return econ, {
+        "aggregates": {
+            "baseline": econ.aggregate_food_baseline,
+            "income_change": econ.aggregate_food_demand_income_change,
+            "price_change": econ.aggregate_food_demand_price_change,
+            "combined_change": econ.aggregate_food_demand_combined_change,
+        },
+        "table_summary": table_summary,
+        "plot_data": plot_data,
+        "nbytes": econ.population.nbytes,
+        "seconds": {"generation": generated - start, "scenario_and_summary": finished - generated},
+    }
+
+
+def compare_precision(
+    household_number,
+    seed=0,
+    new_food_price=1.10,
+    new_income=None,
+    grouping=None,
+    dtype=COMPACT_DTYPE,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+):
+    """
+    Run one scenario in float64 and in `dtype` and report the differences.
+
+    Returns a dict with:
+        - "dtype", "reference_nbytes", "compact_nbytes", "memory_ratio"
+        - "seconds": {"reference": {...}, "compact": {...}}
+        - "aggregates", "table_summary": name -> relative error
+        - "plot_data": column -> max relative error over the groups
+        - "group_code_mismatches": households in a different quartile
+          (0, as both runs share the float64 cutoffs)
+        - "max_relative_error": largest of all the errors above
+    """
+    args = (new_food_price, new_income, grouping, sigma, target_mean_income)
+    reference_econ, reference = _run(household_number, seed, DEFAULT_DTYPE, None, *args)
+    # same quartiles in both runs: the compact run reuses the float64 cutoffs
+    cutoffs = np.percentile(reference_econ.population.income, [25, 50, 75])
+    compact_econ, compact = _run(household_number, seed, dtype, cutoffs, *args)
+
+    report = {
+        "dtype": np.dtype(dtype).name,
+        "reference_nbytes": reference["nbytes"],
+        "compact_nbytes": compact["nbytes"],
+        "memory_ratio": compact["nbytes"] / reference["nbytes"],
+        "seconds": {"reference": reference["seconds"], "compact": compact["seconds"]},
+        "group_code_mismatches": int(np.count_nonzero(
+            reference_econ.population.group_code != compact_econ.population.group_code
+        )),
+    }
+    for section in ("aggregates", "table_summary"):
+        report[section] = {
+            name: _relative_error(compact[section][name], value)
+            for name, value in reference[section].items()
+        }
+    report["plot_data"] = {
+        name: _relative_error(compact["plot_data"][name], values)
+        for name, values in reference["plot_data"].items()
+        if name != "groups"
+    }
+    report["max_relative_error"] = max(
+        max(report[section].values()) for section in ("aggregates", "table_summary", "plot_data")
+    )
+    return report
+
+
+if __name__ == "__main__":
+    report = compare_precision(1_000_000, seed=1, new_food_price=1.10, new_income=1.05)
+    print(f"\n=== {report['dtype']} vs float64 ===")
+    print(f"Memory: {report['compact_nbytes'] / 1e6:.1f} MB vs "
+          f"{report['reference_nbytes'] / 1e6:.1f} MB (×{report['memory_ratio']:.2f})")
+    for run in ("reference", "compact"):
+        seconds = report["seconds"][run]
+        print(f"  {run:<9} generation {seconds['generation']:.3f} s, "
+              f"scenario + summary {seconds['scenario_and_summary']:.3f} s")
+    print(f"Households in a different quartile: {report['group_code_mismatches']}")
+    for section in ("aggregates", "table_summary", "plot_data"):
+        print(f"\n{section} (relative error):")
+        for name, error in report[section].items():
+            print(f"  {name}: {error:.2e}")
+    print(f"\nMax relative error: {report['max_relative_error']:.2e}")
@@ -0,0 +1,206 @@
+"""
+profiling.py
+
+Opt-in stage-level tracing for the simulation pipeline.
+
+Pipeline stages (create_economy, economy_calculations,
+build_summary_and_plot_data, the plotting functions) are wrapped with the
+`traced` decorator. While tracing is disabled the wrapper only checks one
+attribute and calls straight through, so it can stay in place for
+production batch runs. Once enabled, every stage call records:
+
+    - wall time (time.perf_counter)
+    - rows processed and row throughput, where the stage knows its rows
+    - optionally, tracemalloc peak and net allocation of the stage
+
+Traces are written as plain JSON or in the Chrome trace-event format
+(open in chrome://tracing or https://ui.perfetto.dev).
+
+Stages may run on several threads (e.g. the thread pool of service.py):
+every thread nests its stages on its own stack, so depths and parents
+never mix, and events are collected under a lock. tracemalloc is process
+wide, though, so while stages overlap in time their memory figures also
+include the other threads' allocations.
+
+Usage:
+    from profiling import TRACER
+    TRACER.enable(memory=True)
+    ... run the pipeline ...
+    TRACER.write_chrome_trace("trace.json")
+
+or set DEMAND_SIM_TRACE=trace.json to trace a whole run and write the
+Chrome trace on exit.
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+TRACE_ENV_VAR = "DEMAND_SIM_TRACE"
+
+
+class Tracer:
+    """Collects timed, optionally memory-profiled, stage events (thread safe)."""
+
+    def __init__(self):
+        self.enabled = False
+        self.memory = False
+        self.events = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._started_tracemalloc = False
+
+    @property
+    def _stack(self):
+        """Open stage frames of the calling thread."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enable(self, memory=False):
+        """Start recording; memory=True also tracks allocations with tracemalloc."""
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        Time the enclosed block as one stage (no-op while disabled).
+
+        Yields the stage frame (None while disabled); setting frame["rows"]
+        inside the block records a row count only known once it has run.
+        """
+        if not self.enabled:
+            yield None
+            return
+
+        frame = {"child_peak": 0, "rows": rows}
+        if self.memory:
+            frame["start_bytes"] = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        stack = self._stack
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            rows = frame["rows"]
+
+            event = {
+                "name": name,
+                "start": start - self._origin,
+                "duration": duration,
+                "depth": len(stack),
+                "thread": threading.get_ident(),
+                "rows": rows,
+                "rows_per_second": rows / duration if rows and duration > 0 else None,
+            }
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                # a nested stage reset the peak, so include its maximum too
+                peak = max(peak, frame["child_peak"])
+                event["alloc_peak_bytes"] = peak - frame["start_bytes"]
+                event["alloc_net_bytes"] = current - frame["start_bytes"]
+                if stack:
+                    parent = stack[-1]
+                    parent["child_peak"] = max(parent["child_peak"], peak)
+            with self._lock:
+                self.events.append(event)
+
+    # ---------- Export ----------
+
+    def summary(self):
+        """Total time, calls and rows per stage name."""
+        totals = {}
+        for event in list(self.events):
+            entry = totals.setdefault(event["name"], {"calls": 0, "seconds": 0.0, "rows": 0})
+            entry["calls"] += 1
+            entry["seconds"] += event["duration"]
+            entry["rows"] += event["rows"] or 0
+        return totals
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump({"events": self.events, "summary": self.summary()}, f, indent=2)
+
+    def write_chrome_trace(self, path):
+        """Write complete ("X") events in the Chrome trace-event format."""
+        pid = os.getpid()
+        trace_events = []
+        for event in self.events:
+            args = {key: value for key, value in event.items()
+                    if key not in ("name", "start", "duration", "thread") and value is not None}
+            trace_events.append({
+                "name": event["name"],
+                "ph": "X",
+                "ts": event["start"] * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": pid,
+                "tid": event["thread"],
+                "args": args,
+            })
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+
+TRACER = Tracer()
+
+
+def traced(name, rows=None, rows_after=None):
+    """
+    Decorator that records every call of a function as a stage of TRACER.
+
+    rows: optional callable taking the function's arguments and returning
+    the number of rows (households) the call processes.
+    rows_after: the same, but called after the function returns, for
+    stages that determine their own rows (e.g. loading a file).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            n_rows = rows(*args, **kwargs) if rows is not None else None
+            with TRACER.stage(name, rows=n_rows) as frame:
+                result = func(*args, **kwargs)
+                if rows_after is not None:
+                    frame["rows"] = rows_after(*args, **kwargs)
+                return result
+        return wrapper
+    return decorator
+
+
+def _trace_from_environment():
+    path = os.environ.get(TRACE_ENV_VAR)
+    if not path:
+        return
+    TRACER.enable(memory=True)
+    atexit.register(TRACER.write_chrome_trace, path)
+
+
+_trace_from_environment()
@@ -0,0 +1,265 @@
+"""
+rendering.py
+
+Headless, parallel figure rendering.
+
+The plot_* functions in plots.py build a new pyplot figure per chart
+through the global pyplot state, which is fine for a few interactive
+charts but slow for hundreds of scenarios and not safe to share between
+threads. This module renders with the object-oriented Agg API instead
+(matplotlib.figure.Figure + FigureCanvasAgg, no pyplot):
+
+    - ChartTemplate: one figure/axes per (chart, scenario, groups) that
+      is drawn once; later charts only update bar heights, the legend
+      label and the y-limits before saving
+    - render_figures: the demand and budget-share charts of one plot_data
+    - render_batch: many plot_data dicts to PNG/SVG across worker processes
+    - render_grid / render_sweep_grid: small multiples of a whole sweep
+      in one figure
+
+Charts look the same as the ones drawn by plots.py, because both use
+plots.draw_grouped_bars.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from plots import CHARTS, _group_rows, chart_title, draw_grouped_bars, new_value_label, format_value
+from profiling import traced
+
+
+CHART_NAMES = tuple(CHARTS)
+DEFAULT_FORMATS = ("png",)
+DEFAULT_FIGSIZE = (6.4, 4.8)
+Y_MARGIN = 0.05
+
+# Templates of this (worker) process, keyed by (chart, scenario, groups)
+_TEMPLATES = {}
+
+
+def _agg_figure(figsize, dpi=100):
+    # matplotlib is imported on first use only, see plots.py
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+class ChartTemplate:
+    """
+    Reusable baseline-vs-new bar chart for one (chart, scenario, groups).
+
+    The figure, axes, ticks, labels and legend are built once; `update`
+    only changes the bar heights, the legend label of the new bars and the
+    y-limits. The layout is recomputed only when the order of magnitude
+    of the y-axis changes (wider tick labels).
+    """
+
+    def __init__(self, chart, scenario, groups, figsize=DEFAULT_FIGSIZE, dpi=100):
+        self.chart = chart
+        self.scenario = scenario
+        self.groups = list(groups)
+
+        self.figure = _agg_figure(figsize, dpi)
+        self.ax = self.figure.add_subplot()
+
+        spec = CHARTS[chart]
+        zeros = np.zeros(len(self.groups))
+        placeholder = {"groups": self.groups, spec["baseline_key"]: zeros, spec["new_key"]: zeros}
+        value = (1.0, 1.0) if scenario == "combined" else 1.0
+        self.baseline_bars, self.new_bars = draw_grouped_bars(
+            self.ax, placeholder, chart, scenario, value
+        )
+        self._new_label = self.ax.get_legend().get_texts()[1]
+        self._magnitude = None
+
+    def update(self, plot_data, value):
+        """Set the bars to the values of `plot_data` for scenario value `value`."""
+        if list(plot_data["groups"]) != self.groups:
+            raise ValueError("plot_data groups do not match the template.")
+
+        spec = CHARTS[self.chart]
+        baseline = np.asarray(plot_data[spec["baseline_key"]], dtype=float)
+        new = np.asarray(plot_data[spec["new_key"]], dtype=float)
+        for bars, heights in ((self.baseline_bars, baseline), (self.new_bars, new)):
+            for rect, height in zip(bars, heights):
+                rect.set_height(height)
+        self._new_label.set_text(new_value_label(self.chart, self.scenario, value))
+
+        top = max(baseline.max(initial=0.0), new.max(initial=0.0))
+        top = top * (1.0 + Y_MARGIN) if top > 0 else 1.0
+        self.ax.set_ylim(0.0, top)
+
+        magnitude = math.floor(math.log10(top))
+        if magnitude != self._magnitude:
+            self.figure.tight_layout()
+            self._magnitude = magnitude
+
+    def save(self, path, format=None):
+        self.figure.savefig(path, format=format)
+
+
+def get_template(chart, scenario, groups):
+    """Template of this process for (chart, scenario, groups), built on first use."""
+    key = (chart, scenario, tuple(groups))
+    template = _TEMPLATES.get(key)
+    if template is None:
+        template = ChartTemplate(chart, scenario, groups)
+        _TEMPLATES[key] = template
+    return template
+
+
+# ---------- Single scenario ----------
+
+@traced("render_figures", rows=_group_rows)
+def render_figures(plot_data, scenario, value, directory, formats=DEFAULT_FORMATS,
+                   charts=CHART_NAMES, prefix=""):
+    """
+    Render the charts of one plot_data to <directory>/<prefix><chart>.<format>.
+
+    scenario: "price", "income" or "combined"; value: the new price level,
+    income factor or (price, income factor) pair.
+
+    Returns the written paths.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for chart in charts:
+        template = get_template(chart, scenario, plot_data["groups"])
+        template.update(plot_data, value)
+        for fmt in formats:
+            path = os.path.join(directory, f"{prefix}{chart}.{fmt}")
+            template.save(path, format=fmt)
+            paths.append(path)
+    return paths
+
+
+# ---------- Batches ----------
+
+def _render_jobs(jobs, output_dir, formats, charts):
+    paths = []
+    for job in jobs:
+        paths.extend(render_figures(
+            job["plot_data"],
+            job["scenario"],
+            job["value"],
+            output_dir,
+            formats=formats,
+            charts=charts,
+            prefix=f"{job['name']}_",
+        ))
+    return paths
+
+
+def render_batch(jobs, output_dir, formats=DEFAULT_FORMATS, charts=CHART_NAMES, workers=None):
+    """
+    Render many scenarios headless, across worker processes.
+
+    jobs: iterable of dicts with keys "name", "plot_data", "scenario" and
+    "value" (see render_figures). Files are written to
+    <output_dir>/<name>_<chart>.<format>. Jobs are split into contiguous
+    chunks, one or a few per worker, so each worker reuses its templates
+    across many charts. workers=1 renders in this process.
+
+    Returns the written paths, in job order.
+    """
+    jobs = list(jobs)
+    os.makedirs(output_dir, exist_ok=True)
+    if workers == 1 or len(jobs) <= 1:
+        return _render_jobs(jobs, output_dir, formats, charts)
+
+    n_workers = workers or os.cpu_count() or 1
+    n_chunks = min(len(jobs), 4 * n_workers)
+    bounds = np.linspace(0, len(jobs), n_chunks + 1).astype(int)
+    chunks = [jobs[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(_render_jobs, chunk, output_dir, formats, charts) for chunk in chunks]
+        for future in futures:
+            paths.extend(future.result())
+    return paths
+
+
+# ---------- Small multiples ----------
+
+def render_grid(plot_data_list, scenario, values, chart="demand", ncols=4, titles=None,
+                path=None, panel_size=(3.2, 2.6)):
+    """
+    Small-multiple grid: one baseline-vs-new panel per plot_data, sharing
+    the y-axis so panels are directly comparable.
+
+    values: scenario value per panel; titles: optional panel titles
+    (default: the scenario value). Saves to `path` if given and returns
+    the Figure.
+    """
+    n_panels = len(plot_data_list)
+    if n_panels == 0:
+        raise ValueError("plot_data_list is empty.")
+    ncols = min(ncols, n_panels)
+    nrows = math.ceil(n_panels / ncols)
+
+    figure = _agg_figure((panel_size[0] * ncols, panel_size[1] * nrows))
+    axes = figure.subplots(nrows, ncols, sharey=True, squeeze=False).ravel()
+
+    for i, (ax, plot_data, value) in enumerate(zip(axes, plot_data_list, values)):
+        title = titles[i] if titles is not None else format_value(scenario, value)
+        draw_grouped_bars(ax, plot_data, chart, scenario, value, title=title)
+        ax.title.set_fontsize("small")
+        ax.get_legend().remove()
+        if i % ncols:
+            ax.set_ylabel("")
+        if i < n_panels - ncols:
+            ax.set_xlabel("")
+    for ax in axes[n_panels:]:
+        ax.set_visible(False)
+
+    handles, labels = axes[0].get_legend_handles_labels()
+    figure.legend(handles, [labels[0], CHARTS[chart]["new_label"]], loc="lower center", ncol=2)
+    figure.suptitle(chart_title(chart, scenario), fontsize="medium")
+    figure.tight_layout(rect=(0, 0.05, 1, 0.97))
+
+    if path is not None:
+        figure.savefig(path)
+    return figure
+
+
+def sweep_panels(sweep_result):
+    """
+    Turn a sweep.sweep_scenarios result into (plot_data_list, scenario,
+    values, ncols) for render_grid: one panel per (price, income factor),
+    rows are price levels and columns income factors.
+    """
+    prices = sweep_result["price_levels"]
+    factors = sweep_result["income_factors"]
+    if len(factors) == 1:
+        scenario = "price"
+    elif len(prices) == 1:
+        scenario = "income"
+    else:
+        scenario = "combined"
+
+    plot_data_list, values = [], []
+    for i, price in enumerate(prices):
+        for j, factor in enumerate(factors):
+            plot_data_list.append({
+                "groups": sweep_result["groups"],
+                "baseline_demand": sweep_result["baseline_demand"],
+                "new_demand": sweep_result["mean_demand"][i, j],
+                "baseline_budget_share": sweep_result["baseline_budget_share"],
+                "new_budget_share": sweep_result["mean_budget_share"][i, j],
+            })
+            values.append({"price": price, "income": factor, "combined": (price, factor)}[scenario])
+    return plot_data_list, scenario, values, len(factors)
+
+
+def render_sweep_grid(sweep_result, chart="demand", path=None):
+    """Small multiples of a whole price × income sweep in one figure."""
+    plot_data_list, scenario, values, ncols = sweep_panels(sweep_result)
+    ncols = ncols if ncols > 1 else min(len(values), 4)
+    return render_grid(plot_data_list, scenario, values, chart=chart, ncols=ncols, path=path)
@@ -0,0 +1,159 @@
+"""
+replication.py
+
+Monte Carlo replications of a scenario over independently drawn populations.
+
+A single draw of a few hundred households says nothing about sampling
+noise. `run_replications` draws R populations, each from its own
+np.random.Generator spawned from one master np.random.SeedSequence, runs
+the same scenario on every population and summarises the spread of the
+results with confidence intervals.
+
+Replication r always uses child seed r of the master seed, and results are
+collected in replication order, so the output is bit-identical for a given
+master seed regardless of the number of worker processes.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from Economy import Economy, economy_calculations, build_summary_and_plot_data
+
+
+def _run_one_replication(household_number, seed_sequence, new_income, new_food_price):
+    """
+    Draw one population and run the scenario on it.
+
+    Returns a flat dict of scalars / 1-D arrays so that replications can be
+    stacked along a new leading axis.
+    """
+    rng = np.random.default_rng(seed_sequence)
+
+    econ = Economy(household_number=household_number)
+    econ.create_economy(rng=rng)
+
+    baseline, income_change, price_change = economy_calculations(
+        econ,
+        new_income=new_income,
+        new_food_price=new_food_price,
+    )
+
+    # budget shares are evaluated at the scenario price (baseline price if none)
+    price_for_shares = new_food_price
+    if price_for_shares is None:
+        price_for_shares = econ.households[0].food_price
+
+    table_summary, plot_data = build_summary_and_plot_data(
+        econ,
+        new_food_price=price_for_shares,
+    )
+
+    result = {
+        "aggregate_food_baseline": baseline,
+        "aggregate_food_demand_income_change": income_change,
+        "aggregate_food_demand_price_change": price_change,
+        "aggregate_food_demand_combined_change": econ.aggregate_food_demand_combined_change,
+    }
+    result.update(table_summary)
+    for key in ("baseline_demand", "new_demand", "baseline_budget_share", "new_budget_share"):
+        result[key] = np.asarray(plot_data[key], dtype=np.float64)
+
+    return plot_data["groups"], result
+
+
+def _confidence_interval(samples, confidence):
+    """
+    Normal-approximation confidence interval for the mean over axis 0.
+
+    Returns mean, standard deviation across replications, low and high.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    n = samples.shape[0]
+    mean = samples.mean(axis=0)
+    std = samples.std(axis=0, ddof=1) if n > 1 else np.zeros_like(mean)
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    half_width = z * std / np.sqrt(n)
+    return {
+        "mean": mean,
+        "std": std,
+        "ci_low": mean - half_width,
+        "ci_high": mean + half_width,
+    }
+
+
+def run_replications(
+    household_number,
+    n_replications,
+    new_income=None,
+    new_food_price=None,
+    seed=None,
+    workers=None,
+    confidence=0.95,
+):
+    """
+    Run R independent replications of one scenario.
+
+    Parameters
+    ----------
+    household_number : int
+        Households per replication.
+    n_replications : int
+        Number of independent populations R.
+    new_income, new_food_price :
+        Scenario passed to economy_calculations for every replication.
+    seed : int or None
+        Master seed. None draws fresh OS entropy (not reproducible).
+    workers : int or None
+        Processes in the pool. 1 runs serially in this process; None lets
+        ProcessPoolExecutor choose.
+    confidence : float
+        Confidence level of the intervals (e.g. 0.95).
+
+    Returns
+    -------
+    dict with keys:
+        - "seed": the master seed entropy (use it to reproduce the run)
+        - "n_replications"
+        - "groups": income group labels
+        - "samples": {stat: array with replications on axis 0}
+        - "summary": {stat: {"mean", "std", "ci_low", "ci_high"}}
+
+    Stats cover the aggregates returned by economy_calculations, the table
+    summary of build_summary_and_plot_data and its per-group plot data.
+    """
+    if n_replications < 1:
+        raise ValueError("n_replications must be at least 1.")
+
+    master = np.random.SeedSequence(seed)
+    children = master.spawn(n_replications)
+
+    args = (
+        [household_number] * n_replications,
+        children,
+        [new_income] * n_replications,
+        [new_food_price] * n_replications,
+    )
+
+    if workers == 1:
+        outputs = list(map(_run_one_replication, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map preserves submission order, so results stay in replication order
+            outputs = list(pool.map(_run_one_replication, *args))
+
+    groups = outputs[0][0]
+    results = [result for _, result in outputs]
+
+    samples = {key: np.stack([np.asarray(r[key]) for r in results]) for key in results[0]}
+    summary = {key: _confidence_interval(values, confidence) for key, values in samples.items()}
+
+    return {
+        "seed": master.entropy,
+        "n_replications": n_replications,
+        "groups": groups,
+        "samples": samples,
+        "summary": summary,
+    }
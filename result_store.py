@@ -0,0 +1,356 @@
+"""
+result_store.py
+
+Content-addressed, persistent store of scenario results.
+
+A result is addressed by the sha256 of (population parameters, model
+version, scenario parameters), all in canonical form, so the same
+scenario on the same population is found again whoever computed it and
+however it was spelled ("quartiles" or no grouping, 1.1 or 1.10).
+Changing MODEL_VERSION, or the population cache format, invalidates
+every stored result.
+
+Layout of a store directory:
+
+    index.sqlite            one row per result: key, population key, scenario
+                            parameters and the scalar aggregates, indexed for
+                            lookups and range queries by population and price /
+                            income
+    objects/<kk>/<key>/
+        result.json         scenario, aggregates, table summary, group labels
+        groups.npz          the per-group table, one array per column
+        <column>.npy        optional per-household columns (current demand,
+                            current income), reopened memory-mapped
+
+Entries are written to a temporary directory and renamed into place
+before the index row is committed, so concurrent batch workers never
+see half-written results.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from population_cache import SPEC_KEYWORDS, generation_params
+
+
+# Bump when the demand rules or the reported statistics change, so results
+# computed by an older model are no longer matched
+MODEL_VERSION = 1
+
+INDEX_NAME = "index.sqlite"
+
+# Per-household columns stored with households=True
+HOUSEHOLD_COLUMNS = ("current_food_demand", "current_income")
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    population_key TEXT NOT NULL,
+    population TEXT NOT NULL,
+    model_version INTEGER NOT NULL,
+    new_food_price REAL,
+    new_income REAL,
+    grouping TEXT,
+    welfare INTEGER NOT NULL,
+    households INTEGER NOT NULL,
+    baseline REAL,
+    income_change REAL,
+    price_change REAL,
+    combined_change REAL,
+    mean_demand REAL,
+    total_demand REAL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_by_price ON results (population_key, new_food_price, new_income);
+CREATE INDEX IF NOT EXISTS results_by_income ON results (population_key, new_income, new_food_price);
+"""
+
+# Index columns returned by ResultStore.query, in order
+QUERY_COLUMNS = (
+    "key", "new_food_price", "new_income", "grouping", "welfare", "households",
+    "baseline", "income_change", "price_change", "combined_change",
+    "mean_demand", "total_demand",
+)
+
+
+# ---------- Canonical keys ----------
+
+def scenario_key(scenario):
+    """
+    Canonical, hashable form of a scenario: (new_food_price, new_income,
+    grouping, welfare). Equivalent spellings ("quartiles" and no grouping,
+    1.1 and "1.10") map to the same key.
+    """
+    new_food_price = scenario.get("new_food_price")
+    new_income = scenario.get("new_income")
+    if new_food_price is None and new_income is None:
+        raise ValueError("A scenario needs new_food_price and/or new_income.")
+
+    grouping = scenario.get("grouping")
+    if grouping == "quartiles":
+        grouping = None
+    elif isinstance(grouping, str) and grouping.isdigit():
+        grouping = int(grouping)
+    elif isinstance(grouping, (list, tuple)):
+        grouping = tuple(float(edge) for edge in grouping)
+
+    return (
+        None if new_food_price is None else float(new_food_price),
+        None if new_income is None else float(new_income),
+        grouping,
+        bool(scenario.get("welfare", False)),
+    )
+
+
+def scenario_from_key(key):
+    """Scenario dict of a scenario_key."""
+    new_food_price, new_income, grouping, welfare = key
+    return {
+        "new_food_price": new_food_price,
+        "new_income": new_income,
+        "grouping": list(grouping) if isinstance(grouping, tuple) else grouping,
+        "welfare": welfare,
+    }
+
+
+def population_params(population_spec):
+    """
+    Canonical parameters of a population spec (as in run_scenarios.py):
+    the full generation parameters of a synthetic population, or the
+    absolute path, size and modification time of a microdata file plus
+    its load options.
+    """
+    if "microdata" in population_spec:
+        path = os.path.abspath(population_spec["microdata"])
+        stat = os.stat(path)
+        options = {name: value for name, value in population_spec.items() if name != "microdata"}
+        return {"microdata": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns, **options}
+
+    kwargs = {name: population_spec[name] for name in SPEC_KEYWORDS if name in population_spec}
+    return generation_params(population_spec["household_number"], population_spec["seed"], **kwargs)
+
+
+def _hash(value):
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def population_key(population_spec):
+    """Stable hash of a population spec."""
+    return _hash(population_params(population_spec))
+
+
+def result_key(population_spec, scenario):
+    """Stable hash of (population, MODEL_VERSION, scenario)."""
+    return _hash({
+        "population": population_params(population_spec),
+        "model_version": MODEL_VERSION,
+        "scenario": scenario_from_key(scenario_key(scenario)),
+    })
+
+
+# ---------- Store ----------
+
+class ResultStore:
+    """
+    Directory of scenario results with a SQLite index.
+
+    Parameters
+    ----------
+    root : str
+        Store directory, created if needed. Safe to share between
+        processes: every index write is a short transaction.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._execute(_INDEX_SCHEMA, script=True)
+
+    def _execute(self, sql, parameters=(), script=False):
+        """Run one statement (or script) in its own transaction; returns all rows."""
+        connection = sqlite3.connect(os.path.join(self.root, INDEX_NAME), timeout=60.0)
+        try:
+            with connection:
+                if script:
+                    connection.executescript(sql)
+                    return []
+                return connection.execute(sql, parameters).fetchall()
+        finally:
+            connection.close()
+
+    def path(self, key):
+        return os.path.join(self.root, "objects", key[:2], key)
+
+    def contains(self, population_spec, scenario):
+        """True if the result of this scenario is stored (one index lookup)."""
+        key = result_key(population_spec, scenario)
+        return bool(self._execute("SELECT 1 FROM results WHERE key = ?", (key,)))
+
+    def put(self, population_spec, scenario, aggregates, table_summary, plot_data, population=None):
+        """
+        Store one scenario result and return its key.
+
+        With a `population`, its per-household HOUSEHOLD_COLUMNS (the
+        scenario's demand and income) are stored too, also when the result
+        itself was stored before without them. Storing a result again
+        without a population never drops stored household columns.
+        """
+        key = result_key(population_spec, scenario)
+        canonical = scenario_from_key(scenario_key(scenario))
+        directory = self.path(key)
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(directory))
+        try:
+            with open(os.path.join(tmp, "result.json"), "w") as f:
+                json.dump({
+                    "population": population_params(population_spec),
+                    "model_version": MODEL_VERSION,
+                    "scenario": canonical,
+                    "aggregates": aggregates,
+                    "table_summary": table_summary,
+                    "groups": list(plot_data["groups"]),
+                }, f, indent=2)
+            np.savez(
+                os.path.join(tmp, "groups.npz"),
+                **{name: np.asarray(values) for name, values in plot_data.items() if name != "groups"},
+            )
+            if population is not None:
+                for name in HOUSEHOLD_COLUMNS:
+                    np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(population, name)))
+
+            # same key, same content: keep an entry another process already
+            # wrote, only adding household columns it does not have yet
+            if os.path.exists(directory):
+                if population is not None:
+                    for name in HOUSEHOLD_COLUMNS:
+                        target = os.path.join(directory, name + ".npy")
+                        if not os.path.exists(target):
+                            os.replace(os.path.join(tmp, name + ".npy"), target)
+                shutil.rmtree(tmp)
+            else:
+                os.replace(tmp, directory)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        # the flag reflects the files, and an upsert never clears it
+        households = all(
+            os.path.exists(os.path.join(directory, name + ".npy")) for name in HOUSEHOLD_COLUMNS
+        )
+        self._execute(
+            "INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET households = MAX(households, excluded.households)",
+            (
+                key,
+                population_key(population_spec),
+                json.dumps(population_params(population_spec), sort_keys=True),
+                MODEL_VERSION,
+                canonical["new_food_price"],
+                canonical["new_income"],
+                json.dumps(canonical["grouping"]),
+                int(canonical["welfare"]),
+                int(households),
+                aggregates["baseline"],
+                aggregates["income_change"],
+                aggregates["price_change"],
+                aggregates["combined_change"],
+                table_summary["mean_demand"],
+                table_summary["total_demand"],
+                time.time(),
+            ),
+        )
+        return key
+
+    def load(self, key, households=False, mmap_mode="r"):
+        """
+        Stored result by key, or None: a dict with "scenario",
+        "aggregates", "table_summary" and "plot_data" (lists, as returned
+        by build_summary_and_plot_data) and, with households=True,
+        "households": column name -> array (memory-mapped by default).
+        """
+        directory = self.path(key)
+        if not os.path.exists(os.path.join(directory, "result.json")):
+            return None
+        with open(os.path.join(directory, "result.json")) as f:
+            stored = json.load(f)
+        with np.load(os.path.join(directory, "groups.npz")) as groups:
+            plot_data = {"groups": stored["groups"]}
+            plot_data.update({name: groups[name].tolist() for name in groups.files})
+
+        result = {
+            "key": key,
+            "scenario": stored["scenario"],
+            "aggregates": stored["aggregates"],
+            "table_summary": stored["table_summary"],
+            "plot_data": plot_data,
+        }
+        if households:
+            result["households"] = {
+                name: np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+                for name in HOUSEHOLD_COLUMNS
+                if os.path.exists(os.path.join(directory, name + ".npy"))
+            }
+        return result
+
+    def get(self, population_spec, scenario, households=False, mmap_mode="r"):
+        """Stored result of a scenario (see load), or None."""
+        return self.load(result_key(population_spec, scenario), households, mmap_mode)
+
+    def query(self, population_spec=None, new_food_price=None, new_income=None, grouping=None,
+              welfare=None):
+        """
+        Index rows matching the filters, ordered by price and income level.
+
+        new_food_price, new_income: None (any), a number, or a (low, high)
+        inclusive range. grouping: None (any) or a grouping spec. Every row
+        is a dict of QUERY_COLUMNS, including the scalar aggregates, so
+        e.g. a demand curve over all stored price levels of a population
+        needs no file reads; pass row["key"] to load() for the full result.
+        """
+        clauses, values = ["model_version = ?"], [MODEL_VERSION]
+        if population_spec is not None:
+            clauses.append("population_key = ?")
+            values.append(population_key(population_spec))
+        for column, value in (("new_food_price", new_food_price), ("new_income", new_income)):
+            if value is None:
+                continue
+            if np.ndim(value):
+                clauses.append(f"{column} BETWEEN ? AND ?")
+                values.extend(float(bound) for bound in value)
+            else:
+                clauses.append(f"{column} = ?")
+                values.append(float(value))
+        if grouping is not None:
+            canonical = scenario_key({"new_food_price": 1.0, "grouping": grouping})[2]
+            clauses.append("grouping = ?")
+            values.append(json.dumps(list(canonical) if isinstance(canonical, tuple) else canonical))
+        if welfare is not None:
+            clauses.append("welfare = ?")
+            values.append(int(welfare))
+
+        sql = (
+            f"SELECT {', '.join(QUERY_COLUMNS)} FROM results WHERE {' AND '.join(clauses)} "
+            "ORDER BY new_food_price, new_income"
+        )
+        rows = self._execute(sql, values)
+
+        results = []
+        for row in rows:
+            entry = dict(zip(QUERY_COLUMNS, row))
+            entry["grouping"] = json.loads(entry["grouping"])
+            entry["welfare"] = bool(entry["welfare"])
+            entry["households"] = bool(entry["households"])
+            results.append(entry)
+        return results
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(*) FROM results")[0][0]
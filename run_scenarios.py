@@ -0,0 +1,373 @@
+"""
+Batch scenario runner.
+
+Runs every scenario listed in a JSON scenario file headless, across a
+process pool, and writes tables and figures to an output directory.
+
+Scenario file format:
+
+    {
+      "populations": {
+        "national": {"household_number": 1000000, "seed": 1,
+                     "sigma": 0.55, "target_mean_income": 30000}
+      },
+      "scenarios": [
+        {"name": "price_+10%", "population": "national", "new_food_price": 1.10},
+        {"name": "income_x1.5", "population": "national", "new_income": 1.5,
+         "grouping": "deciles"},
+        {"name": "both", "population": "national",
+         "new_food_price": 1.10, "new_income": 1.05, "figures": false}
+      ]
+    }
+
+Population specs take household_number, seed and optionally sigma,
+target_mean_income, income_elasticity_food, price_elasticity_food and
+dtype (see Economy.create_economy; unknown keys raise ValueError), or
+"microdata" (a CSV / .npy survey file, see microdata.py) plus optional
+load_microdata keyword arguments. Scenarios take new_food_price and/or
+new_income, an optional grouping (see build_summary_and_plot_data),
+"welfare" and "figures".
+
+Every population is generated once per worker process and reused by all
+the scenarios that share it. For each scenario the output directory gets
+<name>/table.json, <name>/groups.csv and, unless disabled, figures. With
+--store, results are kept in a content-addressed result store and
+scenarios already in it are not recomputed on later runs.
+
+Usage:
+    python run_scenarios.py scenarios.json --output results --workers 8
+    python run_scenarios.py scenarios.json --store results/store
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Economy import Economy, economy_calculations, build_summary_and_plot_data
+from population_cache import SPEC_KEYWORDS
+
+
+DEFAULT_BATCH_SIZE = 64
+
+# Populations generated in this (worker) process, keyed by their spec, least
+# recently used first. Batches are planned population by population, so a
+# worker rarely needs more than the current and the previous one resident.
+_POPULATIONS = OrderedDict()
+MAX_RESIDENT_POPULATIONS = 2
+
+
+# ---------- Scenario file ----------
+
+def load_scenario_file(path):
+    """Read and validate a scenario file; returns (populations, scenarios)."""
+    with open(path) as f:
+        spec = json.load(f)
+
+    populations = spec.get("populations", {})
+    scenarios = spec.get("scenarios", [])
+
+    names = set()
+    for scenario in scenarios:
+        name = scenario.get("name")
+        if not name:
+            raise ValueError("Every scenario needs a name.")
+        _validate_name(name)
+        if name in names:
+            raise ValueError(f"Duplicate scenario name {name!r}.")
+        names.add(name)
+        if scenario.get("population") not in populations:
+            raise ValueError(f"Scenario {name!r} refers to an unknown population.")
+        if scenario.get("new_food_price") is None and scenario.get("new_income") is None:
+            raise ValueError(f"Scenario {name!r} needs new_food_price and/or new_income.")
+
+    for name, population in populations.items():
+        validate_population_spec(name, population)
+
+    return populations, scenarios
+
+
+def _validate_name(name):
+    """Scenario names become output directories: one plain path component."""
+    separators = {"/", "\\", os.sep, os.altsep} - {None}
+    if (
+        not isinstance(name, str)
+        or name in (".", "..")
+        or "\0" in name
+        or any(separator in name for separator in separators)
+    ):
+        raise ValueError(
+            f"Invalid scenario name {name!r}: use a single file name without path separators."
+        )
+
+
+def validate_population_spec(name, population):
+    """
+    Raise ValueError unless `population` is a synthetic or microdata spec
+    without unknown keys.
+    """
+    if "microdata" in population:
+        import inspect
+        from microdata import load_microdata
+
+        allowed = set(inspect.signature(load_microdata).parameters) - {"path"}
+        allowed.add("microdata")
+    else:
+        if "household_number" not in population or "seed" not in population:
+            raise ValueError(f"Population {name!r} needs household_number and seed (or microdata).")
+        allowed = {"household_number", "seed", *SPEC_KEYWORDS}
+    unknown = set(population) - allowed
+    if unknown:
+        raise ValueError(
+            f"Population {name!r} has unknown keys {sorted(unknown)}; expected some of "
+            f"{sorted(allowed)}."
+        )
+
+
+# ---------- Worker side ----------
+
+def build_economy(population_spec, cache_dir=None):
+    """
+    Build the Economy of one population spec: load its microdata file, or
+    generate it (reopened from the population cache if cache_dir is given).
+    """
+    if "microdata" in population_spec:
+        kwargs = {name: value for name, value in population_spec.items() if name != "microdata"}
+        econ = Economy(household_number=0)
+        econ.load_microdata(population_spec["microdata"], **kwargs)
+        return econ
+
+    econ = Economy(household_number=population_spec["household_number"])
+    kwargs = {name: population_spec[name] for name in SPEC_KEYWORDS if name in population_spec}
+    if cache_dir is not None:
+        from population_cache import PopulationCache
+
+        econ.create_economy(cache=PopulationCache(cache_dir), seed=population_spec["seed"], **kwargs)
+    else:
+        econ.create_economy(rng=np.random.default_rng(population_spec["seed"]), **kwargs)
+    return econ
+
+
+def _economy_for(population_spec, cache_dir):
+    key = json.dumps(population_spec, sort_keys=True)
+    econ = _POPULATIONS.get(key)
+    if econ is None:
+        econ = _POPULATIONS[key] = build_economy(population_spec, cache_dir)
+        while len(_POPULATIONS) > MAX_RESIDENT_POPULATIONS:
+            _POPULATIONS.popitem(last=False)
+    else:
+        _POPULATIONS.move_to_end(key)
+    return econ
+
+
+def evaluate_scenario(econ, scenario):
+    """
+    Run one scenario (new_food_price and/or new_income, optional grouping
+    and welfare) on an economy; returns (aggregates, table_summary, plot_data).
+    """
+    new_food_price = scenario.get("new_food_price")
+    new_income = scenario.get("new_income")
+    baseline_price = float(econ.population.food_price[0])
+
+    economy_calculations(econ, new_income=new_income, new_food_price=new_food_price)
+    aggregates = {
+        "baseline": econ.aggregate_food_baseline,
+        "income_change": econ.aggregate_food_demand_income_change,
+        "price_change": econ.aggregate_food_demand_price_change,
+        "combined_change": econ.aggregate_food_demand_combined_change,
+    }
+    table_summary, plot_data = build_summary_and_plot_data(
+        econ,
+        new_food_price=baseline_price if new_food_price is None else new_food_price,
+        grouping=scenario.get("grouping"),
+        welfare=scenario.get("welfare", False),
+    )
+    return aggregates, table_summary, plot_data
+
+
+def _write_outputs(directory, scenario, aggregates, table_summary, plot_data):
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "table.json"), "w") as f:
+        json.dump(
+            {"scenario": scenario, "aggregates": aggregates, "table_summary": table_summary},
+            f,
+            indent=2,
+        )
+
+    columns = ["count", "baseline_demand", "new_demand", "baseline_budget_share", "new_budget_share"]
+    with open(os.path.join(directory, "groups.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["group"] + columns)
+        for i, group in enumerate(plot_data["groups"]):
+            writer.writerow([group] + [plot_data[column][i] for column in columns])
+
+
+def _write_figures(directory, scenario, plot_data, formats):
+    from rendering import render_figures
+
+    new_food_price = scenario.get("new_food_price")
+    new_income = scenario.get("new_income")
+    if new_food_price is not None and new_income is not None:
+        kind, value = "combined", (new_food_price, new_income)
+    elif new_food_price is not None:
+        kind, value = "price", new_food_price
+    else:
+        kind, value = "income", new_income
+
+    render_figures(plot_data, kind, value, directory, formats=formats)
+
+
+def _outputs_current(directory, scenario):
+    """True if `directory` already holds the table of exactly this scenario."""
+    try:
+        with open(os.path.join(directory, "table.json")) as f:
+            return json.load(f)["scenario"] == scenario
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+def run_batch(population_spec, scenarios, output_dir, cache_dir=None, formats=("png",),
+              store_dir=None, store_households=False):
+    """
+    Run a batch of scenarios that share one population (worker entry point).
+
+    With a result store (store_dir, see result_store.py), scenarios already
+    in the store are not recomputed: their outputs are written from the
+    stored result, or skipped altogether if the output directory already
+    holds them. The population is only built if some scenario is missing,
+    and new results are added to the store (with the per-household demand
+    and income columns if store_households).
+
+    Returns one summary dict per scenario.
+    """
+    store = None
+    if store_dir is not None:
+        from result_store import ResultStore
+
+        store = ResultStore(store_dir)
+
+    econ = None
+    summaries = []
+    for scenario in scenarios:
+        _validate_name(scenario["name"])
+        directory = os.path.join(output_dir, scenario["name"])
+        stored = None if store is None else store.get(population_spec, scenario)
+
+        if stored is not None:
+            aggregates, table_summary, plot_data = (
+                stored["aggregates"], stored["table_summary"], stored["plot_data"]
+            )
+        else:
+            if econ is None:
+                econ = _economy_for(population_spec, cache_dir)
+            aggregates, table_summary, plot_data = evaluate_scenario(econ, scenario)
+            if store is not None:
+                store.put(
+                    population_spec, scenario, aggregates, table_summary, plot_data,
+                    population=econ.population if store_households else None,
+                )
+
+        if stored is None or not _outputs_current(directory, scenario):
+            _write_outputs(directory, scenario, aggregates, table_summary, plot_data)
+            if scenario.get("figures", True) and formats:
+                _write_figures(directory, scenario, plot_data, formats)
+
+        summary = {"name": scenario["name"], "aggregates": aggregates, **table_summary}
+        if store is not None:
+            summary["from_store"] = stored is not None
+        summaries.append(summary)
+
+    return summaries
+
+
+# ---------- Driver ----------
+
+def plan_batches(populations, scenarios, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Group scenarios by population and split each group into batches, so a
+    population with thousands of scenarios can still use several workers.
+    """
+    by_population = {}
+    for scenario in scenarios:
+        by_population.setdefault(scenario["population"], []).append(scenario)
+
+    batches = []
+    for name, group in by_population.items():
+        for start in range(0, len(group), batch_size):
+            batches.append((populations[name], group[start:start + batch_size]))
+    return batches
+
+
+def run_scenario_file(path, output_dir, workers=None, cache_dir=None, formats=("png",),
+                      batch_size=DEFAULT_BATCH_SIZE, store_dir=None, store_households=False):
+    """
+    Run every scenario of a scenario file and write results.json.
+
+    store_dir: result store directory; scenarios already stored there are
+    not recomputed (see run_batch).
+    """
+    populations, scenarios = load_scenario_file(path)
+    batches = plan_batches(populations, scenarios, batch_size)
+    os.makedirs(output_dir, exist_ok=True)
+
+    options = (output_dir, cache_dir, formats, store_dir, store_households)
+    summaries = []
+    if workers == 1:
+        for population_spec, batch in batches:
+            summaries.extend(run_batch(population_spec, batch, *options))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(run_batch, population_spec, batch, *options)
+                for population_spec, batch in batches
+            ]
+            for future in futures:
+                summaries.extend(future.result())
+
+    with open(os.path.join(output_dir, "results.json"), "w") as f:
+        json.dump(summaries, f, indent=2)
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run demand scenarios headless in parallel.")
+    parser.add_argument("scenario_file", help="JSON scenario file")
+    parser.add_argument("--output", default="results", help="output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes (default: all cores; 1 = run in-process)")
+    parser.add_argument("--cache", default=None,
+                        help="population cache directory shared by all workers")
+    parser.add_argument("--formats", nargs="*", default=["png"],
+                        help="figure formats, e.g. png svg (none to skip figures)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="scenarios per task for populations with many scenarios")
+    parser.add_argument("--store", default=None,
+                        help="result store directory; stored scenarios are not recomputed")
+    parser.add_argument("--store-households", action="store_true",
+                        help="also store per-household demand and income columns")
+    args = parser.parse_args(argv)
+
+    summaries = run_scenario_file(
+        args.scenario_file,
+        args.output,
+        workers=args.workers,
+        cache_dir=args.cache,
+        formats=tuple(args.formats),
+        batch_size=args.batch_size,
+        store_dir=args.store,
+        store_households=args.store_households,
+    )
+    reused = sum(summary.get("from_store", False) for summary in summaries)
+    print(f"Ran {len(summaries) - reused} scenarios ({reused} from the store); "
+          f"results in {args.output}/")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,358 @@
+"""
+Local scenario query service.
+
+Keeps one or more populations resident in memory and answers price /
+income scenario queries over HTTP (TCP or a Unix socket), so dashboards
+do not pay for interpreter start-up and population generation on every
+query:
+
+    - the demand and grouping computations run on a thread pool (NumPy
+      releases the GIL in the heavy kernels); scenarios on the same
+      population are serialized by a per-population lock, since they write
+      its scenario columns
+    - results are memoized in an LRU cache keyed by (population id,
+      scenario), so repeat queries are answered without any computation
+    - concurrent identical queries are coalesced: the first one computes,
+      the others await the same future
+
+Endpoints (all responses are JSON):
+
+    GET  /query?population=national&price=1.1&income=1.05&grouping=deciles&welfare=1
+    POST /query                 body: {"population": ..., "new_food_price": ...,
+                                       "new_income": ..., "grouping": ..., "welfare": ...}
+    GET  /populations           resident populations and their sizes
+    POST /populations/<id>      body: population spec (as in run_scenarios.py);
+                                loads or replaces <id> and drops its cached results
+    GET  /stats                 cache hits, misses, coalesced queries, entries
+
+The X-Cache response header of a query is "hit", "miss" or "coalesced".
+
+Usage:
+    python service.py populations.json --port 8765 --workers 4
+    python service.py populations.json --unix /tmp/demand.sock
+
+populations.json has the "populations" section of a scenario file.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from result_store import scenario_key, scenario_from_key
+from run_scenarios import build_economy, evaluate_scenario, validate_population_spec
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 4096
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+# ---------- Query parameters ----------
+
+def _scenario_from_params(params):
+    """Scenario dict from query-string parameters (price, income, grouping, welfare)."""
+    grouping = params.get("grouping")
+    if grouping is not None and "," in grouping:
+        grouping = [float(edge) for edge in grouping.split(",")]
+    return {
+        "new_food_price": params.get("price"),
+        "new_income": params.get("income"),
+        "grouping": grouping,
+        "welfare": params.get("welfare", "").lower() in ("1", "true", "yes"),
+    }
+
+
+def _json_object(body, what):
+    """Decoded JSON request body, which must be an object (ValueError otherwise)."""
+    value = json.loads(body or b"{}")
+    if not isinstance(value, dict):
+        raise ValueError(f"The {what} must be a JSON object, got {type(value).__name__}.")
+    return value
+
+
+# ---------- Result cache ----------
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ---------- Service ----------
+
+class _Resident:
+    """A loaded population with the lock that serializes its scenarios."""
+
+    def __init__(self, spec, econ):
+        self.spec = spec
+        self.econ = econ
+        self.lock = threading.Lock()
+
+    def evaluate(self, scenario):
+        with self.lock:
+            aggregates, table_summary, plot_data = evaluate_scenario(self.econ, scenario)
+        return {"aggregates": aggregates, "table_summary": table_summary, "plot_data": plot_data}
+
+
+class ScenarioService:
+    """
+    Resident populations, a worker pool and a coalescing LRU result cache.
+
+    All coroutines must run on one event loop; the cache and the in-flight
+    table are only touched from that loop, the pool only runs the
+    population loading and the scenario computations.
+    """
+
+    def __init__(self, workers=None, cache_size=DEFAULT_CACHE_SIZE, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.cache = LRUCache(cache_size)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._populations = {}
+        self._in_flight = {}
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    async def add_population(self, population_id, spec):
+        """Load (or replace) a population and drop its cached results."""
+        validate_population_spec(population_id, spec)
+        loop = asyncio.get_running_loop()
+        econ = await loop.run_in_executor(self._pool, build_economy, spec, self.cache_dir)
+        self._populations[population_id] = _Resident(spec, econ)
+        self.cache.discard(lambda key: key[0] == population_id)
+
+    def populations(self):
+        return {
+            population_id: {
+                "spec": resident.spec,
+                "size": resident.econ.population.size,
+                "households": resident.econ.population.total_weight,
+            }
+            for population_id, resident in self._populations.items()
+        }
+
+    async def query(self, population_id, scenario):
+        """
+        Result of one scenario on a resident population, as a dict with
+        "aggregates", "table_summary" and "plot_data".
+
+        Returns (result, status) with status "hit", "miss" or "coalesced".
+        Raises KeyError for an unknown population and ValueError for an
+        invalid scenario.
+        """
+        resident = self._populations.get(population_id)
+        if resident is None:
+            raise KeyError(population_id)
+        # the resident object is part of the key, so a replaced population
+        # never shares results or in-flight work with its predecessor
+        key = (population_id, scenario_key(scenario), id(resident))
+
+        result = self.cache.get(key)
+        if result is not None:
+            self.counters["hits"] += 1
+            return result, "hit"
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            return await asyncio.shield(future), "coalesced"
+
+        self.counters["misses"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, resident.evaluate, scenario_from_key(key[1]))
+        self._in_flight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self._in_flight[key]
+        if self._populations.get(population_id) is resident:
+            self.cache.put(key, result)
+        return result, "miss"
+
+    def stats(self):
+        return {**self.counters, "entries": len(self.cache), "in_flight": len(self._in_flight)}
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- HTTP ----------
+
+    async def _route(self, method, target, body):
+        """(status, payload, headers) for one request."""
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+
+        if path == "/query":
+            if method == "GET":
+                params = dict(parse_qsl(url.query))
+                population_id = params.get("population")
+                scenario = _scenario_from_params(params)
+            elif method == "POST":
+                scenario = _json_object(body, "query body")
+                population_id = scenario.pop("population", None)
+            else:
+                return 405, {"error": f"{method} not allowed"}, {}
+            if population_id not in self._populations:
+                return 404, {"error": f"unknown population {population_id!r}"}, {}
+            result, status = await self.query(population_id, scenario)
+            return 200, {"population": population_id, **result}, {"X-Cache": status}
+
+        if path == "/populations" and method == "GET":
+            return 200, self.populations(), {}
+
+        if path.startswith("/populations/") and method == "POST":
+            population_id = path[len("/populations/"):]
+            await self.add_population(population_id, _json_object(body, "population spec"))
+            return 200, {"population": population_id, **self.populations()[population_id]}, {}
+
+        if path == "/stats" and method == "GET":
+            return 200, self.stats(), {}
+
+        return 404, {"error": f"no route for {method} {path}"}, {}
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests (keep-alive) on one connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "malformed request line"}, {}, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                try:
+                    status, payload, extra_headers = await self._route(method, target, body)
+                except ValueError as error:
+                    # also covers json.JSONDecodeError
+                    status, payload, extra_headers = 400, {"error": str(error)}, {}
+                except Exception as error:
+                    status, payload, extra_headers = 500, {"error": repr(error)}, {}
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, extra_headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, extra_headers, keep_alive):
+        body = json.dumps(payload).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Length": str(len(body)),
+            "Connection": "keep-alive" if keep_alive else "close",
+            **extra_headers,
+        }
+        head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n" + "".join(
+            f"{name}: {value}\r\n" for name, value in headers.items()
+        )
+        writer.write(head.encode("latin-1") + b"\r\n" + body)
+        await writer.drain()
+
+
+async def serve(populations, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None, workers=None,
+                cache_size=DEFAULT_CACHE_SIZE, cache_dir=None, ready=None):
+    """
+    Load `populations` ({id: spec}) and serve queries until cancelled.
+
+    `ready`, if given, is an asyncio.Event set once the server accepts
+    connections.
+    """
+    service = ScenarioService(workers=workers, cache_size=cache_size, cache_dir=cache_dir)
+    try:
+        await asyncio.gather(*(
+            service.add_population(population_id, spec)
+            for population_id, spec in populations.items()
+        ))
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(service.handle_connection, path=unix_path)
+            where = unix_path
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port)
+            where = f"http://{host}:{port}"
+        print(f"Serving {len(populations)} population(s) on {where}", flush=True)
+        if ready is not None:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Serve demand scenario queries from resident populations."
+    )
+    parser.add_argument("populations", help="JSON file with a \"populations\" section")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="serve on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="computation threads")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="maximum number of memoized scenario results")
+    parser.add_argument("--cache", default=None, help="population cache directory")
+    args = parser.parse_args(argv)
+
+    with open(args.populations) as f:
+        populations = json.load(f).get("populations", {})
+
+    try:
+        asyncio.run(serve(
+            populations,
+            host=args.host,
+            port=args.port,
+            unix_path=args.unix,
+            workers=args.workers,
+            cache_size=args.cache_size,
+            cache_dir=args.cache,
+        ))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
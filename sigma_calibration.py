@@ -8,10 +8,16 @@ For a lognormal with log-income variance sigma^2:
 
 - Gini(sigma) = 2 * Phi(sigma / sqrt(2)) - 1 = erf(sigma / 2)
 - P90/P10(sigma) = exp(2 * z_0.9 * sigma), where z_0.9 ≈ 1.28155
+
+The *_array functions solve for many targets at once (e.g. hundreds of
+regional populations), and fit_lognormal fits (mu, sigma) jointly to
+several targets by weighted least squares.
 """
 
 import math
 
+import numpy as np
+
 
 # ---------- Gini-related functions ----------
 
@@ -88,6 +94,192 @@ def sigma_from_p90_p10(target_ratio: float) -> float:
     return math.log(target_ratio) / (2.0 * Z90)
 
 
+# ---------- Vectorized calibration ----------
+
+# Coefficients of Wichura's AS241 rational approximations to the standard
+# normal quantile (the algorithm behind statistics.NormalDist.inv_cdf),
+# highest degree first for np.polyval.
+_AS241_CENTRAL_NUM = [
+    2.5090809287301226727e+3, 3.3430575583588128105e+4, 6.7265770927008700853e+4,
+    4.5921953931549871457e+4, 1.3731693765509461125e+4, 1.9715909503065514427e+3,
+    1.3314166789178437745e+2, 3.3871328727963666080e+0,
+]
+_AS241_CENTRAL_DEN = [
+    5.2264952788528545610e+3, 2.8729085735721942674e+4, 3.9307895800092710610e+4,
+    2.1213794301586595867e+4, 5.3941960214247511077e+3, 6.8718700749205790830e+2,
+    4.2313330701600911252e+1, 1.0,
+]
+_AS241_INTERMEDIATE_NUM = [
+    7.74545014278341407640e-4, 2.27238449892691845833e-2, 2.41780725177450611770e-1,
+    1.27045825245236838258e+0, 3.64784832476320460504e+0, 5.76949722146069140550e+0,
+    4.63033784615654529590e+0, 1.42343711074968357734e+0,
+]
+_AS241_INTERMEDIATE_DEN = [
+    1.05075007164441684324e-9, 5.47593808499534494600e-4, 1.51986665636164571966e-2,
+    1.48103976427480074590e-1, 6.89767334985100004550e-1, 1.67638483018380384940e+0,
+    2.05319162663775882187e+0, 1.0,
+]
+_AS241_TAIL_NUM = [
+    2.01033439929228813265e-7, 2.71155556874348757815e-5, 1.24266094738807843860e-3,
+    2.65321895265761230930e-2, 2.96560571828504891230e-1, 1.78482653991729133580e+0,
+    5.46378491116411436990e+0, 6.65790464350110377720e+0,
+]
+_AS241_TAIL_DEN = [
+    2.04426310338993978564e-15, 1.42151175831644588870e-7, 1.84631831751005468180e-5,
+    7.86869131145613259100e-4, 1.48753612908506148525e-2, 1.36929880922735805310e-1,
+    5.99832206555887937690e-1, 1.0,
+]
+
+
+def norm_ppf(p):
+    """
+    Standard normal quantile function Phi^{-1}(p), vectorized over arrays.
+
+    Wichura's AS241 algorithm, accurate to about 1e-16 for 0 < p < 1.
+    """
+    p = np.asarray(p, dtype=np.float64)
+    q = p - 0.5
+
+    # central region |q| <= 0.425
+    r = 0.180625 - q * q
+    central = q * np.polyval(_AS241_CENTRAL_NUM, r) / np.polyval(_AS241_CENTRAL_DEN, r)
+
+    # tails, evaluated on the smaller of p and 1 - p
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.sqrt(-np.log(np.where(q <= 0.0, p, 1.0 - p)))
+        intermediate = (np.polyval(_AS241_INTERMEDIATE_NUM, r - 1.6)
+                        / np.polyval(_AS241_INTERMEDIATE_DEN, r - 1.6))
+        tail = np.polyval(_AS241_TAIL_NUM, r - 5.0) / np.polyval(_AS241_TAIL_DEN, r - 5.0)
+    outer = np.where(r <= 5.0, intermediate, tail)
+    outer = np.where(q < 0.0, -outer, outer)
+
+    return np.where(np.abs(q) <= 0.425, central, outer)
+
+
+def sigma_from_gini_array(target_gini) -> np.ndarray:
+    """
+    Closed-form sigma for an array of target Gini values.
+
+    Inverting Gini = 2 * Phi(sigma / sqrt(2)) - 1 gives
+        sigma = sqrt(2) * Phi^{-1}((1 + Gini) / 2)
+    with no iteration, for all targets at once.
+    """
+    target_gini = np.asarray(target_gini, dtype=np.float64)
+    if np.any((target_gini <= 0.0) | (target_gini >= 1.0)):
+        raise ValueError("target_gini must be between 0 and 1.")
+    return math.sqrt(2.0) * norm_ppf(0.5 * (1.0 + target_gini))
+
+
+def sigma_from_p90_p10_array(target_ratio) -> np.ndarray:
+    """Closed-form sigma for an array of target P90/P10 ratios."""
+    target_ratio = np.asarray(target_ratio, dtype=np.float64)
+    if np.any(target_ratio <= 1.0):
+        raise ValueError("target_ratio must be > 1.")
+    return np.log(target_ratio) / (2.0 * Z90)
+
+
+def fit_lognormal(gini=None,
+                  p90_p10=None,
+                  mean=None,
+                  median=None,
+                  weights=None,
+                  max_iter: int = 50,
+                  tol: float = 1e-12) -> dict:
+    """
+    Fit (mu, sigma) jointly to several targets by weighted least squares.
+
+    Each target is turned into a residual that is (close to) linear in the
+    parameters, so the targets are comparable in scale:
+
+        Gini     -> sigma - sigma_from_gini(Gini)
+        P90/P10  -> sigma - sigma_from_p90_p10(ratio)
+        mean     -> (mu + sigma^2 / 2) - ln(mean)
+        median   -> mu - ln(median)
+
+    and sum_k w_k * residual_k^2 is minimised with Gauss-Newton steps.
+    Targets may be scalars or arrays (broadcast together), so hundreds of
+    regional populations are calibrated in one call. Missing targets are
+    None or NaN.
+
+    weights: dict with optional keys "gini", "p90_p10", "mean", "median"
+    (default 1.0 each).
+
+    Returns a dict of arrays "mu", "sigma" and "target_mean_income"
+    (= exp(mu + sigma^2 / 2)), ready for Economy.create_economy.
+    """
+    names = ("gini", "p90_p10", "mean", "median")
+    raw = dict(zip(names, (gini, p90_p10, mean, median)))
+    weights = {} if weights is None else dict(weights)
+
+    shape = np.broadcast(*[np.asarray(v, dtype=np.float64)
+                           for v in raw.values() if v is not None]).shape
+    targets = {}
+    for name in names:
+        value = raw[name]
+        value = np.full(shape, np.nan) if value is None else np.broadcast_to(
+            np.asarray(value, dtype=np.float64), shape)
+        targets[name] = value
+
+    present = {name: ~np.isnan(targets[name]) for name in names}
+    if not np.all(present["mean"] | present["median"]):
+        raise ValueError("Every fit needs a target mean or median to pin down mu.")
+    if not np.all(present["gini"] | present["p90_p10"]
+                  | (present["mean"] & present["median"])):
+        raise ValueError("Every fit needs a Gini, P90/P10 or both mean and median.")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sigma_gini = math.sqrt(2.0) * norm_ppf(0.5 * (1.0 + targets["gini"]))
+        sigma_ratio = np.log(targets["p90_p10"]) / (2.0 * Z90)
+        log_mean = np.log(targets["mean"])
+        log_median = np.log(targets["median"])
+
+    def weight(name):
+        # absent targets get zero weight
+        return np.where(present[name], float(weights.get(name, 1.0)), 0.0)
+
+    w_g, w_r, w_m, w_d = (weight(name) for name in names)
+    sigma_gini = np.nan_to_num(sigma_gini)
+    sigma_ratio = np.nan_to_num(sigma_ratio)
+    log_mean = np.nan_to_num(log_mean)
+    log_median = np.nan_to_num(log_median)
+
+    # start from the direct sigma estimates (or 0.55) and a matching mu
+    sigma_weight = w_g + w_r
+    sigma = np.where(sigma_weight > 0,
+                     (w_g * sigma_gini + w_r * sigma_ratio) / np.where(sigma_weight > 0, sigma_weight, 1.0),
+                     0.55)
+    mu = np.where(present["median"], log_median, log_mean - 0.5 * sigma**2)
+
+    for _ in range(max_iter):
+        r_g = sigma - sigma_gini
+        r_r = sigma - sigma_ratio
+        r_m = mu + 0.5 * sigma**2 - log_mean
+        r_d = mu - log_median
+
+        # Normal equations J^T W J delta = -J^T W r with Jacobian rows
+        # (d/dmu, d/dsigma): gini (0, 1), ratio (0, 1), mean (1, sigma), median (1, 0)
+        a11 = w_m + w_d
+        a12 = w_m * sigma
+        a22 = w_g + w_r + w_m * sigma**2
+        b1 = -(w_m * r_m + w_d * r_d)
+        b2 = -(w_g * r_g + w_r * r_r + w_m * sigma * r_m)
+
+        det = a11 * a22 - a12 * a12
+        d_mu = (a22 * b1 - a12 * b2) / det
+        d_sigma = (a11 * b2 - a12 * b1) / det
+
+        mu = mu + d_mu
+        sigma = sigma + d_sigma
+        if np.all(np.abs(d_mu) + np.abs(d_sigma) < tol):
+            break
+
+    return {
+        "mu": mu,
+        "sigma": sigma,
+        "target_mean_income": np.exp(mu + 0.5 * sigma**2),
+    }
+
+
 # ---------- Example usage when run as a script ----------
 
 if __name__ == "__main__":
@@ -110,3 +302,7 @@ if __name__ == "__main__":
     r_from_avg = p90_p10_from_sigma(sigma_avg)
     print(f"Gini at sigma_avg:    {g_from_avg:.3f}")
     print(f"P90/P10 at sigma_avg: {r_from_avg:.3f}")
+
+    #  joint weighted least-squares fit of (mu, sigma) to all targets
+    fit = fit_lognormal(gini=target_gini, p90_p10=target_ratio, mean=30000.0)
+    print(f"Joint fit:            mu ≈ {float(fit['mu']):.4f}, sigma ≈ {float(fit['sigma']):.4f}")
@@ -0,0 +1,235 @@
+"""
+sketches.py
+
+Mergeable summaries of a demand column.
+
+- MomentSketch: count, mean and variance via Welford / Chan updates. Each
+  chunk is reduced with NumPy and folded in with the pairwise merge rule,
+  so the result does not depend on how the data was split.
+- QuantileSketch: a relative-error quantile sketch (log-spaced buckets,
+  as in DDSketch). For non-negative data, every quantile estimate q_hat
+  satisfies |q_hat - q| <= relative_accuracy * q, where q is the exact
+  value at the requested rank. Memory grows with log(max / min) of the
+  data, not with N: ~700 buckets cover six orders of magnitude at 1%.
+
+Both sketches can be updated chunk by chunk and combined across processes
+with `merge`, so medians and percentiles of huge or sharded populations
+need no global sort.
+"""
+
+import math
+
+import numpy as np
+
+
+def bucket_sums(keys, *weights):
+    """
+    Group integer bucket keys and sum one or more weight arrays per bucket.
+
+    Returns (unique_keys, sums_1, sums_2, ...), keeping only non-empty
+    buckets. Runs in O(n) with np.bincount over the (small) key range,
+    rather than sorting like np.unique.
+    """
+    if keys.size == 0:
+        return (np.empty(0, dtype=np.int64),) + tuple(np.empty(0) for _ in weights)
+    low = int(keys.min())
+    offsets = keys - low
+    counts = np.bincount(offsets)
+    filled = np.flatnonzero(counts)
+    sums = tuple(np.bincount(offsets, weights=w)[filled] for w in weights)
+    return (filled + low,) + sums
+
+
+class MomentSketch:
+    """Running count, mean, variance, min and max (optionally weighted)."""
+
+    def __init__(self):
+        self.count = 0          # number of rows seen
+        self.weight = 0.0       # sum of weights (= count when unweighted)
+        self.mean = 0.0
+        self.m2 = 0.0           # weighted sum of squared deviations
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _merge_parts(self, count, weight, mean, m2, low, high):
+        # Chan et al. pairwise combination
+        total = self.weight + weight
+        if weight == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * weight / total
+        self.m2 += m2 + delta**2 * self.weight * weight / total
+        self.weight = total
+        self.count += count
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    def update(self, values, weights=None):
+        """Fold a chunk of values (and optional weights) into the sketch."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+
+        if weights is None:
+            weight = float(values.size)
+            mean = float(np.mean(values))
+            m2 = float(np.sum((values - mean) ** 2))
+        else:
+            weights = np.asarray(weights, dtype=np.float64).ravel()
+            weight = float(np.sum(weights))
+            if weight == 0:
+                return self
+            mean = float(np.sum(weights * values) / weight)
+            m2 = float(np.sum(weights * (values - mean) ** 2))
+
+        self._merge_parts(values.size, weight, mean, m2, float(values.min()), float(values.max()))
+        return self
+
+    def merge(self, other):
+        """Combine another MomentSketch into this one (in place)."""
+        self._merge_parts(other.count, other.weight, other.mean, other.m2, other.min, other.max)
+        return self
+
+    @property
+    def total(self):
+        """Weighted sum of the values."""
+        return self.mean * self.weight
+
+    @property
+    def variance(self):
+        """Population variance (ddof=0, as np.var)."""
+        return self.m2 / self.weight if self.weight > 0 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch for non-negative values.
+
+    Value x > 0 falls in bucket k = ceil(log_gamma(x)) with
+    gamma = (1 + a) / (1 - a); the bucket is represented by
+    2 * gamma^k / (gamma + 1), which is within relative error a of every
+    value in it. Zeros are counted separately.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0.0 < relative_accuracy < 1.0:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1.0 + relative_accuracy) / (1.0 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}       # bucket index -> weight
+        self.zero_weight = 0.0
+        self.weight = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values, weights=None):
+        """Fold a chunk of non-negative values (and optional weights) in."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return self
+        if np.any(values < 0):
+            raise ValueError("QuantileSketch only supports non-negative values.")
+
+        if weights is None:
+            weights = np.ones_like(values)
+        else:
+            weights = np.asarray(weights, dtype=np.float64).ravel()
+
+        positive = values > 0
+        self.zero_weight += float(np.sum(weights[~positive]))
+
+        keys = np.ceil(np.log(values[positive]) / self._log_gamma).astype(np.int64)
+        unique_keys, bucket_weights = bucket_sums(keys, weights[positive])
+        for key, weight in zip(unique_keys.tolist(), bucket_weights.tolist()):
+            self.buckets[key] = self.buckets.get(key, 0.0) + weight
+
+        self.weight += float(np.sum(weights))
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        """Combine another QuantileSketch with the same accuracy (in place)."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative_accuracy.")
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0.0) + weight
+        self.zero_weight += other.zero_weight
+        self.weight += other.weight
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantiles(self, probabilities):
+        """
+        Estimated quantiles for an array of probabilities in [0, 1].
+
+        Each estimate is within relative_accuracy of the exact quantile.
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if self.weight == 0:
+            return np.full(probabilities.shape, np.nan)
+
+        keys = np.array(sorted(self.buckets), dtype=np.int64)
+        weights = np.array([self.buckets[k] for k in keys.tolist()], dtype=np.float64)
+        values = 2.0 * self.gamma ** keys.astype(np.float64) / (self.gamma + 1.0)
+
+        # zero bucket first, then positive buckets in increasing order
+        values = np.concatenate(([0.0], values))
+        cumulative = np.cumsum(np.concatenate(([self.zero_weight], weights)))
+
+        ranks = probabilities * self.weight
+        index = np.searchsorted(cumulative, ranks, side="right")
+        index = np.minimum(index, cumulative.shape[0] - 1)
+        # searchsorted may land on an empty zero bucket; skip to the first filled one
+        first_filled = int(np.argmax(cumulative > 0))
+        index = np.maximum(index, first_filled)
+
+        return np.clip(values[index], self.min, self.max)
+
+    def quantile(self, probability):
+        return float(self.quantiles([probability])[0])
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+
+class ColumnSummary:
+    """Moments and quantiles of one demand column, updatable and mergeable."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.moments = MomentSketch()
+        self.quantile_sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, values, weights=None):
+        self.moments.update(values, weights)
+        self.quantile_sketch.update(values, weights)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.quantile_sketch.merge(other.quantile_sketch)
+        return self
+
+    def summary(self, percentiles=()):
+        """
+        Dict with "mean", "median", "std", "total" and one "p<k>" entry per
+        requested percentile k (0-100).
+        """
+        result = {
+            "mean": self.moments.mean,
+            "median": self.quantile_sketch.median,
+            "std": self.moments.std,
+            "total": self.moments.total,
+        }
+        if len(percentiles):
+            estimates = self.quantile_sketch.quantiles(np.asarray(percentiles) / 100.0)
+            for k, value in zip(percentiles, estimates.tolist()):
+                result[f"p{k:g}"] = value
+        return result
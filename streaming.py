@@ -0,0 +1,150 @@
+"""
+streaming.py
+
+Out-of-core simulation for very large (100M+) populations.
+
+`stream_economy` never materializes the whole population. Households are
+generated in fixed-size chunks, each from its own seeded generator, and
+assigned to quartiles with the analytic lognormal cutoffs (see
+population.analytic_quartile_cutoffs) instead of np.percentile over all
+incomes. Every chunk is evaluated with the array demand kernel and folded
+into running aggregates and per-group sums, so memory is bounded by the
+chunk size rather than by N.
+"""
+
+import numpy as np
+
+from demand import run_scenario
+from sketches import ColumnSummary
+from population import (
+    Population,
+    analytic_quartile_cutoffs,
+    DEFAULT_SIGMA,
+    DEFAULT_TARGET_MEAN_INCOME,
+    ENGEL_SHARE_BANDS,
+    QUARTILE_LABELS,
+)
+
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def iter_population_chunks(
+    household_number,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    seed=None,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+    bands=ENGEL_SHARE_BANDS,
+):
+    """
+    Yield the population as a sequence of Population chunks.
+
+    Chunk k is drawn from child k of np.random.SeedSequence(seed), so the
+    stream is reproducible for a given seed and chunk_size.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1.")
+
+    cutoffs = analytic_quartile_cutoffs(sigma, target_mean_income)
+    n_chunks = -(-household_number // chunk_size)
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+
+    for k, child in enumerate(children):
+        size = min(chunk_size, household_number - k * chunk_size)
+        yield Population.generate(
+            size,
+            sigma=sigma,
+            target_mean_income=target_mean_income,
+            bands=bands,
+            rng=np.random.default_rng(child),
+            cutoffs=cutoffs,
+        )
+
+
+def stream_economy(
+    household_number,
+    new_income=None,
+    new_food_price=None,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    seed=None,
+    sigma=DEFAULT_SIGMA,
+    target_mean_income=DEFAULT_TARGET_MEAN_INCOME,
+    bands=ENGEL_SHARE_BANDS,
+    relative_accuracy=0.01,
+    percentiles=(),
+):
+    """
+    Run one scenario on a chunked population in constant memory.
+
+    Returns (aggregates, table_summary, plot_data):
+
+        - aggregates: dict as returned by demand.run_scenario, summed over
+          all chunks ("baseline", "income_change", "price_change",
+          "combined_change")
+        - table_summary: "mean_demand", "median_demand", "std_demand",
+          "total_demand" of NEW demand (same keys as
+          build_summary_and_plot_data), plus "p<k>_demand" for every k in
+          `percentiles`. Quantiles come from a mergeable sketch and are
+          within `relative_accuracy` of the exact values.
+        - plot_data: per-quartile means in the format used by plots.py
+    """
+    n_groups = len(QUARTILE_LABELS)
+
+    aggregates = {"baseline": 0.0, "income_change": 0.0, "price_change": 0.0, "combined_change": 0.0}
+
+    # Per-group running sums
+    count = np.zeros(n_groups)
+    sum_baseline = np.zeros(n_groups)
+    sum_new = np.zeros(n_groups)
+    sum_baseline_share = np.zeros(n_groups)
+    sum_new_share = np.zeros(n_groups)
+
+    # Market-level moments and quantiles of new demand
+    new_demand_summary = ColumnSummary(relative_accuracy)
+
+    for chunk in iter_population_chunks(
+        household_number,
+        chunk_size=chunk_size,
+        seed=seed,
+        sigma=sigma,
+        target_mean_income=target_mean_income,
+        bands=bands,
+    ):
+        chunk_aggregates = run_scenario(chunk, new_income=new_income, new_food_price=new_food_price)
+        for key, value in chunk_aggregates.items():
+            aggregates[key] += value
+
+        q_new = chunk.current_food_demand
+        price = chunk.food_price if new_food_price is None else new_food_price
+        w_new = price * q_new / chunk.current_income
+
+        codes = chunk.group_code
+        count += np.bincount(codes, minlength=n_groups)
+        sum_baseline += np.bincount(codes, weights=chunk.food_baseline_buy, minlength=n_groups)
+        sum_new += np.bincount(codes, weights=q_new, minlength=n_groups)
+        sum_baseline_share += np.bincount(codes, weights=chunk.food_budget_share, minlength=n_groups)
+        sum_new_share += np.bincount(codes, weights=w_new, minlength=n_groups)
+
+        new_demand_summary.update(q_new)
+
+    summary = new_demand_summary.summary(percentiles)
+    table_summary = {
+        "mean_demand": float(summary["mean"]),
+        "median_demand": float(summary["median"]),
+        "std_demand": float(summary["std"]),
+        "total_demand": float(np.sum(sum_new)),
+    }
+    for k in percentiles:
+        table_summary[f"p{k:g}_demand"] = float(summary[f"p{k:g}"])
+
+    safe_count = np.where(count > 0, count, 1.0)
+    plot_data = {
+        "groups": list(QUARTILE_LABELS),
+        "baseline_demand": (sum_baseline / safe_count).tolist(),
+        "new_demand": (sum_new / safe_count).tolist(),
+        "baseline_budget_share": (sum_baseline_share / safe_count).tolist(),
+        "new_budget_share": (sum_new_share / safe_count).tolist(),
+    }
+
+    return aggregates, table_summary, plot_data
@@ -0,0 +1,198 @@
+"""
+sweep.py
+
+Scenario-grid sweeps over price levels × income factors.
+
+`sweep_scenarios` evaluates every (price, income factor) pair on the whole
+population and returns a "demand cube" indexed by (price, income, group).
+Scenarios are evaluated by broadcasting a block of scenarios against a
+block of households, and the per-group sums are taken with one matrix
+product against a one-hot group matrix. Blocks are sized so that all the
+working arrays of one block together (the one-hot matrix, the per-household
+vectors and the scenarios × households temporaries) hold at most
+`max_block_elements` values, which keeps peak memory bounded however
+large N × scenarios gets. For survey
+microdata the one-hot entries are the household weights, so every group
+statistic is weighted at no extra cost.
+"""
+
+import numpy as np
+
+from welfare import WELFARE_MEASURES, GroupedWelfare
+
+
+# Upper bound on the number of float64 values in the working arrays of one
+# (scenarios × households) block; 4 million values ≈ 32 MB.
+DEFAULT_MAX_BLOCK_ELEMENTS = 4_000_000
+
+# Household-length vectors alive while a block is processed (group codes,
+# row indices, ln q0, ln p0, the ln-constant and its temporaries, 1 / income,
+# weighted columns)
+_HOUSEHOLD_VECTORS = 8
+
+
+def _block_sizes(n_scenarios, n_households, n_groups, max_block_elements):
+    """
+    Pick (scenario_block, household_block) so that one block's working set
+    fits in max_block_elements values. Per household that is the doubled
+    one-hot row (2G), the household vectors and two scenario_block-long
+    columns (the ln q block and the np.multiply.outer temporary); half the
+    budget goes to the fixed part, the rest to scenarios.
+    """
+    max_block_elements = max(int(max_block_elements), 1)
+    fixed = 2 * n_groups + _HOUSEHOLD_VECTORS
+    household_block = max(1, min(n_households, max_block_elements // (2 * fixed)))
+    scenario_block = max(1, min(n_scenarios, (max_block_elements // household_block - fixed) // 2))
+    return scenario_block, household_block
+
+
+def _weighted(values, weight):
+    return values if weight is None else values * weight
+
+
+def sweep_scenarios(
+    population,
+    price_levels,
+    income_factors,
+    max_block_elements=DEFAULT_MAX_BLOCK_ELEMENTS,
+    welfare=False,
+):
+    """
+    Evaluate demand for every combination of price level and income factor.
+
+    Parameters
+    ----------
+    population : Population
+        Columnar household population.
+    price_levels : array-like, shape (P,)
+        New food price levels (e.g. [1.0, 1.05, 1.10]).
+    income_factors : array-like, shape (I,)
+        Multiplicative income factors (e.g. [1.0, 1.25, 1.5]).
+    max_block_elements : int
+        Memory bound, in float64 values, on the working arrays of one
+        (scenarios × households) block. welfare=True also needs O(N)
+        group codes (see welfare.GroupedWelfare).
+    welfare : bool
+        Also reduce the per-household welfare cost of the price change at
+        the scenario income (dCS, CV, EV as shares of income, see
+        welfare.py), evaluated from group power sums of the baseline
+        budget shares (welfare.GroupedWelfare) at negligible extra cost;
+        with per-household elasticity draws, by one chunked pass over the
+        households per scenario.
+
+    Returns
+    -------
+    dict with keys:
+        - "price_levels": (P,)
+        - "income_factors": (I,)
+        - "groups": group labels, length G
+        - "count": (G,) households per group (represented households, i.e.
+          the sum of survey weights, for a weighted population)
+        - "baseline_demand": (G,) mean baseline demand per group
+        - "baseline_budget_share": (G,) mean baseline budget share per group
+        - "total_demand": (P, I, G) total new demand per group
+        - "mean_demand": (P, I, G) mean new demand per group
+        - "mean_budget_share": (P, I, G) mean new budget share per group,
+          where new share = price * q_new / (income * income_factor)
+        - "market_total_demand": (P, I) total new demand, all households
+        - with welfare=True, "mean_dcs_share", "mean_cv_share",
+          "mean_ev_share": (P, I, G) group means of the welfare shares
+    """
+    price_levels = np.atleast_1d(np.asarray(price_levels, dtype=np.float64))
+    income_factors = np.atleast_1d(np.asarray(income_factors, dtype=np.float64))
+
+    n_prices = price_levels.shape[0]
+    n_incomes = income_factors.shape[0]
+    n_groups = len(population.group_labels)
+    n_households = population.size
+
+    # Flatten the grid into S scenarios (price-major, matching the cube layout)
+    scenario_price = np.repeat(price_levels, n_incomes)
+    scenario_income = np.tile(income_factors, n_prices)
+    log_price = np.log(scenario_price)
+    log_income = np.log(scenario_income)
+    n_scenarios = log_price.shape[0]
+
+    weight = population.weight
+    e_income = population.income_elasticity_food
+    e_price = population.price_elasticity_food
+
+    # Accumulators: column g = demand sum, column G + g = (q / income) sum
+    sums = np.zeros((n_scenarios, 2 * n_groups), dtype=np.float64)
+    count = np.zeros(n_groups)
+    baseline_sum = np.zeros(n_groups)
+    baseline_share_sum = np.zeros(n_groups)
+
+    scenario_block, household_block = _block_sizes(
+        n_scenarios, n_households, n_groups, max_block_elements
+    )
+
+    for h0 in range(0, n_households, household_block):
+        h1 = min(h0 + household_block, n_households)
+        codes = np.asarray(population.group_code[h0:h1], dtype=np.intp)
+        household_weight = None if weight is None else np.asarray(weight[h0:h1], dtype=np.float64)
+
+        count += np.bincount(codes, weights=household_weight, minlength=n_groups)
+        baseline_sum += np.bincount(
+            codes, weights=_weighted(population.food_baseline_buy[h0:h1], household_weight),
+            minlength=n_groups,
+        )
+        baseline_share_sum += np.bincount(
+            codes, weights=_weighted(population.food_budget_share[h0:h1], household_weight),
+            minlength=n_groups,
+        )
+
+        # Per-household constant part of ln q:  ln q0 - e_p * ln p0
+        log_constant = np.log(population.food_baseline_buy[h0:h1], dtype=np.float64)
+        log_constant -= e_price[h0:h1] * np.log(population.food_price[h0:h1], dtype=np.float64)
+
+        # One-hot group matrix (survey weight instead of 1 if weighted),
+        # doubled so one product gives both sums
+        one = 1.0 if household_weight is None else household_weight
+        weights = np.zeros((h1 - h0, 2 * n_groups), dtype=np.float64)
+        rows = np.arange(h1 - h0)
+        weights[rows, codes] = one
+        weights[rows, n_groups + codes] = one / np.asarray(population.income[h0:h1], dtype=np.float64)
+
+        for s0 in range(0, n_scenarios, scenario_block):
+            s1 = min(s0 + scenario_block, n_scenarios)
+
+            # ln q = ln q0 + e_y * ln f + e_p * (ln p - ln p0), built in place
+            block = np.multiply.outer(log_income[s0:s1], e_income[h0:h1])
+            block += np.multiply.outer(log_price[s0:s1], e_price[h0:h1])
+            block += log_constant
+            np.exp(block, out=block)
+
+            sums[s0:s1] += block @ weights
+
+    total_demand = sums[:, :n_groups]
+    # new share = p * q / (income * f)  ->  (p / f) * sum(q / income)
+    share_sum = sums[:, n_groups:] * (scenario_price / scenario_income)[:, None]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_demand = np.where(count > 0, total_demand / count, 0.0)
+        mean_budget_share = np.where(count > 0, share_sum / count, 0.0)
+        baseline_demand = np.where(count > 0, baseline_sum / count, 0.0)
+        baseline_budget_share = np.where(count > 0, baseline_share_sum / count, 0.0)
+
+    cube_shape = (n_prices, n_incomes, n_groups)
+    result = {
+        "price_levels": price_levels,
+        "income_factors": income_factors,
+        "groups": list(population.group_labels),
+        "count": count,
+        "baseline_demand": baseline_demand,
+        "baseline_budget_share": baseline_budget_share,
+        "total_demand": total_demand.reshape(cube_shape),
+        "mean_demand": mean_demand.reshape(cube_shape),
+        "mean_budget_share": mean_budget_share.reshape(cube_shape),
+        "market_total_demand": total_demand.sum(axis=1).reshape(n_prices, n_incomes),
+    }
+    if welfare:
+        # from power sums of the baseline shares, no extra pass per scenario
+        mean_shares = GroupedWelfare(population, population.group_code, n_groups).mean_shares(
+            log_price, log_income
+        )
+        for measure in WELFARE_MEASURES:
+            result[f"mean_{measure}_share"] = mean_shares[measure].reshape(cube_shape)
+    return result
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from analytic import LognormalModel, validate
+
+HETEROGENEOUS = {
+    "income_elasticity_food": {"mean": 0.8, "std": 0.1},
+    "price_elasticity_food": {"low": -0.8, "high": -0.4},
+}
+
+
+def _mean_max_error(household_number, seeds, **kwargs):
+    return np.mean([
+        max(report["max_error"] for report in validate(household_number, seed=seed, **kwargs))
+        for seed in seeds
+    ])
+
+
+@pytest.mark.parametrize("parameters", [{}, HETEROGENEOUS], ids=["constant", "heterogeneous"])
+def test_matches_monte_carlo(parameters):
+    # sampling noise of 200k households is a fraction of a percent
+    for report in validate(200_000, seed=1, **parameters):
+        assert report["max_error"] < 0.01, report
+
+
+def test_error_shrinks_with_population_size():
+    # 100 times more households: errors fall like 1 / sqrt(N), i.e. about 10x
+    small = _mean_max_error(4_000, seeds=range(3))
+    large = _mean_max_error(400_000, seeds=range(3))
+    assert large < small / 4
+
+
+def test_constant_elasticity_scaling():
+    model = LognormalModel(10_000)
+    aggregates, table_summary, plot_data = model.scenario(new_food_price=1.1, new_income=1.05)
+    baseline = aggregates["baseline"]
+    np.testing.assert_allclose(aggregates["price_change"], baseline * 1.1 ** -0.6, rtol=1e-12)
+    np.testing.assert_allclose(aggregates["income_change"], baseline * 1.05 ** 0.8, rtol=1e-12)
+    np.testing.assert_allclose(sum(plot_data["count"]), 10_000, rtol=1e-12)
+
+
+def test_sweep_matches_scenarios():
+    model = LognormalModel(10_000)
+    cube = model.sweep([0.9, 1.2], [1.0, 1.1], grouping="deciles")
+    for i, price in enumerate([0.9, 1.2]):
+        for j, income in enumerate([1.0, 1.1]):
+            _, _, plot_data = model.scenario(price, income, grouping="deciles", median=False)
+            np.testing.assert_allclose(
+                cube["mean_demand"][i, j], plot_data["new_demand"], rtol=1e-12
+            )
+
+
+def test_welfare_is_not_analytic():
+    with pytest.raises(ValueError):
+        LognormalModel(1_000).evaluate({"new_food_price": 1.1, "welfare": True})
@@ -0,0 +1,32 @@
+import pytest
+
+import benchmark
+
+
+@pytest.mark.parametrize("repeats", [0, -1])
+def test_repeats_must_be_positive(repeats):
+    with pytest.raises(ValueError, match="repeats"):
+        benchmark.measure("generation", 1_000, repeats)
+    with pytest.raises(ValueError, match="repeats"):
+        benchmark.measure_import("Economy", repeats)
+
+
+def test_measure_import_without_timings():
+    # sys is loaded before -X importtime starts reporting
+    with pytest.raises(RuntimeError, match="no import of"):
+        benchmark.measure_import("sys", 1)
+
+
+def test_missing_baseline_is_an_error(tmp_path, capsys):
+    path = tmp_path / "missing.json"
+    with pytest.raises(FileNotFoundError, match="--update-baseline"):
+        benchmark.load_baseline(str(path))
+    assert benchmark.main(["--baseline", str(path), "--imports"]) == 2
+    assert "--update-baseline" in capsys.readouterr().err
+
+
+def test_compare_flags_slower_stages():
+    baseline = {"results": [{"stage": "summary", "n": 10, "seconds": 1.0}]}
+    report = {"results": [{"stage": "summary", "n": 10, "seconds": 2.0}]}
+    assert benchmark.compare(report, baseline, 1.25) == [("summary", 10, 2.0, 1.0)]
+    assert benchmark.compare(report, baseline, 2.5) == []
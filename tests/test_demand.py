@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import demand
+from Household import Household
+from population import Population
+
+INCOME_FACTOR = 1.15
+NEW_FOOD_PRICE = 1.3
+
+
+@pytest.fixture(scope="module")
+def population():
+    return Population.generate(
+        200,
+        rng=np.random.default_rng(2),
+        income_elasticity_food={"mean": 0.8, "std": 0.1},
+        price_elasticity_food={"low": -0.8, "high": -0.4},
+        food_price=1.2,
+    )
+
+
+@pytest.fixture(scope="module")
+def households(population):
+    return [
+        Household(
+            income=float(population.income[i]),
+            food_budget_share=float(population.food_budget_share[i]),
+            income_elasticity_food=float(population.income_elasticity_food[i]),
+            price_elasticity_food=float(population.price_elasticity_food[i]),
+            food_price=float(population.food_price[i]),
+        )
+        for i in range(population.size)
+    ]
+
+
+def test_baseline_matches_households(population, households):
+    np.testing.assert_allclose(
+        demand.baseline_demand(population), [h.food_baseline_buy for h in households]
+    )
+
+
+def test_income_change_matches_households(population, households):
+    np.testing.assert_allclose(
+        demand.income_change_demand(population, INCOME_FACTOR),
+        [h.calculate_new_food_demand_income_change(INCOME_FACTOR) for h in households],
+    )
+
+
+def test_price_change_matches_households(population, households):
+    np.testing.assert_allclose(
+        demand.price_change_demand(population, NEW_FOOD_PRICE),
+        [h.calculate_new_food_demand_price_change(NEW_FOOD_PRICE) for h in households],
+    )
+
+
+def test_combined_matches_households(population, households):
+    # the combined rule is the price change applied on top of the income change
+    expected = []
+    for h in households:
+        shifted = Household(
+            income_elasticity_food=h.income_elasticity_food,
+            price_elasticity_food=h.price_elasticity_food,
+            food_price=h.food_price,
+        )
+        shifted.food_baseline_buy = h.calculate_new_food_demand_income_change(INCOME_FACTOR)
+        expected.append(shifted.calculate_new_food_demand_price_change(NEW_FOOD_PRICE))
+
+    np.testing.assert_allclose(
+        demand.combined_demand(population, NEW_FOOD_PRICE, INCOME_FACTOR), expected
+    )
+
+
+def test_run_scenario_aggregates(population, households):
+    aggregates = demand.run_scenario(
+        population, new_income=INCOME_FACTOR, new_food_price=NEW_FOOD_PRICE
+    )
+    assert aggregates["baseline"] == pytest.approx(sum(h.food_baseline_buy for h in households))
+    assert aggregates["income_change"] == pytest.approx(
+        sum(h.calculate_new_food_demand_income_change(INCOME_FACTOR) for h in households)
+    )
+    np.testing.assert_array_equal(
+        population.current_food_demand,
+        demand.combined_demand(population, NEW_FOOD_PRICE, INCOME_FACTOR),
+    )
@@ -0,0 +1,25 @@
+import numpy as np
+
+from Economy import Economy
+from dynamics import period_cutoffs
+
+
+def _setup():
+    econ = Economy(household_number=20_000)
+    econ.create_economy(seed=4)
+    growth = np.random.default_rng(0).normal(0.02, 0.05, size=(5, econ.population.size))
+    return econ.population, np.cumsum(np.log1p(growth), axis=0)
+
+
+def test_period_cutoffs_match_full_income_matrix():
+    population, log_income_factor = _setup()
+    incomes = population.income[None, :] * np.exp(log_income_factor)
+    expected = np.quantile(incomes, [0.25, 0.50, 0.75], axis=1).T
+    np.testing.assert_array_equal(period_cutoffs(population, log_income_factor), expected)
+
+
+def test_sketched_period_cutoffs_within_accuracy():
+    population, log_income_factor = _setup()
+    exact = period_cutoffs(population, log_income_factor)
+    sketched = period_cutoffs(population, log_income_factor, chunk_size=3_000, relative_accuracy=1e-3)
+    assert np.all(np.abs(sketched / exact - 1.0) <= 1e-3)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from Economy import Economy
+
+
+def _economy(**kwargs):
+    econ = Economy(household_number=2_000)
+    econ.create_economy(**kwargs)
+    return econ
+
+
+def test_same_seed_gives_identical_population():
+    first = _economy(seed=1).population
+    second = _economy(seed=1).population
+    for name in ("income", "food_budget_share", "group_code"):
+        np.testing.assert_array_equal(getattr(first, name), getattr(second, name))
+
+
+def test_seed_matches_seeded_generator():
+    by_seed = _economy(seed=7).population
+    by_rng = _economy(rng=np.random.default_rng(7)).population
+    np.testing.assert_array_equal(by_seed.income, by_rng.income)
+
+
+def test_different_seeds_differ():
+    assert not np.array_equal(_economy(seed=1).population.income, _economy(seed=2).population.income)
+
+
+def test_rng_and_seed_together_rejected():
+    with pytest.raises(ValueError):
+        _economy(seed=1, rng=np.random.default_rng(1))
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from Economy import Economy, economy_calculations
+from equilibrium import DemandStatistics, IsoelasticSupply, TabulatedSupply, solve_equilibrium
+
+INCOME_ELASTICITY, PRICE_ELASTICITY = 0.8, -0.6
+
+
+@pytest.fixture(scope="module")
+def econ():
+    econ = Economy(household_number=10_000)
+    econ.create_economy(seed=11)
+    return econ
+
+
+@pytest.fixture(scope="module")
+def baseline_demand(econ):
+    return float(np.sum(econ.population.food_baseline_buy, dtype=np.float64))
+
+
+def _closed_form_price(baseline_demand, scale, elasticity, income_factor=1.0):
+    # D0 f^e_y p^e_p = scale p^elasticity
+    return (baseline_demand * income_factor ** INCOME_ELASTICITY / scale) ** (
+        1.0 / (elasticity - PRICE_ELASTICITY)
+    )
+
+
+def test_converges_to_closed_form(econ, baseline_demand):
+    # the last scenario clears far outside the initial bracket
+    scale = baseline_demand * np.array([1.0, 0.8, 1.3, 1.0, 1e-3])
+    elasticity = np.array([0.5, 0.2, 1.0, 0.0, 0.3])
+    income_factor = np.array([1.0, 1.1, 0.9, 1.2, 1.0])
+    result = solve_equilibrium(
+        econ.population, IsoelasticSupply(scale, elasticity), income_factor=income_factor
+    )
+
+    assert result["converged"].all()
+    np.testing.assert_allclose(
+        result["price"], _closed_form_price(baseline_demand, scale, elasticity, income_factor),
+        rtol=1e-9,
+    )
+    np.testing.assert_allclose(result["group_demand"].sum(axis=1), result["quantity"], rtol=1e-9)
+
+
+def test_equilibrium_demand_matches_household_kernel(econ):
+    statistics = DemandStatistics.from_population(econ.population)
+    supply = IsoelasticSupply(statistics.demand(np.zeros(1))[0] * 0.9, 0.4)
+    result = solve_equilibrium(statistics=statistics, supply=supply)
+
+    economy_calculations(econ, new_food_price=float(result["price"][0]))
+    np.testing.assert_allclose(
+        econ.aggregate_food_demand_price_change, result["quantity"][0], rtol=1e-9
+    )
+
+
+def test_tabulated_isoelastic_supply_matches(econ, baseline_demand):
+    prices = np.array([0.25, 0.5, 1.0, 2.0, 4.0])
+    scale, elasticity = baseline_demand * 0.7, 0.5
+    supply = TabulatedSupply(prices, scale * prices ** elasticity)
+    tabulated = solve_equilibrium(econ.population, supply)
+    np.testing.assert_allclose(
+        tabulated["price"], _closed_form_price(baseline_demand, scale, elasticity), rtol=1e-9
+    )
+
+
+def test_no_sign_change_is_reported(econ, baseline_demand):
+    # supply falling faster than demand never crosses it from below; the
+    # bracket is widened until demand and supply overflow
+    with np.errstate(all="ignore"):
+        result = solve_equilibrium(econ.population, IsoelasticSupply(baseline_demand, -2.0))
+    assert not result["converged"][0]
+    assert np.isnan(result["price"][0])
+    assert np.isnan(result["group_demand"][0]).all()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from grouping import grouped_stats
+
+
+class CountingColumn:
+    """Array wrapper that counts the slices read from it."""
+
+    def __init__(self, values):
+        self.values = values
+        self.reads = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return self.values[index]
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    n = 10_000
+    codes = rng.integers(0, 5, n).astype(np.uint8)
+    codes[codes == 2] = 1  # group 2 stays empty
+    columns = {
+        "income": rng.lognormal(10, 1, n).astype(np.float32),
+        "shifted": 1e6 + rng.normal(size=n),
+    }
+    return codes, columns, rng.uniform(0.5, 2.0, n)
+
+
+@pytest.mark.parametrize("weighted", [False, True])
+@pytest.mark.parametrize("chunk_size", [97, 1 << 20])
+def test_matches_per_group_numpy(data, weighted, chunk_size):
+    codes, columns, weights = data
+    weights = weights if weighted else None
+    stats = grouped_stats(codes, 5, columns, weights=weights, chunk_size=chunk_size)
+
+    assert stats["count"].tolist() == np.bincount(codes, minlength=5).tolist()
+    for name, values in columns.items():
+        for group in range(5):
+            members = codes == group
+            if not members.any():
+                assert stats[name]["mean"][group] == stats[name]["var"][group] == 0.0
+                continue
+            x = values[members].astype(np.float64)
+            w = None if weights is None else weights[members]
+            mean = np.average(x, weights=w)
+            np.testing.assert_allclose(stats[name]["mean"][group], mean, rtol=1e-12)
+            np.testing.assert_allclose(
+                stats[name]["var"][group], np.average((x - mean) ** 2, weights=w), rtol=1e-8
+            )
+
+
+def test_reads_every_column_once(data):
+    codes, columns, weights = data
+    counted = {name: CountingColumn(values) for name, values in columns.items()}
+    grouped_stats(codes, 5, counted, weights=weights, chunk_size=1_000)
+    assert [column.reads for column in counted.values()] == [10, 10]
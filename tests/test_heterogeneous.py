@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from Economy import Economy
+from equilibrium import DemandStatistics, IsoelasticSupply, solve_equilibrium
+from sweep import sweep_scenarios
+from welfare import WELFARE_MEASURES, GroupedWelfare, household_welfare
+
+
+@pytest.fixture(scope="module")
+def population():
+    econ = Economy(household_number=20_000)
+    econ.create_economy(
+        seed=3,
+        income_elasticity_food={"mean": 0.8, "std": 0.1},
+        price_elasticity_food={"low": -0.8, "high": -0.4},
+    )
+    return econ.population
+
+
+def test_grouped_welfare_uses_household_path(population):
+    welfare = GroupedWelfare(population, population.group_code, 4)
+    assert welfare.per_household
+
+
+def test_heterogeneous_sweep_welfare_matches_households(population):
+    prices, incomes = np.array([0.9, 1.2]), np.array([1.0, 1.1])
+    cube = sweep_scenarios(population, prices, incomes, welfare=True)
+    codes = population.group_code
+    counts = np.bincount(codes, minlength=4)
+    for i, price in enumerate(prices):
+        for j, income in enumerate(incomes):
+            expected = household_welfare(population, price, income)
+            for measure in WELFARE_MEASURES:
+                means = np.bincount(codes, weights=expected[measure], minlength=4) / counts
+                np.testing.assert_allclose(cube[f"mean_{measure}_share"][i, j], means, rtol=1e-12)
+
+
+def test_binned_demand_statistics_match_exact_equilibrium(population):
+    binned = DemandStatistics.from_population(population)
+    exact = DemandStatistics.from_population(population, max_classes=None)
+    assert binned.n_classes < exact.n_classes == population.size
+
+    log_price = np.log([0.8, 1.0, 1.25])
+    np.testing.assert_allclose(binned.demand(log_price, 0.1)[0], exact.demand(log_price, 0.1)[0],
+                               rtol=1e-6)
+
+    base = exact.demand(np.zeros(1))[0][0]
+    supply = IsoelasticSupply(scale=base * np.array([0.8, 1.0, 1.2]), elasticity=0.3)
+    prices = [solve_equilibrium(supply=supply, statistics=statistics, income_factor=1.1)["price"]
+              for statistics in (binned, exact)]
+    np.testing.assert_allclose(prices[0], prices[1], rtol=1e-6)
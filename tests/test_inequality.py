@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from inequality import GiniSketch, gini, lorenz_curve, percentile_ratio, weighted_quantile
+from sigma_calibration import gini_from_sigma, p90_p10_from_sigma
+
+
+@pytest.fixture(scope="module")
+def sample():
+    rng = np.random.default_rng(4)
+    return rng.lognormal(10.0, 0.55, 1_500), rng.uniform(0.5, 5.0, 1_500)
+
+
+def _mean_absolute_difference_gini(values, weights):
+    """G = sum_ij w_i w_j |x_i - x_j| / (2 W^2 mean), by brute force."""
+    difference = np.abs(values[:, None] - values[None, :])
+    total_weight = weights.sum()
+    mean = np.dot(weights, values) / total_weight
+    return weights @ difference @ weights / (2.0 * total_weight**2 * mean)
+
+
+def test_gini_matches_mean_absolute_difference(sample):
+    values, weights = sample
+    assert gini(values) == pytest.approx(
+        _mean_absolute_difference_gini(values, np.ones_like(values)), rel=1e-10
+    )
+    assert gini(values, weights) == pytest.approx(
+        _mean_absolute_difference_gini(values, weights), rel=1e-10
+    )
+
+
+def test_integer_weights_match_repeated_values(sample):
+    values, _ = sample
+    counts = np.arange(len(values)) % 3 + 1
+    repeated = np.repeat(values, counts)
+    assert gini(values, counts) == pytest.approx(gini(repeated), rel=1e-12)
+    assert weighted_quantile(values, [0.1, 0.5, 0.9], counts).tolist() == weighted_quantile(
+        repeated, [0.1, 0.5, 0.9]
+    ).tolist()
+
+
+def test_large_lognormal_matches_theory():
+    values = np.random.default_rng(5).lognormal(10.0, 0.55, 400_000)
+    assert gini(values) == pytest.approx(gini_from_sigma(0.55), abs=2e-3)
+    assert percentile_ratio(values) == pytest.approx(p90_p10_from_sigma(0.55), rel=0.02)
+
+
+def test_lorenz_curve_endpoints(sample):
+    values, weights = sample
+    population_share, income_share = lorenz_curve(values, weights, points=11)
+    assert (population_share[0], population_share[-1]) == (0.0, 1.0)
+    assert income_share[0] == 0.0 and income_share[-1] == pytest.approx(1.0)
+    assert np.all(income_share <= population_share + 1e-12)
+
+
+def test_sketch_is_close_to_exact_gini(sample):
+    values, weights = sample
+    sketch = GiniSketch(relative_accuracy=0.001).update(values, weights)
+    assert sketch.gini == pytest.approx(gini(values, weights), abs=1e-3)
+
+
+def test_merged_sketches_match_a_single_sketch(sample):
+    values, weights = sample
+    single = GiniSketch(relative_accuracy=0.01).update(values, weights)
+
+    merged = GiniSketch(relative_accuracy=0.01)
+    for part in np.array_split(np.arange(len(values)), 4):
+        merged.merge(GiniSketch(relative_accuracy=0.01).update(values[part], weights[part]))
+
+    assert merged.buckets.keys() == single.buckets.keys()
+    assert merged.gini == pytest.approx(single.gini, rel=1e-12)
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError, match="relative_accuracy"):
+        GiniSketch(0.01).merge(GiniSketch(0.001))
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from demand import total
+from Economy import _column_summary
+from inequality import weighted_quantile
+from microdata import load_microdata
+from population import assign_quartile_codes
+
+N = 1_000
+
+
+@pytest.fixture(scope="module")
+def survey():
+    rng = np.random.default_rng(3)
+    income = rng.lognormal(10.0, 0.6, N)
+    return {
+        "income": income,
+        "food_spend": income * rng.uniform(0.1, 0.4, N),
+        "weight": rng.uniform(0.5, 20.0, N),
+    }
+
+
+def _write_csv(path, survey, rows=None):
+    lines = ["income,food_spend,weight"]
+    lines += [",".join(map(repr, row)) for row in np.column_stack(list(survey.values())).tolist()]
+    if rows is not None:
+        lines += rows
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_csv_and_npy_load_the_same_columns(tmp_path, survey):
+    records = np.rec.fromarrays(list(survey.values()), names=list(survey))
+    np.save(tmp_path / "survey.npy", records)
+
+    csv = load_microdata(_write_csv(tmp_path / "survey.csv", survey), chunk_size=300)
+    npy = load_microdata(str(tmp_path / "survey.npy"), chunk_size=300)
+    for population in (csv, npy):
+        np.testing.assert_array_equal(population.income, survey["income"])
+        np.testing.assert_allclose(
+            population.food_budget_share, survey["food_spend"] / survey["income"]
+        )
+        np.testing.assert_array_equal(population.weight, survey["weight"])
+
+
+def test_groups_are_weighted_quartiles(tmp_path, survey):
+    population = load_microdata(_write_csv(tmp_path / "survey.csv", survey))
+    cutoffs = weighted_quantile(survey["income"], [0.25, 0.50, 0.75], survey["weight"])
+    np.testing.assert_array_equal(
+        population.group_code, assign_quartile_codes(survey["income"], cutoffs)
+    )
+    # weighted, not row, quartiles: each group carries about a quarter of the weight
+    group_weight = np.bincount(population.group_code, weights=survey["weight"])
+    np.testing.assert_allclose(group_weight / survey["weight"].sum(), 0.25, atol=0.02)
+
+
+@pytest.mark.parametrize("row", ["-1.0,0.5,1.0", "100.0,-0.5,1.0", "100.0,0.5,-1.0", "nan,0.5,1.0"])
+def test_invalid_rows_rejected(tmp_path, survey, row):
+    path = _write_csv(tmp_path / "survey.csv", survey, rows=[row])
+    with pytest.raises(ValueError, match=f"data row {N}:"):
+        load_microdata(path, chunk_size=300)
+
+
+def test_missing_column_rejected(tmp_path, survey):
+    path = _write_csv(tmp_path / "survey.csv", survey)
+    with pytest.raises(ValueError, match="'spend' not found"):
+        load_microdata(path, food_spend_column="spend")
+
+
+def test_weighted_totals_and_summaries(tmp_path, survey):
+    population = load_microdata(_write_csv(tmp_path / "survey.csv", survey))
+    income, weight = survey["income"], survey["weight"]
+
+    mean = np.average(income, weights=weight)
+    assert total(population, population.income) == pytest.approx(mean * weight.sum())
+
+    summary_mean, median, std, summary_total = _column_summary(population.income, weight)
+    assert summary_mean == pytest.approx(mean)
+    assert std == pytest.approx(np.sqrt(np.average((income - mean) ** 2, weights=weight)))
+    assert summary_total == pytest.approx(mean * weight.sum())
+    assert median == weighted_quantile(income, 0.5, weight)
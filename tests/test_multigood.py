@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from demand import combined_demand, run_scenario
+from Economy import Economy
+from multigood import MultiGoodSystem, draw_budget_shares
+
+
+@pytest.fixture(scope="module")
+def population():
+    econ = Economy(household_number=5_000)
+    econ.create_economy(seed=9)
+    return econ.population
+
+
+def _complete_shares(population):
+    # food, energy, and housing taking the rest of the budget
+    shares = draw_budget_shares(population, [[(0.05, 0.10)] * 4], rng=np.random.default_rng(0))
+    return np.column_stack([shares, 1.0 - shares.sum(axis=1)])
+
+
+def test_single_good_matches_food_kernel(population):
+    system = MultiGoodSystem(["food"], [0.8], [[-0.6]])
+    shares = population.food_budget_share[:, None]
+
+    q = system.household_demand(population, shares, [1.1], income_factor=1.05)
+    np.testing.assert_allclose(q[:, 0], combined_demand(population, 1.1, 1.05), rtol=1e-12)
+
+    result = system.evaluate(population, shares, [[1.1], [0.9]], income_factors=[1.05, 1.2])
+    for s, (price, income) in enumerate([(1.1, 1.05), (0.9, 1.2)]):
+        expected = run_scenario(population, new_income=income, new_food_price=price)
+        np.testing.assert_allclose(
+            result["total_demand"][s, 0], expected["combined_change"], rtol=1e-12
+        )
+
+
+def test_adding_up_exhausts_new_income(population):
+    system = MultiGoodSystem(
+        ["food", "energy", "housing"],
+        [0.8, 0.9, 1.2],
+        [[-0.6, 0.1, 0.05], [0.05, -0.4, 0.1], [0.02, 0.05, -0.3]],
+    )
+    shares = _complete_shares(population)
+    prices = np.array([1.1, 1.3, 1.0])
+
+    q = system.household_demand(population, shares, prices, income_factor=1.05, adding_up=True)
+    np.testing.assert_allclose(q @ prices, population.income * 1.05, rtol=1e-12)
+
+    result = system.evaluate(population, shares, prices, income_factors=1.05, adding_up=True)
+    np.testing.assert_allclose(result["mean_budget_share"].sum(axis=-1), 1.0, rtol=1e-12)
+
+
+@pytest.mark.parametrize("n_groups", [3, 5])
+def test_group_count_must_match_population(population, n_groups):
+    system = MultiGoodSystem(["food"], np.full((n_groups, 1), 0.8), np.full((n_groups, 1, 1), -0.6))
+    shares = population.food_budget_share[:, None]
+    with pytest.raises(ValueError, match="groups"):
+        system.household_demand(population, shares, [1.1])
+    with pytest.raises(ValueError, match="groups"):
+        system.evaluate(population, shares, [1.1])
+
+
+def test_per_group_elasticities(population):
+    eta = np.array([[1.0], [0.9], [0.8], [0.7]])
+    system = MultiGoodSystem(["food"], eta, np.full((4, 1, 1), -0.6))
+    q = system.household_demand(population, population.food_budget_share[:, None], [1.0], 1.1)
+    expected = population.food_baseline_buy * 1.1 ** eta[population.group_code, 0]
+    np.testing.assert_allclose(q[:, 0], expected, rtol=1e-12)
@@ -0,0 +1,47 @@
+import numpy as np
+
+from Economy import Economy
+from population import Population
+from population_cache import PopulationCache, generation_params
+
+
+def test_round_trip_is_memory_mapped_and_identical(tmp_path):
+    cache = PopulationCache(str(tmp_path))
+    generated = cache.get_or_create(1_000, 7)
+    reopened = cache.get_or_create(1_000, 7)
+
+    assert len(cache.entries()) == 1
+    assert isinstance(reopened.income, np.memmap)
+    fresh = Population.generate(1_000, rng=np.random.default_rng(7))
+    for name, values in fresh.columns().items():
+        np.testing.assert_array_equal(generated.columns()[name], values)
+        np.testing.assert_array_equal(reopened.columns()[name], values)
+    assert list(reopened.group_labels) == list(fresh.group_labels)
+
+
+def test_cached_economy_matches_seeded_economy(tmp_path):
+    cached = Economy(1_000)
+    cached.create_economy(cache=PopulationCache(str(tmp_path)), seed=3)
+    seeded = Economy(1_000)
+    seeded.create_economy(seed=3)
+    np.testing.assert_array_equal(cached.population.income, seeded.population.income)
+
+
+def test_parameters_select_the_entry(tmp_path):
+    cache = PopulationCache(str(tmp_path))
+    cache.get_or_create(1_000, 7)
+    assert cache.get(generation_params(1_000, 8)) is None
+    assert cache.get(generation_params(1_000, 7, sigma=0.6)) is None
+    assert cache.get(generation_params(1_000, 7)) is not None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PopulationCache(str(tmp_path))
+    cache.get_or_create(1_000, 1)
+    entry_bytes = cache.entries()[0][1]
+
+    cache.max_bytes = entry_bytes
+    cache.get_or_create(1_000, 2)
+    assert len(cache.entries()) == 1
+    assert cache.get(generation_params(1_000, 1)) is None
+    assert cache.get(generation_params(1_000, 2)) is not None
@@ -0,0 +1,30 @@
+import numpy as np
+
+from population import COMPACT_DTYPE, Population
+from precision import compare_precision
+
+# float32 rounding, with room for accumulating ~1e6 rounded values in float64
+FLOAT32_TOLERANCE = 1e-6
+
+
+def test_same_households_in_every_precision():
+    reference = Population.generate(200_000, rng=np.random.default_rng(1))
+    cutoffs = np.percentile(reference.income, [25, 50, 75])
+    compact = Population.generate(
+        200_000, rng=np.random.default_rng(1), cutoffs=cutoffs, dtype=COMPACT_DTYPE
+    )
+
+    np.testing.assert_array_equal(compact.group_code, reference.group_code)
+    np.testing.assert_array_equal(compact.income, reference.income.astype(COMPACT_DTYPE))
+    np.testing.assert_array_equal(
+        compact.food_budget_share, reference.food_budget_share.astype(COMPACT_DTYPE)
+    )
+
+
+def test_compact_error_is_storage_precision_only():
+    # the size precision.py validates by default, where rounded cutoffs used to move a household
+    report = compare_precision(1_000_000, seed=1, new_food_price=1.10, new_income=1.05)
+    assert report["group_code_mismatches"] == 0
+    assert max(report["aggregates"].values()) < FLOAT32_TOLERANCE
+    assert report["max_relative_error"] < FLOAT32_TOLERANCE
+    assert report["memory_ratio"] < 0.75
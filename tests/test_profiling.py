@@ -0,0 +1,45 @@
+import threading
+
+from Economy import Economy
+from profiling import TRACER, Tracer
+
+
+def test_load_microdata_trace_reports_loaded_rows(tmp_path):
+    path = tmp_path / "survey.csv"
+    rows = [(20_000 + 1_000 * k, 5_000 + 100 * k, 1.5) for k in range(37)]
+    path.write_text("income,food_spend,weight\n" + "".join(f"{a},{b},{w}\n" for a, b, w in rows))
+
+    TRACER.reset()
+    TRACER.enable()
+    try:
+        econ = Economy(household_number=0)
+        econ.load_microdata(str(path))
+    finally:
+        TRACER.disable()
+
+    (event,) = [event for event in TRACER.events if event["name"] == "load_microdata"]
+    TRACER.reset()
+    assert event["rows"] == econ.household_number == 37
+
+
+def test_threads_nest_stages_on_their_own_stack():
+    tracer = Tracer()
+    tracer.enable()
+    barrier = threading.Barrier(2)
+
+    def run(prefix):
+        with tracer.stage(f"{prefix}_outer"):
+            barrier.wait()  # both outer stages are open
+            with tracer.stage(f"{prefix}_inner"):
+                barrier.wait()  # both inner stages are open
+            barrier.wait()
+
+    threads = [threading.Thread(target=run, args=(prefix,)) for prefix in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    depths = {event["name"]: event["depth"] for event in tracer.events}
+    assert depths == {"a_outer": 0, "a_inner": 1, "b_outer": 0, "b_inner": 1}
+    assert len({event["thread"] for event in tracer.events}) == 2
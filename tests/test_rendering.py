@@ -0,0 +1,26 @@
+import pytest
+
+from Economy import Economy
+from rendering import render_figures, render_grid
+from run_scenarios import evaluate_scenario
+
+PRICES = (1.1, 1.2, 1.3)
+
+
+@pytest.fixture(scope="module")
+def plot_data_list():
+    econ = Economy(1_000)
+    econ.create_economy(seed=1)
+    return [evaluate_scenario(econ, {"new_food_price": price})[2] for price in PRICES]
+
+
+def test_render_figures(tmp_path, plot_data_list):
+    paths = render_figures(plot_data_list[0], "price", PRICES[0], str(tmp_path))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["budget_share.png", "demand.png"]
+    assert len(paths) == 2
+
+
+def test_render_grid(tmp_path, plot_data_list):
+    path = tmp_path / "grid.png"
+    render_grid(plot_data_list, "price", list(PRICES), ncols=2, path=str(path))
+    assert path.stat().st_size > 0
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from replication import run_replications
+
+SCENARIO = {"household_number": 500, "n_replications": 4, "new_food_price": 1.1, "seed": 2024}
+
+
+def _assert_identical(first, second):
+    assert first["groups"] == second["groups"]
+    assert first["samples"].keys() == second["samples"].keys()
+    for key in first["samples"]:
+        np.testing.assert_array_equal(first["samples"][key], second["samples"][key])
+
+
+def test_bit_identical_for_a_master_seed():
+    serial = run_replications(**SCENARIO, workers=1)
+    _assert_identical(serial, run_replications(**SCENARIO, workers=1))
+
+
+def test_independent_of_worker_count():
+    serial = run_replications(**SCENARIO, workers=1)
+    _assert_identical(serial, run_replications(**SCENARIO, workers=2))
+
+
+def test_replications_differ_and_ci_covers_mean():
+    result = run_replications(**SCENARIO, workers=1)
+    samples = result["samples"]["aggregate_food_demand_price_change"]
+    assert len(np.unique(samples)) == SCENARIO["n_replications"]
+
+    summary = result["summary"]["aggregate_food_demand_price_change"]
+    assert summary["ci_low"] < samples.mean() < summary["ci_high"]
+
+
+def test_needs_a_replication():
+    with pytest.raises(ValueError):
+        run_replications(100, 0, new_food_price=1.1, seed=1)
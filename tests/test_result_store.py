@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from Economy import Economy
+from result_store import HOUSEHOLD_COLUMNS, ResultStore, result_key
+from run_scenarios import evaluate_scenario, run_batch
+
+SPEC = {"household_number": 2_000, "seed": 5}
+SCENARIO = {"new_food_price": 1.1}
+
+
+@pytest.fixture(scope="module")
+def evaluated():
+    econ = Economy(SPEC["household_number"])
+    econ.create_economy(seed=SPEC["seed"])
+    return econ, evaluate_scenario(econ, SCENARIO)
+
+
+def _households_flag(store):
+    return [row["households"] for row in store.query(SPEC)]
+
+
+def test_equivalent_scenarios_share_a_key():
+    assert result_key(SPEC, {"new_food_price": 1.1, "grouping": "quartiles"}) == result_key(
+        SPEC, {"new_food_price": "1.10"}
+    )
+
+
+def test_round_trip(tmp_path, evaluated):
+    econ, (aggregates, table_summary, plot_data) = evaluated
+    store = ResultStore(str(tmp_path))
+    assert store.get(SPEC, SCENARIO) is None
+
+    store.put(SPEC, SCENARIO, aggregates, table_summary, plot_data, population=econ.population)
+    stored = store.get(SPEC, SCENARIO, households=True)
+    assert stored["aggregates"] == aggregates
+    assert stored["table_summary"] == table_summary
+    assert stored["plot_data"] == plot_data
+    np.testing.assert_array_equal(
+        stored["households"]["current_food_demand"], econ.population.current_food_demand
+    )
+
+
+def test_re_put_without_households_keeps_them(tmp_path, evaluated):
+    econ, results = evaluated
+    store = ResultStore(str(tmp_path))
+    store.put(SPEC, SCENARIO, *results, population=econ.population)
+    store.put(SPEC, SCENARIO, *results)
+
+    assert _households_flag(store) == [1]
+    assert set(store.get(SPEC, SCENARIO, households=True)["households"]) == set(HOUSEHOLD_COLUMNS)
+
+
+def test_re_put_with_households_adds_them(tmp_path, evaluated):
+    econ, results = evaluated
+    store = ResultStore(str(tmp_path))
+    store.put(SPEC, SCENARIO, *results)
+    assert _households_flag(store) == [0]
+    assert store.get(SPEC, SCENARIO, households=True)["households"] == {}
+
+    store.put(SPEC, SCENARIO, *results, population=econ.population)
+    assert _households_flag(store) == [1]
+    assert set(store.get(SPEC, SCENARIO, households=True)["households"]) == set(HOUSEHOLD_COLUMNS)
+
+
+def test_run_batch_hits_the_store(tmp_path):
+    scenarios = [{"name": "price", **SCENARIO}]
+    options = dict(formats=(), store_dir=str(tmp_path / "store"))
+
+    first = run_batch(SPEC, scenarios, str(tmp_path / "out"), **options)
+    second = run_batch(SPEC, scenarios, str(tmp_path / "out"), **options)
+    assert [summary["from_store"] for summary in first + second] == [False, True]
+    assert second[0]["aggregates"] == first[0]["aggregates"]
+
+
+@pytest.mark.parametrize("extra", [
+    {"dtype": "float32"},
+    {"income_elasticity_food": {"mean": 0.8, "std": 0.1}},
+    {"price_elasticity_food": -0.5},
+])
+def test_generation_options_change_the_key(extra):
+    assert result_key({**SPEC, **extra}, SCENARIO) != result_key(SPEC, SCENARIO)
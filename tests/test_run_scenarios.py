@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+import run_scenarios
+from run_scenarios import load_scenario_file
+
+
+def _write_scenarios(tmp_path, names):
+    path = tmp_path / "scenarios.json"
+    path.write_text(json.dumps({
+        "populations": {"small": {"household_number": 1_000, "seed": 1}},
+        "scenarios": [
+            {"name": name, "population": "small", "new_food_price": 1.1} for name in names
+        ],
+    }))
+    return str(path)
+
+
+@pytest.mark.parametrize("name", ["../escape", "a/b", "..", ".", "/tmp/abs", "a\\b"])
+def test_path_like_scenario_names_rejected(tmp_path, name):
+    with pytest.raises(ValueError, match="Invalid scenario name"):
+        load_scenario_file(_write_scenarios(tmp_path, [name]))
+
+
+def test_plain_scenario_names_accepted(tmp_path):
+    _, scenarios = load_scenario_file(_write_scenarios(tmp_path, ["price_+10%", "both x1.5"]))
+    assert [scenario["name"] for scenario in scenarios] == ["price_+10%", "both x1.5"]
+
+
+def test_resident_populations_are_bounded(monkeypatch):
+    monkeypatch.setattr(run_scenarios, "_POPULATIONS", run_scenarios.OrderedDict())
+    monkeypatch.setattr(run_scenarios, "build_economy", lambda spec, cache_dir: object())
+
+    specs = [{"household_number": 10, "seed": seed} for seed in range(5)]
+    for spec in specs:
+        run_scenarios._economy_for(spec, None)
+    assert len(run_scenarios._POPULATIONS) == run_scenarios.MAX_RESIDENT_POPULATIONS
+
+    # the most recent population is reused, not rebuilt
+    resident = run_scenarios._economy_for(specs[-1], None)
+    assert run_scenarios._economy_for(specs[-1], None) is resident
+
+
+@pytest.mark.parametrize("population", [
+    {"household_number": 1_000, "seed": 1, "sigm": 0.6},
+    {"microdata": "survey.csv", "income_col": "income"},
+])
+def test_unknown_population_keys_rejected(population):
+    with pytest.raises(ValueError, match="unknown keys"):
+        run_scenarios.validate_population_spec("small", population)
+
+
+def test_population_spec_passes_dtype_and_elasticities():
+    econ = run_scenarios.build_economy({
+        "household_number": 1_000,
+        "seed": 1,
+        "dtype": "float32",
+        "income_elasticity_food": {"mean": 0.8, "std": 0.1},
+    })
+    assert econ.population.income.dtype == "float32"
+    assert econ.population.income_elasticity_food.std() > 0
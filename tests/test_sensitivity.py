@@ -0,0 +1,65 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from sensitivity import evaluate_samples, morris_screening, sobol_indices
+
+# with income factor 1 and no elasticity spread, demand_change = p^e_p - 1
+SPACE = {
+    "price_elasticity": (-0.9, -0.3),
+    "income_elasticity": (0.6, 1.0),
+    "sigma": (0.45, 0.65),
+    "band1_low": (0.27, 0.33),
+}
+PRICE = list(SPACE).index("price_elasticity")
+OTHERS = [i for i in range(len(SPACE)) if i != PRICE]
+
+
+def test_sobol_known_case():
+    result = sobol_indices(SPACE, n_base=256, household_number=2_000, seed=1, n_bootstrap=50)
+    indices = result["outputs"]["demand_change"]
+    assert result["n_evaluations"] == 256 * (len(SPACE) + 2)
+    assert indices["S1"][PRICE] == pytest.approx(1.0, abs=0.1)
+    assert indices["ST"][PRICE] == pytest.approx(1.0, abs=0.1)
+    np.testing.assert_allclose(indices["S1"][OTHERS], 0.0, atol=1e-10)
+    np.testing.assert_allclose(indices["ST"][OTHERS], 0.0, atol=1e-10)
+
+
+def test_morris_known_case():
+    result = morris_screening(SPACE, n_trajectories=20, household_number=2_000, seed=1)
+    effects = result["outputs"]["demand_change"]
+    assert result["n_evaluations"] == 20 * (len(SPACE) + 1)
+    # d(1.1^e - 1)/de over the full range lies between the end points' slopes
+    low, high = SPACE["price_elasticity"]
+    slopes = np.log(1.1) * 1.1 ** np.array([low, high]) * (high - low)
+    assert slopes.min() <= effects["mu"][PRICE] <= slopes.max()
+    assert effects["mu_star"][PRICE] == pytest.approx(effects["mu"][PRICE])
+    np.testing.assert_allclose(effects["mu_star"][OTHERS], 0.0, atol=1e-10)
+
+
+def test_reproducible_for_a_seed():
+    first = sobol_indices(SPACE, n_base=32, household_number=1_000, seed=5, n_bootstrap=10)
+    second = sobol_indices(SPACE, n_base=32, household_number=1_000, seed=5, n_bootstrap=10)
+    for name, indices in first["outputs"].items():
+        np.testing.assert_array_equal(indices["S1"], second["outputs"][name]["S1"])
+
+
+@pytest.mark.parametrize("spread", [0.0, 0.1])
+def test_peak_memory_stays_within_block_budget(spread):
+    names = ["price_elasticity", "income_elasticity_std", "price_elasticity_std"]
+    samples = np.column_stack(
+        [np.linspace(-0.9, -0.3, 64), np.full(64, spread), np.full(64, spread)]
+    )
+    max_block_elements = 100_000
+    evaluate_samples(samples[:1], names, 100_000, seed=2)  # draw the common random numbers
+
+    tracemalloc.start()
+    try:
+        evaluate_samples(samples, names, 100_000, seed=2, new_income=1.1,
+                         max_block_elements=max_block_elements)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # the block budget plus the small (samples × groups) outputs
+    assert peak <= 8 * max_block_elements + 64 * 1024
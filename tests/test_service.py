@@ -0,0 +1,113 @@
+import asyncio
+import json
+
+import pytest
+
+from service import LRUCache, ScenarioService
+
+SPEC = {"household_number": 1_000, "seed": 1}
+
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _run(coroutine_function):
+    """Run coroutine_function(service) against a service holding population "p"."""
+    async def main():
+        service = ScenarioService(workers=2)
+        try:
+            await service.add_population("p", SPEC)
+            return await coroutine_function(service)
+        finally:
+            service.close()
+    return asyncio.run(main())
+
+
+async def _http(service, request):
+    reader = asyncio.StreamReader()
+    reader.feed_data(request)
+    reader.feed_eof()
+    writer = _Writer()
+    await service.handle_connection(reader, writer)
+    head, _, body = writer.data.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def _post(path, payload):
+    body = json.dumps(payload).encode()
+    return (f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n").encode() + body
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+    cache.discard(lambda key: key == "a")
+    assert len(cache) == 1 and cache.get("a") is None
+
+
+def test_miss_hit_and_coalesced():
+    async def queries(service):
+        first, second = await asyncio.gather(
+            service.query("p", {"new_food_price": 1.1}),
+            service.query("p", {"new_food_price": 1.1}),
+        )
+        # an equivalent spelling of the same scenario is a hit
+        third = await service.query("p", {"new_food_price": "1.10", "grouping": "quartiles"})
+        return first, second, third, service.stats()
+
+    first, second, third, stats = _run(queries)
+    assert [first[1], second[1], third[1]] == ["miss", "coalesced", "hit"]
+    assert first[0] is second[0] is third[0]
+    assert stats == {"hits": 1, "misses": 1, "coalesced": 1, "entries": 1, "in_flight": 0}
+
+
+def test_replacing_a_population_drops_its_results():
+    async def queries(service):
+        before, _ = await service.query("p", {"new_food_price": 1.1})
+        await service.add_population("p", {"household_number": 2_000, "seed": 2})
+        after, status = await service.query("p", {"new_food_price": 1.1})
+        return before, after, status
+
+    before, after, status = _run(queries)
+    assert status == "miss"
+    assert after["aggregates"]["baseline"] != before["aggregates"]["baseline"]
+
+
+@pytest.mark.parametrize("body", [[1, 2], "scenario", 3])
+def test_non_object_body_is_a_bad_request(body):
+    status, payload = _run(lambda service: _http(service, _post("/query", body)))
+    assert status == 400
+    assert "JSON object" in payload["error"]
+
+
+def test_unknown_population_is_not_found():
+    payload = {"population": "missing", "new_food_price": 1.1}
+    status, _ = _run(lambda service: _http(service, _post("/query", payload)))
+    assert status == 404
+
+
+def test_key_error_in_evaluation_is_a_server_error(monkeypatch):
+    def fail(self, scenario):
+        raise KeyError("column")
+
+    monkeypatch.setattr("service._Resident.evaluate", fail)
+    payload = {"population": "p", "new_food_price": 1.1}
+    status, _ = _run(lambda service: _http(service, _post("/query", payload)))
+    assert status == 500
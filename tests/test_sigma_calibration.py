@@ -0,0 +1,66 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+
+from sigma_calibration import (
+    fit_lognormal,
+    gini_from_sigma,
+    norm_ppf,
+    p90_p10_from_sigma,
+    sigma_from_gini,
+    sigma_from_gini_array,
+    sigma_from_p90_p10_array,
+)
+
+
+def test_norm_ppf_matches_normal_dist():
+    # central region, intermediate and far tails on both sides
+    p = np.concatenate([
+        np.linspace(0.001, 0.999, 999),
+        [1e-300, 1e-50, 1e-12, 1e-6, 0.02425, 0.075, 0.925, 0.97575, 1 - 1e-6, 1 - 1e-12],
+    ])
+    expected = [NormalDist().inv_cdf(value) for value in p]
+    np.testing.assert_allclose(norm_ppf(p), expected, rtol=1e-14, atol=1e-14)
+
+
+def test_array_calibration_matches_scalar():
+    gini = np.array([0.25, 1 / 3, 0.45])
+    expected = [sigma_from_gini(value, tol=1e-12) for value in gini]
+    np.testing.assert_allclose(sigma_from_gini_array(gini), expected, atol=1e-10)
+    np.testing.assert_allclose(
+        [p90_p10_from_sigma(sigma) for sigma in sigma_from_p90_p10_array([3.0, 4.0])], [3.0, 4.0]
+    )
+
+
+def test_fit_lognormal_round_trip():
+    mu = np.array([9.5, 10.0, 10.5])
+    sigma = np.array([0.4, 0.55, 0.8])
+    fit = fit_lognormal(
+        gini=[gini_from_sigma(s) for s in sigma],
+        p90_p10=[p90_p10_from_sigma(s) for s in sigma],
+        mean=np.exp(mu + 0.5 * sigma**2),
+        median=np.exp(mu),
+    )
+    np.testing.assert_allclose(fit["mu"], mu, rtol=1e-10)
+    np.testing.assert_allclose(fit["sigma"], sigma, rtol=1e-10)
+    np.testing.assert_allclose(fit["target_mean_income"], np.exp(mu + 0.5 * sigma**2))
+
+
+def test_fit_lognormal_with_missing_targets():
+    # Gini and mean only for the first fit, P90/P10 and median for the second
+    fit = fit_lognormal(
+        gini=[gini_from_sigma(0.5), np.nan],
+        p90_p10=[np.nan, p90_p10_from_sigma(0.7)],
+        mean=[30_000.0, np.nan],
+        median=[np.nan, 20_000.0],
+    )
+    np.testing.assert_allclose(fit["sigma"], [0.5, 0.7], rtol=1e-10)
+    np.testing.assert_allclose(fit["target_mean_income"][0], 30_000.0)
+    np.testing.assert_allclose(fit["mu"][1], math.log(20_000.0))
+
+
+def test_fit_lognormal_needs_a_location():
+    with pytest.raises(ValueError, match="mean or median"):
+        fit_lognormal(gini=0.3)
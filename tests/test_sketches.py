@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from sketches import ColumnSummary, MomentSketch, QuantileSketch
+
+PROBABILITIES = np.linspace(0.0, 1.0, 101)
+
+
+def _exact_quantiles(values, probabilities):
+    # value at the rank the sketch estimates: first one whose cumulative count exceeds p * n
+    ordered = np.sort(values)
+    index = np.minimum((probabilities * len(values)).astype(int), len(values) - 1)
+    return ordered[index]
+
+
+@pytest.mark.parametrize("relative_accuracy", [0.05, 0.01, 0.001])
+def test_quantiles_within_relative_accuracy(relative_accuracy):
+    values = np.random.default_rng(0).lognormal(3.0, 2.0, 50_000)
+    values[:100] = 0.0
+    sketch = QuantileSketch(relative_accuracy)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+
+    exact = _exact_quantiles(values, PROBABILITIES)
+    error = np.abs(sketch.quantiles(PROBABILITIES) - exact)
+    assert np.all(error <= relative_accuracy * exact * (1 + 1e-12))
+
+
+def test_merge_equals_single_sketch():
+    values = np.random.default_rng(1).gamma(2.0, 3.0, 20_000)
+    whole = QuantileSketch(0.01).update(values)
+    left = QuantileSketch(0.01).update(values[:5_000])
+    right = QuantileSketch(0.01).update(values[5_000:])
+    np.testing.assert_array_equal(
+        left.merge(right).quantiles(PROBABILITIES), whole.quantiles(PROBABILITIES)
+    )
+
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+def test_negative_values_rejected():
+    with pytest.raises(ValueError):
+        QuantileSketch().update([1.0, -1.0])
+
+
+def test_weighted_moments_match_numpy():
+    rng = np.random.default_rng(2)
+    values, weights = rng.normal(100.0, 5.0, 10_000), rng.uniform(0.5, 2.0, 10_000)
+    sketch = MomentSketch()
+    for chunk in np.array_split(np.arange(10_000), 9):
+        sketch.update(values[chunk], weights[chunk])
+
+    mean = np.average(values, weights=weights)
+    np.testing.assert_allclose(sketch.mean, mean, rtol=1e-13)
+    variance = np.average((values - mean) ** 2, weights=weights)
+    np.testing.assert_allclose(sketch.variance, variance, rtol=1e-10)
+    np.testing.assert_allclose(sketch.total, np.dot(values, weights), rtol=1e-13)
+
+
+def test_column_summary_percentiles():
+    values = np.random.default_rng(3).lognormal(0.0, 1.0, 10_000)
+    summary = ColumnSummary(0.01).update(values).summary(percentiles=[10, 90])
+    for key, p in (("median", 0.5), ("p10", 0.1), ("p90", 0.9)):
+        exact = _exact_quantiles(values, np.array([p]))[0]
+        assert abs(summary[key] - exact) <= 0.01 * exact * (1 + 1e-12)
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from Economy import Economy, build_summary_and_plot_data, economy_calculations
+from population import Population, analytic_quartile_cutoffs, assign_quartile_codes
+from streaming import iter_population_chunks, stream_economy
+
+N = 25_000
+CHUNK_SIZE = 4_000
+SEED = 7
+NEW_INCOME = 1.05
+NEW_FOOD_PRICE = 1.2
+
+
+@pytest.fixture(scope="module")
+def materialized():
+    """The streamed population held in memory at once, with the same group codes."""
+    chunks = list(iter_population_chunks(N, chunk_size=CHUNK_SIZE, seed=SEED))
+    population = Population(
+        income=np.concatenate([chunk.income for chunk in chunks]),
+        food_budget_share=np.concatenate([chunk.food_budget_share for chunk in chunks]),
+        group_code=np.concatenate([chunk.group_code for chunk in chunks]),
+    )
+    econ = Economy(household_number=N)
+    econ.population = population
+    economy_calculations(econ, new_income=NEW_INCOME, new_food_price=NEW_FOOD_PRICE)
+    table_summary, plot_data = build_summary_and_plot_data(econ, NEW_FOOD_PRICE)
+    return econ, table_summary, plot_data
+
+
+def test_chunks_use_analytic_cutoffs():
+    chunks = list(iter_population_chunks(N, chunk_size=CHUNK_SIZE, seed=SEED))
+    assert [chunk.size for chunk in chunks] == [CHUNK_SIZE] * 6 + [1_000]
+    cutoffs = analytic_quartile_cutoffs()
+    for chunk in chunks:
+        np.testing.assert_array_equal(
+            chunk.group_code, assign_quartile_codes(chunk.income, cutoffs)
+        )
+
+
+def test_stream_matches_materialized_run(materialized):
+    econ, table_summary, plot_data = materialized
+    aggregates, streamed_summary, streamed_plot_data = stream_economy(
+        N,
+        new_income=NEW_INCOME,
+        new_food_price=NEW_FOOD_PRICE,
+        chunk_size=CHUNK_SIZE,
+        seed=SEED,
+        relative_accuracy=0.01,
+    )
+
+    assert aggregates["baseline"] == pytest.approx(econ.aggregate_food_baseline)
+    assert aggregates["income_change"] == pytest.approx(econ.aggregate_food_demand_income_change)
+    assert aggregates["price_change"] == pytest.approx(econ.aggregate_food_demand_price_change)
+    assert aggregates["combined_change"] == pytest.approx(
+        econ.aggregate_food_demand_combined_change
+    )
+
+    for key in ("mean_demand", "std_demand", "total_demand"):
+        assert streamed_summary[key] == pytest.approx(table_summary[key])
+    assert streamed_summary["median_demand"] == pytest.approx(
+        table_summary["median_demand"], rel=0.01
+    )
+
+    assert streamed_plot_data["groups"] == plot_data["groups"]
+    for key in ("baseline_demand", "new_demand", "baseline_budget_share", "new_budget_share"):
+        np.testing.assert_allclose(streamed_plot_data[key], plot_data[key])
+
+
+def test_invalid_chunk_size_rejected():
+    with pytest.raises(ValueError, match="chunk_size"):
+        list(iter_population_chunks(10, chunk_size=0))
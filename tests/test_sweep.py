@@ -0,0 +1,78 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from Economy import Economy
+from demand import combined_demand
+from sweep import _block_sizes, sweep_scenarios
+
+PRICES = np.array([0.9, 1.0, 1.15])
+INCOMES = np.array([1.0, 1.2])
+
+
+@pytest.fixture(scope="module")
+def population():
+    econ = Economy(household_number=3_000)
+    econ.create_economy(seed=11)
+    return econ.population
+
+
+def _group_means(population, values):
+    codes = population.group_code
+    return np.bincount(codes, weights=values, minlength=4) / np.bincount(codes, minlength=4)
+
+
+def test_sweep_matches_scalar_household_methods(population):
+    cube = sweep_scenarios(population, PRICES, INCOMES)
+    households = population.households
+
+    # price-only column (income factor 1.0) and income-only row (price 1.0)
+    for i, price in enumerate(PRICES):
+        q = np.array([h.calculate_new_food_demand_price_change(price) for h in households])
+        np.testing.assert_allclose(cube["mean_demand"][i, 0], _group_means(population, q), rtol=1e-12)
+    q = np.array([h.calculate_new_food_demand_income_change(INCOMES[1]) for h in households])
+    np.testing.assert_allclose(cube["mean_demand"][1, 1], _group_means(population, q), rtol=1e-12)
+
+
+def test_sweep_matches_combined_kernel(population):
+    cube = sweep_scenarios(population, PRICES, INCOMES)
+    for i, price in enumerate(PRICES):
+        for j, income in enumerate(INCOMES):
+            q = combined_demand(population, price, income)
+            share = price * q / (population.income * income)
+            np.testing.assert_allclose(cube["mean_demand"][i, j], _group_means(population, q),
+                                       rtol=1e-12)
+            np.testing.assert_allclose(cube["mean_budget_share"][i, j],
+                                       _group_means(population, share), rtol=1e-12)
+            assert cube["market_total_demand"][i, j] == pytest.approx(q.sum(), rel=1e-12)
+
+
+def test_block_size_does_not_change_results(population):
+    large = sweep_scenarios(population, PRICES, INCOMES)
+    small = sweep_scenarios(population, PRICES, INCOMES, max_block_elements=500)
+    for name in ("total_demand", "mean_budget_share", "baseline_demand"):
+        np.testing.assert_allclose(small[name], large[name], rtol=1e-12)
+
+
+def test_block_sizes_fit_budget():
+    for n_groups in (4, 10, 100):
+        scenario_block, household_block = _block_sizes(1_000, 10_000_000, n_groups, 1_000_000)
+        width = 2 * n_groups + 8 + 2 * scenario_block
+        assert household_block * width <= 1_000_000
+
+
+def test_peak_memory_stays_within_block_budget():
+    econ = Economy(household_number=400_000)
+    econ.create_economy(seed=1)
+    max_block_elements = 100_000
+
+    tracemalloc.start()
+    try:
+        sweep_scenarios(econ.population, np.linspace(0.8, 1.2, 7), np.linspace(0.9, 1.3, 5),
+                        max_block_elements=max_block_elements)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # the block budget plus the small (scenarios × groups) outputs
+    assert peak <= 8 * max_block_elements + 64 * 1024
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from Economy import Economy
+from welfare import WELFARE_MEASURES, GroupedWelfare, household_welfare, welfare_shares
+
+STEPS = 2_000
+
+# (base share s0, income elasticity d, price elasticity a, ln(p1 / p0)),
+# including the d -> 1 and a -> -1 limits and a price fall
+CASES = [
+    (0.3, 0.8, -0.6, np.log(1.2)),
+    (0.5, 0.4, -0.3, np.log(1.5)),
+    (0.2, 1.0, -0.6, np.log(1.3)),
+    (0.25, 0.7, -1.0, np.log(1.4)),
+    (0.4, 1.3, -0.9, np.log(0.8)),
+]
+
+
+def _compensated_income(base_share, d, a, log_price_change, income):
+    """
+    Income m(p1) that keeps utility fixed when starting from m(p0) = income,
+    by integrating Shephard's lemma dm/dln p = p q(p, m) with RK4, where
+    q(p, m) = s0 p^a m^d (p0 = 1, income 1 at the baseline share s0).
+    """
+    h = log_price_change / STEPS
+
+    def slope(x, m):
+        return base_share * np.exp((1.0 + a) * x) * m ** d
+
+    m, x = income, 0.0
+    for _ in range(STEPS):
+        k1 = slope(x, m)
+        k2 = slope(x + h / 2, m + h / 2 * k1)
+        k3 = slope(x + h / 2, m + h / 2 * k2)
+        k4 = slope(x + h, m + h * k3)
+        m += h / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+        x += h
+    return m
+
+
+@pytest.mark.parametrize("base_share, d, a, log_price_change", CASES)
+def test_closed_forms_match_numerical_integration(base_share, d, a, log_price_change):
+    new_share = base_share * np.exp((1.0 + a) * log_price_change)
+    shares = welfare_shares(base_share, new_share, log_price_change, d, a)
+
+    x = np.linspace(0.0, log_price_change, STEPS + 1)
+    spending = base_share * np.exp((1.0 + a) * x)
+    dcs = -np.sum((spending[1:] + spending[:-1]) / 2) * (x[1] - x[0])
+    np.testing.assert_allclose(shares["dcs"], dcs, rtol=1e-6)
+
+    # CV: income at p1 that restores the old utility, starting from income 1 at p0
+    cv = 1.0 - _compensated_income(base_share, d, a, log_price_change, 1.0)
+    np.testing.assert_allclose(shares["cv"], cv, rtol=1e-9)
+
+    # EV: income at p0 reaching the new utility; from p1 with income 1 the
+    # share is s1, i.e. the same demand rule with p measured from p1
+    ev = _compensated_income(new_share, d, a, -log_price_change, 1.0) - 1.0
+    np.testing.assert_allclose(shares["ev"], ev, rtol=1e-9)
+
+
+def test_price_increase_ordering():
+    base_share, d, a, log_price_change = CASES[0]
+    new_share = base_share * np.exp((1.0 + a) * log_price_change)
+    shares = welfare_shares(base_share, new_share, log_price_change, d, a)
+    assert shares["cv"] < shares["dcs"] < shares["ev"] < 0
+
+
+def test_grouped_welfare_matches_households():
+    econ = Economy(household_number=5_000)
+    econ.create_economy(seed=4)
+    population = econ.population
+    welfare = GroupedWelfare(population, population.group_code, 4)
+    assert not welfare.per_household
+
+    prices, incomes = np.array([0.8, 1.1, 1.6, 4.0]), np.array([1.0, 1.2, 0.9, 1.0])
+    means = welfare.mean_shares(np.log(prices), np.log(incomes))
+    counts = np.bincount(population.group_code, minlength=4)
+    for s, (price, income) in enumerate(zip(prices, incomes)):
+        expected = household_welfare(population, price, income)
+        for measure in WELFARE_MEASURES:
+            group_means = np.bincount(population.group_code, weights=expected[measure]) / counts
+            np.testing.assert_allclose(means[measure][s], group_means, rtol=1e-12, atol=1e-15)
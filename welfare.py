@@ -0,0 +1,335 @@
+"""
+welfare.py
+
+Welfare cost of food price changes, per household and per group.
+
+Demand is the isoelastic rule of `Household`,
+
+    q(p, y) = q0 * (p / p0)^a * (y / y0)^d        (a: price, d: income elasticity)
+
+so the standard welfare measures have closed forms (Hausman, 1981). With
+L = ln(p1 / p0), s0 = p0 q(p0, y) / y and s1 = p1 q(p1, y) / y the food
+budget shares before and after the price change at income y, and
+
+    B = (s1 - s0) / (1 + a)            ( -> s0 * L  as a -> -1 )
+
+all three measures are shares of income (negative = welfare loss):
+
+    change in consumer surplus   dCS / y = -B
+    compensating variation       CV / y  = -[(1 + (1 - d) B)^(1 / (1 - d)) - 1]
+    equivalent variation         EV / y  =  (1 - (1 - d) B)^(1 / (1 - d)) - 1
+
+with the d -> 1 limits CV / y = -(e^B - 1) and EV / y = e^-B - 1. For a
+price increase |EV| <= |dCS| <= |CV|.
+
+For a single scenario the measures need only the shares that the demand
+pass already produces, so they are computed in the same pass
+(`welfare_shares`, used by `Economy.build_summary_and_plot_data(welfare=True)`).
+
+For sweeps over many scenarios, `GroupedWelfare` avoids per-household
+work altogether. Within a class of households with the same (d, a, p0),
+B = s0 * beta(scenario) is proportional to the baseline share s0, so
+group means of CV and EV follow from a power series in B and the group
+power sums of s0, precomputed once:
+
+    mean_g (1 + c B)^(1/c) - 1 = sum_n a_n(c) beta^n mean_g(s0^n),   c = 1 - d
+
+Scenarios where the series would converge slowly are evaluated per
+household instead. So are populations with per-household elasticity draws
+(more than MAX_WELFARE_CLASSES classes), where the class decomposition
+would cost more than a vectorized pass over the households.
+"""
+
+import numpy as np
+
+from grouping import DEFAULT_CHUNK_SIZE, factorize_rows, population_grouping, grouped_stats
+
+
+WELFARE_MEASURES = ("dcs", "cv", "ev")
+
+# below this |x| the series expansions are used instead of the closed forms
+_SERIES_THRESHOLD = 1e-8
+
+# GroupedWelfare: number of power-series terms, and the largest |c B| and
+# |B| for which the truncated series is used (truncation error < 1e-15)
+SERIES_ORDER = 32
+MAX_SERIES_CB = 0.25
+MAX_SERIES_B = 1.0
+
+# GroupedWelfare: above this many elasticity classes, group means are taken
+# by a chunked per-household pass per scenario instead of the class series
+MAX_WELFARE_CLASSES = 256
+
+
+def _log1p_ratio(x):
+    """log1p(x) / x, continuous at x = 0."""
+    x = np.asarray(x, dtype=np.float64)
+    small = np.abs(x) < _SERIES_THRESHOLD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(small, 1.0 - 0.5 * x, np.log1p(x) / np.where(small, 1.0, x))
+
+
+def surplus_term(base_share, new_share, log_price_change, price_elasticity):
+    """B = (s1 - s0) / (1 + a), with the a -> -1 limit s0 * L."""
+    z = (1.0 + price_elasticity) * log_price_change
+    small = np.abs(z) < _SERIES_THRESHOLD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (new_share - base_share) / (1.0 + price_elasticity)
+    return np.where(small, base_share * log_price_change * (1.0 + 0.5 * z), ratio)
+
+
+def welfare_shares(base_share, new_share, log_price_change, income_elasticity, price_elasticity):
+    """
+    dCS, CV and EV as shares of income (negative = loss).
+
+    base_share: food budget share at the old price, s0
+    new_share: food budget share at the new price, same income, s1
+    log_price_change: ln(p1 / p0)
+
+    All arguments broadcast against each other. EV is nan where the
+    price increase would exhaust the whole income ((1 - d) B >= 1).
+    """
+    b = surplus_term(base_share, new_share, log_price_change, price_elasticity)
+    c = 1.0 - np.asarray(income_elasticity, dtype=np.float64)
+    cb = c * b
+    with np.errstate(invalid="ignore"):
+        return {
+            "dcs": -b,
+            "cv": -np.expm1(b * _log1p_ratio(cb)),
+            "ev": np.expm1(-b * _log1p_ratio(-cb)),
+        }
+
+
+# ---------- Population level ----------
+
+def household_welfare(population, new_food_price, income_factor=None):
+    """
+    Per-household welfare of a move to `new_food_price`, evaluated at the
+    (optionally scaled) income y = income * income_factor.
+
+    Returns a dict of arrays: "dcs", "cv", "ev" (shares of income) and
+    "dcs_amount", "cv_amount", "ev_amount" (money, share × income).
+    """
+    log_price_change = np.log(new_food_price) - np.log(population.food_price)
+    income = population.income
+    base_share = population.food_budget_share
+    if income_factor is not None:
+        # share at the old price after the income change: s0 * f^(d - 1)
+        base_share = base_share * np.exp(
+            (population.income_elasticity_food - 1.0) * np.log(income_factor)
+        )
+        income = income * income_factor
+    new_share = base_share * np.exp((1.0 + population.price_elasticity_food) * log_price_change)
+
+    shares = welfare_shares(
+        base_share,
+        new_share,
+        log_price_change,
+        population.income_elasticity_food,
+        population.price_elasticity_food,
+    )
+    for measure in WELFARE_MEASURES:
+        shares[f"{measure}_amount"] = shares[measure] * income
+    return shares
+
+
+def incidence_table(population, new_food_price, income_factor=None, grouping=None):
+    """
+    Grouped incidence of a food price change.
+
+    grouping: as in Economy.build_summary_and_plot_data (quartiles by
+    default, "deciles", an int, or income band edges).
+
+    Returns a dict with "groups", "count", "weight" (households represented,
+    equal to count unless the population has survey weights), "mean_income"
+    and, for each of "dcs", "cv", "ev":
+        - "<measure>_mean_share": mean of the household income shares
+        - "<measure>_incidence": group total / group total income
+        - "<measure>_total": group total in money
+    """
+    welfare = household_welfare(population, new_food_price, income_factor)
+    income = population.income if income_factor is None else population.income * income_factor
+
+    codes, groups = population_grouping(population, grouping)
+    columns = {"income": income}
+    for measure in WELFARE_MEASURES:
+        columns[measure] = welfare[measure]
+        columns[f"{measure}_amount"] = welfare[f"{measure}_amount"]
+    stats = grouped_stats(codes, len(groups), columns, weights=population.weight)
+
+    income_total = stats["income"]["sum"]
+    safe_income = np.where(income_total > 0, income_total, 1.0)
+    table = {
+        "groups": groups,
+        "count": stats["count"].astype(int).tolist(),
+        "weight": stats["weight"].tolist(),
+        "mean_income": stats["income"]["mean"].tolist(),
+    }
+    for measure in WELFARE_MEASURES:
+        total = stats[f"{measure}_amount"]["sum"]
+        table[f"{measure}_mean_share"] = stats[measure]["mean"].tolist()
+        table[f"{measure}_incidence"] = (total / safe_income).tolist()
+        table[f"{measure}_total"] = total.tolist()
+    return table
+
+
+# ---------- Many scenarios, grouped ----------
+
+def _exprel(z):
+    """expm1(z) / z, continuous at z = 0."""
+    small = np.abs(z) < _SERIES_THRESHOLD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(small, 1.0 + 0.5 * z, np.expm1(z) / np.where(small, 1.0, z))
+
+
+def power_coefficients(c, order=SERIES_ORDER):
+    """
+    Taylor coefficients a_0..a_order of (1 + c B)^(1/c) in B (exp(B) for c = 0).
+
+    Uses the recurrence for exp of a power series h(B) = log1p(c B) / c.
+    """
+    m = np.arange(1, order + 1)
+    h = (-1.0) ** (m + 1) * float(c) ** (m - 1) / m
+    a = np.zeros(order + 1)
+    a[0] = 1.0
+    for n in range(1, order + 1):
+        a[n] = np.dot(m[:n] * h[:n], a[n - 1::-1]) / n
+    return a
+
+
+class GroupedWelfare:
+    """
+    Group means of the dCS, CV and EV shares for many price / income
+    scenarios, without a pass over the households per scenario.
+
+    Households are split into classes of equal (income elasticity, price
+    elasticity, baseline price); the power sums of the baseline budget
+    share per (class, group) are computed once in the constructor,
+    weighted by the survey weights of a microdata population.
+
+    With more than `max_classes` classes (heterogeneous elasticities, one
+    class per household) no power sums are built; mean_shares then reduces
+    the exact per-household measures chunk by chunk (O(N) per scenario).
+    """
+
+    def __init__(self, population, codes, n_groups, order=SERIES_ORDER,
+                 max_classes=MAX_WELFARE_CLASSES, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.population = population
+        self.codes = np.asarray(codes, dtype=np.intp)
+        self.n_groups = n_groups
+        self.order = order
+        self.chunk_size = chunk_size
+
+        self.weight = population.weight
+        if self.weight is not None:
+            self.weight = np.asarray(self.weight, dtype=np.float64)
+        self.count = np.bincount(self.codes, weights=self.weight, minlength=n_groups).astype(float)
+
+        self.class_codes, (self.income_elasticity, self.price_elasticity, self.base_price) = (
+            factorize_rows((
+                population.income_elasticity_food,
+                population.price_elasticity_food,
+                population.food_price,
+            ))
+        )
+        n_classes = len(self.income_elasticity)
+        self.per_household = n_classes > max_classes
+        if self.per_household:
+            self.class_codes = None
+            self.coefficients = []
+            return
+
+        cell = self.class_codes * n_groups + self.codes
+        share = np.asarray(population.food_budget_share, dtype=np.float64)
+        power = np.ones_like(share) if self.weight is None else self.weight.copy()
+        # power_sums[n, k, g] = (weighted) sum of s0^n over households of class k in group g
+        self.power_sums = np.empty((order + 1, n_classes, n_groups))
+        for n in range(order + 1):
+            self.power_sums[n] = np.bincount(
+                cell, weights=power, minlength=n_classes * n_groups
+            ).reshape(n_classes, n_groups)
+            power = power * share
+
+        self.max_share = np.zeros(n_classes)
+        np.maximum.at(self.max_share, self.class_codes, share)
+        self.coefficients = [power_coefficients(1.0 - d, order) for d in self.income_elasticity]
+
+    def mean_shares(self, log_price, log_income_factor):
+        """
+        (S, G) group means of "dcs", "cv" and "ev" (shares of income) for
+        scenarios with new price exp(log_price) and income factor
+        exp(log_income_factor), both of shape (S,).
+        """
+        log_price = np.asarray(log_price, dtype=np.float64)
+        log_income_factor = np.broadcast_to(log_income_factor, log_price.shape)
+        n_scenarios = log_price.shape[0]
+        sums = {measure: np.zeros((n_scenarios, self.n_groups)) for measure in WELFARE_MEASURES}
+        if self.per_household:
+            self._household_sums(sums, log_price, log_income_factor)
+
+        exponents = np.arange(self.order + 1)
+        for k, a in enumerate(self.coefficients):
+            d = self.income_elasticity[k]
+            log_change = log_price - np.log(self.base_price[k])
+            # B = s0 * beta: s0 * f^(d - 1) * L * exprel((1 + a) L)
+            beta = (
+                np.exp((d - 1.0) * log_income_factor)
+                * log_change
+                * _exprel((1.0 + self.price_elasticity[k]) * log_change)
+            )
+            sums["dcs"] -= np.outer(beta, self.power_sums[1, k])
+
+            b_max = np.abs(beta) * self.max_share[k]
+            series = (b_max <= MAX_SERIES_B) & (np.abs(1.0 - d) * b_max <= MAX_SERIES_CB)
+
+            powers = beta[series, None] ** exponents
+            signs = (-1.0) ** exponents
+            sums["cv"][series] -= (powers[:, 1:] * a[1:]) @ self.power_sums[1:, k]
+            sums["ev"][series] += (powers[:, 1:] * (a * signs)[1:]) @ self.power_sums[1:, k]
+
+            if not np.all(series):
+                self._exact_sums(sums, k, np.flatnonzero(~series), log_change, log_income_factor)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                measure: np.where(self.count > 0, total / self.count, 0.0)
+                for measure, total in sums.items()
+            }
+
+    def _household_sums(self, sums, log_price, log_income_factor):
+        # heterogeneous elasticities: exact measures for every household,
+        # chunk by chunk so no temporary is longer than chunk_size
+        population = self.population
+        n = self.codes.shape[0]
+        for start in range(0, n, self.chunk_size):
+            chunk = slice(start, min(start + self.chunk_size, n))
+            d = np.asarray(population.income_elasticity_food[chunk], dtype=np.float64)
+            a = np.asarray(population.price_elasticity_food[chunk], dtype=np.float64)
+            log_base_price = np.log(np.asarray(population.food_price[chunk], dtype=np.float64))
+            share = np.asarray(population.food_budget_share[chunk], dtype=np.float64)
+            codes = self.codes[chunk]
+            weight = None if self.weight is None else self.weight[chunk]
+            for s in range(log_price.shape[0]):
+                log_change = log_price[s] - log_base_price
+                base_share = share * np.exp((d - 1.0) * log_income_factor[s])
+                new_share = base_share * np.exp((1.0 + a) * log_change)
+                shares = welfare_shares(base_share, new_share, log_change, d, a)
+                for measure in WELFARE_MEASURES:
+                    values = shares[measure] if weight is None else shares[measure] * weight
+                    sums[measure][s] += np.bincount(codes, weights=values, minlength=self.n_groups)
+
+    def _exact_sums(self, sums, k, scenarios, log_change, log_income_factor):
+        # per-household evaluation for scenarios outside the series range
+        members = np.flatnonzero(self.class_codes == k)
+        d = self.income_elasticity[k]
+        a = self.price_elasticity[k]
+        share = self.population.food_budget_share[members]
+        codes = self.codes[members]
+        weight = None if self.weight is None else self.weight[members]
+        for s in scenarios:
+            base_share = share * np.exp((d - 1.0) * log_income_factor[s])
+            new_share = base_share * np.exp((1.0 + a) * log_change[s])
+            shares = welfare_shares(base_share, new_share, log_change[s], d, a)
+            for measure in ("cv", "ev"):
+                values = shares[measure] if weight is None else shares[measure] * weight
+                sums[measure][s] += np.bincount(codes, weights=values, minlength=self.n_groups)